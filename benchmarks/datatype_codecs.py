@@ -0,0 +1,56 @@
+"""
+Element codec micro-benchmark
+
+Compares the slicing/memoizing codecs in pythonedi.datatypes with the
+strptime/strftime/str.format paths EDIParser and EDIGenerator used before.
+Values repeat the way they do in an interchange: a few dates, many numbers.
+
+Run from the repository root: `python benchmarks/datatype_codecs.py`
+"""
+
+import os
+import sys
+import timeit
+import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from pythonedi import datatypes
+
+DATES = ["201703{:02d}".format(day) for day in range(1, 11)] * 100
+TIMES = ["{:02d}{:02d}".format(hour, minute) for hour in range(10) for minute in (0, 15, 30, 45)] * 25
+AMOUNTS = [str(n * 37) for n in range(1000)]
+DATETIMES = [datetime.datetime(2017, 3, day) for day in range(1, 11)] * 100
+VALUES = [n * 1.37 for n in range(1000)]
+
+decode_n2 = datatypes.decoder_for({"data_type": "N2"})
+
+CASES = [
+    ("decode CCYYMMDD",
+        lambda: [datetime.datetime.strptime(field, "%Y%m%d") for field in DATES],
+        lambda: [datatypes.decode_date(field) for field in DATES]),
+    ("decode HHMM",
+        lambda: [datetime.datetime.strptime(field, "%H%M") for field in TIMES],
+        lambda: [datatypes.decode_time(field) for field in TIMES]),
+    ("decode N2",
+        lambda: [float(field) / (10**2) for field in AMOUNTS],
+        lambda: [decode_n2(field) for field in AMOUNTS]),
+    ("encode CCYYMMDD",
+        lambda: [value.strftime("%Y%m%d") for value in DATETIMES],
+        lambda: [datatypes.encode_date(value, 8) for value in DATETIMES]),
+    ("encode N2",
+        lambda: ["{:0{length}.{decimal}f}".format(float(value), length=1, decimal="2") for value in VALUES],
+        lambda: [datatypes.encode_implied_decimal(value, 2, 1) for value in VALUES]),
+]
+
+def best_of(function, number=20, repeat=5):
+    return min(timeit.repeat(function, number=number, repeat=repeat)) / number
+
+def main():
+    print("{:<18} {:>14} {:>14} {:>9}".format("case (1000 values)", "previous (ms)", "codec (ms)", "speedup"))
+    for name, previous, codec in CASES:
+        previous_time, codec_time = best_of(previous), best_of(codec)
+        print("{:<18} {:>14.3f} {:>14.3f} {:>8.1f}x".format(name, previous_time * 1e3, codec_time * 1e3, previous_time / codec_time))
+
+if __name__ == "__main__":
+    main()
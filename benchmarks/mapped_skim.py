@@ -0,0 +1,47 @@
+"""
+Memory-mapped scanning benchmark
+
+Writes a synthetic interchange of many small invoices (see synthetic.py) to
+a temporary file, then pulls every BIG02 invoice number out of it three
+ways: parsing the whole file with parse_stream, parsing it with
+parse_mapped, and skimming the mapped file for BIG segments alone.
+
+Run from the repository root: `python benchmarks/mapped_skim.py [transaction sets]`
+"""
+
+import os
+import sys
+import time
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import pythonedi
+from pythonedi.mapped import skim
+from synthetic import interchange_text
+
+def main():
+    transactions = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "810.edi")
+        with open(path, "w") as edi_file:
+            edi_file.write(interchange_text("many_st", transactions))
+        size = os.path.getsize(path)
+
+        cases = [
+            ("parse_stream", lambda: [edi_data["BIG"]["BIG02"] for _, edi_data in pythonedi.EDIParser(edi_format="810").parse_stream(path)]),
+            ("parse_mapped", lambda: [edi_data["BIG"]["BIG02"] for _, edi_data in pythonedi.EDIParser(edi_format="810").parse_mapped(path)]),
+            ("skim BIG02", lambda: skim(path, "BIG02")),
+        ]
+        expected = None
+        print("{:<14} {:>10} {:>10}".format("", "seconds", "MB/s"))
+        for name, case in cases:
+            start = time.perf_counter()
+            values = case()
+            elapsed = time.perf_counter() - start
+            assert expected is None or values == expected
+            expected = values
+            print("{:<14} {:>10.3f} {:>10.1f}".format(name, elapsed, size / elapsed / 1e6))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Parse scaling benchmark
+
+Builds 810 messages of 1k, 10k and 100k segments by repeating the IT1/PID
+lines of test/test_edi.txt and times EDIParser.parse on each. With the
+cursor-based engine the time per segment should stay flat as the message
+grows.
+
+Run from the repository root: `python benchmarks/parse_scaling.py`
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import pythonedi
+
+SAMPLE = os.path.join(os.path.dirname(__file__), "..", "test", "test_edi.txt")
+SIZES = (1000, 10000, 100000)
+
+def build_message(sample, segment_count):
+    """ Pads the sample's IT1 loop out until the message has `segment_count` segments """
+    lines = [line for line in sample.split("\n") if line != ""]
+    first_item = next(i for i, line in enumerate(lines) if line.startswith("IT1^"))
+    last_item = max(i for i, line in enumerate(lines) if line.startswith(("IT1^", "PID^")))
+    header, items, trailer = lines[:first_item], lines[first_item:last_item+1], lines[last_item+1:]
+
+    body = []
+    while len(header) + len(body) + len(trailer) < segment_count:
+        body.extend(items)
+    body = body[:segment_count - len(header) - len(trailer)]
+    return "\n".join(header + body + trailer)
+
+def time_parse(parser, message, rounds=3):
+    """ Returns the best wall-clock time of `rounds` parses """
+    best = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        parser.parse(message)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+def main():
+    with open(SAMPLE) as sample_file:
+        sample = sample_file.read()
+    parser = pythonedi.EDIParser(edi_format="810")
+
+    print("{:>10} {:>12} {:>16}".format("segments", "seconds", "usec/segment"))
+    for size in SIZES:
+        message = build_message(sample, size)
+        elapsed = time_parse(parser, message)
+        print("{:>10} {:>12.4f} {:>16.2f}".format(size, elapsed, elapsed / size * 1e6))
+
+if __name__ == "__main__":
+    main()
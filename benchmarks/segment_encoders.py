@@ -0,0 +1,48 @@
+"""
+Segment encoder benchmark
+
+Encodes the repeated IT1/PID line item segments of an 810 with
+EDIGenerator.build_segment (which interprets the definition every time) and
+with the compiled encoders from pythonedi.encoders, next to a bare str.join
+of already formatted fields as the lower bound.
+
+Run from the repository root: `python benchmarks/segment_encoders.py`
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from pythonedi import EDIGenerator
+from pythonedi.encoders import segment_encoder
+from pythonedi.supported_formats import get_compiled_format
+
+ITEMS = 1000
+
+def main():
+    edi_format = get_compiled_format("810")
+    it1 = edi_format.segment_format("IT1")
+    pid = edi_format.segment_format("PID")
+    items = [(["{}".format(i + 1), 2, "EA", 5.25 + i, None, "VC", "SKU{}".format(i)], ["F", None, None, None, "ITEM {}".format(i)]) for i in range(ITEMS)]
+    generator = EDIGenerator()
+    encode_it1, encode_pid = segment_encoder(it1), segment_encoder(pid)
+    preformatted = [([str(value) if value is not None else "" for value in it1_data], [value or "" for value in pid_data]) for it1_data, pid_data in items]
+
+    for it1_data, pid_data in items:
+        assert encode_it1(it1_data, "^") == generator.build_segment(it1, it1_data)
+        assert encode_pid(pid_data, "^") == generator.build_segment(pid, pid_data)
+
+    cases = [
+        ("build_segment", lambda: [(generator.build_segment(it1, a), generator.build_segment(pid, b)) for a, b in items]),
+        ("compiled encoder", lambda: [(encode_it1(a, "^"), encode_pid(b, "^")) for a, b in items]),
+        ("str.join (lower bound)", lambda: [("^".join(["IT1"] + a), "^".join(["PID"] + b)) for a, b in preformatted]),
+    ]
+    print("{:<24} {:>16}".format("", "usec/segment"))
+    for name, case in cases:
+        best = min(timeit.repeat(case, number=10, repeat=5)) / 10
+        print("{:<24} {:>16.2f}".format(name, best / (2 * ITEMS) * 1e6))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Benchmark suite
+
+Times parsing and generation of the synthetic 810 interchanges in
+synthetic.py (wide N1 loops, deep IT1/PID loops with SAC charges, many
+transaction sets) and writes the results as JSON, so runs from different
+releases can be compared. For each shape and operation it reports
+segments/s and MB/s (best of `--rounds` runs) and the peak memory
+allocated during one more, traced, run.
+
+Run from the repository root:
+`python benchmarks/suite.py --scale 10000 --output results.json`
+"""
+
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import datetime
+import subprocess
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import pythonedi
+from synthetic import SHAPES, interchange
+
+FORMAT_VERSION = 1 # Of the JSON output
+
+def best_time(function, rounds):
+    """ Returns the best wall-clock time of `rounds` calls to `function` """
+    best = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+def peak_memory(function):
+    """ Returns the peak bytes allocated while `function` runs """
+    tracemalloc.start()
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def parse_all(text):
+    """ Parses every transaction set in `text`, keeping none of them """
+    for _ in pythonedi.EDIParser(edi_format="810").parse_transactions(text):
+        pass
+
+def generate_all(envelope, transactions):
+    """ Builds the whole interchange as a string """
+    return pythonedi.build_interchange(envelope, transactions)
+
+def measure(shape, operation, function, segments, size, rounds):
+    seconds = best_time(function, rounds)
+    return {
+        "shape": shape,
+        "operation": operation,
+        "segments": segments,
+        "bytes": size,
+        "seconds": seconds,
+        "segments_per_second": segments / seconds,
+        "mb_per_second": size / seconds / 1e6,
+        "peak_memory_bytes": peak_memory(function),
+    }
+
+def run(shapes=SHAPES, scale=1000, rounds=3, seed=0):
+    """ Returns the result records for `shapes` """
+    results = []
+    for shape in shapes:
+        envelope, transactions = interchange(shape, scale, seed)
+        text = generate_all(envelope, transactions)
+        segments = text.count("\n")
+        size = len(text.encode("utf-8"))
+        results.append(measure(shape, "generate", lambda: generate_all(envelope, transactions), segments, size, rounds))
+        results.append(measure(shape, "parse", lambda: parse_all(text), segments, size, rounds))
+    return results
+
+def compare(results, baseline):
+    """ Yields (shape, operation, throughput ratio, peak memory ratio) against the
+    results of an earlier run; ratios over 1 mean faster or more memory """
+    earlier = dict(((result["shape"], result["operation"]), result) for result in baseline["results"])
+    for result in results:
+        before = earlier.get((result["shape"], result["operation"]))
+        if before is not None:
+            yield (result["shape"], result["operation"],
+                   result["segments_per_second"] / before["segments_per_second"],
+                   result["peak_memory_bytes"] / before["peak_memory_bytes"])
+
+def revision():
+    """ The git revision being benchmarked, if known """
+    try:
+        output = subprocess.run(["git", "describe", "--always", "--dirty"], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, universal_newlines=True)
+    except OSError:
+        return None
+    return output.stdout.strip() or None
+
+def main(args=None):
+    arguments = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    arguments.add_argument("--shapes", nargs="+", choices=SHAPES, default=list(SHAPES))
+    arguments.add_argument("--scale", type=int, default=1000, help="IT1 loops (deep_it1) or transaction sets (many_st)")
+    arguments.add_argument("--rounds", type=int, default=3)
+    arguments.add_argument("--seed", type=int, default=0)
+    arguments.add_argument("--output", help="JSON file to write (default: standard output)")
+    arguments.add_argument("--baseline", help="JSON output of an earlier run to compare against")
+    options = arguments.parse_args(args)
+
+    report = {
+        "format_version": FORMAT_VERSION,
+        "revision": revision(),
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "scale": options.scale,
+        "rounds": options.rounds,
+        "seed": options.seed,
+        "results": run(options.shapes, options.scale, options.rounds, options.seed),
+    }
+    output = json.dumps(report, indent=2)
+    if options.output is None:
+        print(output)
+    else:
+        with open(options.output, "w") as output_file:
+            output_file.write(output + "\n")
+        for result in report["results"]:
+            print("{shape:<10} {operation:<9} {segments_per_second:>12.0f} seg/s {mb_per_second:>8.2f} MB/s {peak_memory_bytes:>12} bytes peak".format(**result))
+    if options.baseline is not None:
+        with open(options.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        for shape, operation, speed, memory in compare(report["results"], baseline):
+            sys.stderr.write("{:<10} {:<9} {:>6.2f}x throughput {:>6.2f}x peak memory vs {}\n".format(shape, operation, speed, memory, baseline.get("revision")))
+
+if __name__ == "__main__":
+    main()
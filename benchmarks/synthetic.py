@@ -0,0 +1,125 @@
+"""
+Synthetic 810 interchanges
+
+Builds invoice data of any size and shape from the 810 format definition:
+every element of every segment written gets a value of its data type and
+length (a code from its list for ID elements), so all syntax rules hold and
+the segments are as wide as the format allows. Values come from a seeded
+random generator, so a given shape and seed always produce the same
+interchange.
+
+Shapes:
+ * wide_n1: one transaction set with the most N1 (party) loops allowed
+ * deep_it1: one transaction set with `scale` IT1 loops, each with TXI,
+   several PID loops, REF and DTM, plus SAC charge loops
+ * many_st: `scale` small transaction sets in one interchange
+
+`interchange(shape, scale)` returns the (envelope, transactions) pair
+EDIGenerator.iter_interchange takes; `interchange_text` builds it.
+"""
+
+import os
+import sys
+import random
+import string
+import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from pythonedi import build_interchange
+from pythonedi.supported_formats import get_compiled_format
+
+SHAPES = ("wide_n1", "deep_it1", "many_st")
+
+ALPHANUMERIC = string.ascii_uppercase + string.digits
+
+def envelope():
+    """ The ISA and GS segments (GE and IEA are filled in by the writer) """
+    timestamp = datetime.datetime(2017, 3, 10, 12, 0)
+    return {
+        "ISA": ["00", "", "00", "", "ZZ", "SENDER", "ZZ", "RECEIVER", timestamp, timestamp, "U", "00401", "000000001", "0", "P", "/"],
+        "GS": ["IN", "SENDER", "RECEIVER", timestamp, timestamp, "1", "X", "004010"],
+    }
+
+class Synthesizer(object):
+    """ Makes element values for the segments of a compiled format """
+    def __init__(self, edi_format="810", seed=0):
+        self.compiled_format = get_compiled_format(edi_format)
+        self.random = random.Random(seed)
+
+    def element(self, element):
+        """ Returns a value the generator accepts for the element definition `element` """
+        data_type = element["data_type"]
+        min_length = element["length"]["min"]
+        max_length = element["length"]["max"]
+        if data_type == "ID" and element["data_type_ids"]:
+            return self.random.choice(sorted(element["data_type_ids"]))
+        elif data_type in ("AN", "ID"):
+            length = self.random.randint(min_length, min(max_length, max(min_length, 12)))
+            return "".join(self.random.choice(ALPHANUMERIC) for _ in range(length))
+        elif data_type == "DT":
+            return datetime.date(2017, self.random.randint(1, 12), self.random.randint(1, 28))
+        elif data_type == "TM":
+            return datetime.time(self.random.randint(0, 23), self.random.randint(0, 59))
+        elif data_type == "R":
+            # Keep str(float) within the field so it isn't trimmed
+            digits = min(max_length - 3, 6)
+            return round(self.random.uniform(0, 10**digits), 2) if digits > 0 else self.random.randint(0, 9)
+        elif data_type.startswith("N"):
+            return self.random.randint(0, 10**min(max_length, 6) - 1) / 10**int(data_type[1:])
+        raise ValueError("No synthetic value for data type '{}' of element '{}'".format(data_type, element["id"]))
+
+    def segment(self, segment_id):
+        """ Returns data for every element of segment `segment_id` """
+        return [self.element(element) for element in self.compiled_format.segment_format(segment_id)["elements"]]
+
+    def transaction(self, n1_loops=2, items=5, pids=1, sacs=0):
+        """ Returns the data for one transaction set (SE is left to the writer) """
+        return {
+            "ST": ["810", None],
+            "BIG": self.segment("BIG"),
+            "REF": self.segment("REF"),
+            "L_N1": [{
+                "N1": self.segment("N1"),
+                "N2": self.segment("N2"),
+                "N3": self.segment("N3"),
+                "N4": self.segment("N4"),
+                "PER": self.segment("PER"),
+            } for _ in range(n1_loops)],
+            "ITD": self.segment("ITD"),
+            "DTM": self.segment("DTM"),
+            "L_IT1": [{
+                "IT1": self.segment("IT1"),
+                "TXI": self.segment("TXI"),
+                "L_PID": [{"PID": self.segment("PID")} for _ in range(pids)],
+                "REF": self.segment("REF"),
+                "DTM": self.segment("DTM"),
+            } for _ in range(items)],
+            "TDS": self.segment("TDS"),
+            "L_SAC": [{"SAC": self.segment("SAC"), "TXI": self.segment("TXI")} for _ in range(sacs)] or None,
+            "CTT": [items],
+        }
+
+def interchange(shape, scale=1000, seed=0):
+    """ Returns (envelope, list of transaction sets) for `shape` (see SHAPES) at size `scale` """
+    synthesizer = Synthesizer("810", seed)
+    if shape == "wide_n1":
+        transactions = [synthesizer.transaction(n1_loops=_loop_repeat(synthesizer, "L_N1"), items=max(1, scale // 100))]
+    elif shape == "deep_it1":
+        transactions = [synthesizer.transaction(items=scale, pids=5, sacs=_loop_repeat(synthesizer, "L_SAC"))]
+    elif shape == "many_st":
+        transactions = [synthesizer.transaction() for _ in range(scale)]
+    else:
+        raise ValueError("Unknown shape '{}'. Valid shapes include: {}".format(shape, ", ".join(SHAPES)))
+    return envelope(), transactions
+
+def _loop_repeat(synthesizer, loop_id):
+    """ The most iterations the format allows for the top-level loop `loop_id` """
+    return next(section.loop.repeat for section in synthesizer.compiled_format.root.sections if section.id == loop_id)
+
+def interchange_text(shape, scale=1000, seed=0):
+    """ Returns the built interchange for `shape` as a string """
+    return build_interchange(*interchange(shape, scale, seed))
+
+if __name__ == "__main__":
+    sys.stdout.write(interchange_text(sys.argv[1] if len(sys.argv) > 1 else "deep_it1", int(sys.argv[2]) if len(sys.argv) > 2 else 10))
@@ -3,22 +3,127 @@ Parses a provided dictionary set and tries to build an EDI message from the data
 Provides hints if data is missing, incomplete, or incorrect.
 """
 
-from .supported_formats import supported_formats
+from .supported_formats import supported_formats, get_compiled_format
+from .compiled_format import LOOP
+from .datatypes import encode_date, encode_time, encode_real, encode_implied_decimal
+from .encoders import segment_encoder, encode_segment_reporting
+from .delimiters import Delimiters
+from .diagnostics import SegmentReporter, MISSING_SEGMENT, LOOP_REPEAT
+from .metrics import instrument_generator
 from .debug import Debug
 
 class EDIGenerator(object):
-    def __init__(self):
+    """ Builds EDI messages from dicts.
+
+    A generator holds no state between or during builds: the delimiters are
+    read once per build into an immutable Delimiters tuple that is passed
+    down the walk, so one instance can be shared by many threads. """
+    # Returns the compiled encoder for a segment definition (replaced per instance by metrics)
+    segment_encoder = staticmethod(segment_encoder)
+
+    def __init__(self, metrics=None):
         # Set default delimiters
         self.element_delimiter = "^"
         self.segment_delimiter = "\n"
         self.data_delimiter = "`"
 
-    def build(self, data):
+        # Optional instrumentation (see metrics.py); installed on this instance only
+        self.metrics = metrics
+        if metrics is not None:
+            instrument_generator(self, metrics)
+
+    def build(self, data, diagnostics=None, delimiters=None):
         """
         Compiles a transaction set (as a dict) into an EDI message
         """
-        # Check for transaction set ID in data
+        delimiters = self.delimiters(data, delimiters)
+        return delimiters.segment.join(self.iter_segments(data, diagnostics=diagnostics, delimiters=delimiters))
+
+    def delimiters(self, data=None, delimiters=None):
+        """ Returns the Delimiters for one build: `delimiters` if given, else the
+        generator's, with the component separator taken from the ISA16 in `data` """
+        if delimiters is not None:
+            return delimiters
+        component = self.data_delimiter
+        isa = data.get("ISA") if data is not None else None
+        if isa is not None and len(isa) > 15 and isa[15] is not None:
+            component = str(isa[15])[0]
+        return Delimiters(self.element_delimiter, self.segment_delimiter, component)
+
+    def iter_segments(self, data, control=None, diagnostics=None, delimiters=None):
+        """
+        Compiles a transaction set (as a dict) into EDI segments, yielding
+        each segment string as soon as it is built.
 
+        Loop iterations in `data` may be any iterable, including generators;
+        they are consumed one at a time. If `control` is given, its
+        `segment(segment_id, segment_data)` method sees every segment before
+        it is built and may fill in missing values (see EDIWriter).
+
+        With a `diagnostics` collector (see diagnostics.py), problems in the
+        data are recorded there instead of raised, and generation carries on:
+        missing segments are left out and invalid elements left empty.
+
+        `delimiters` (a delimiters.Delimiters) overrides the generator's own
+        for this build only.
+        """
+        ts_id, edi_format = self.transaction_format(data)
+        delimiters = self.delimiters(data, delimiters)
+
+        # Walk through the compiled format to compile the output message
+        if diagnostics is None:
+            for segment in self.iter_level(edi_format.root, data, ts_id, control, None, None, delimiters):
+                yield segment
+        else:
+            report = SegmentReporter(diagnostics, delimiters.segment)
+            for segment in self.iter_level(edi_format.root, data, ts_id, control, None, report, delimiters):
+                report.advance(segment)
+                yield segment
+
+    def iter_interchange(self, envelope, transactions, control=None, diagnostics=None, delimiters=None):
+        """
+        Compiles many transaction sets into a single interchange: the ISA and
+        GS segments from the dict `envelope`, then the ST..SE segments of each
+        transaction set in the iterable `transactions`, then GE and IEA.
+
+        Every transaction set must be of the same type (one functional group
+        holds one type); its compiled format is looked up once. Envelope and
+        ST..SE segments are otherwise validated as for `iter_segments`. With
+        `control` (see EDIWriter.ControlNumbers), ST02, SE, GE and IEA may be
+        left out and are filled in from running counts.
+        """
+        delimiters = self.delimiters(envelope, delimiters)
+        report = SegmentReporter(diagnostics, delimiters.segment) if diagnostics is not None else None
+        for segment in self.iter_interchange_segments(envelope, transactions, control, report, delimiters):
+            if report is not None:
+                report.advance(segment)
+            yield segment
+
+    def iter_interchange_segments(self, envelope, transactions, control=None, report=None, delimiters=None):
+        """ Yields the segments for `iter_interchange`, passing problems to `report` if given """
+        transactions = iter(transactions)
+        first = next(transactions, None)
+        if first is None:
+            raise ValueError("An interchange needs at least one transaction set.")
+        ts_id, edi_format = self.transaction_format(first)
+        delimiters = self.delimiters(envelope, delimiters)
+
+        for segment in self.iter_level(edi_format.root, envelope, ts_id, control, edi_format.header_sections, report, delimiters):
+            yield segment
+        data = first
+        while data is not None:
+            set_id = data["ST"][0] if "ST" in data else None
+            if set_id != ts_id:
+                raise ValueError("Transaction set type '{}' does not match the group's type '{}'".format(set_id, ts_id))
+            for segment in self.iter_level(edi_format.root, data, ts_id, control, edi_format.transaction_sections, report, delimiters):
+                yield segment
+            data = next(transactions, None)
+        for segment in self.iter_level(edi_format.root, envelope, ts_id, control, edi_format.trailer_sections, report, delimiters):
+            yield segment
+
+    def transaction_format(self, data):
+        """ Returns (ST01, compiled format) for the transaction set `data` """
+        # Check for transaction set ID in data
         if "ST" not in data:
             Debug.explain(supported_formats["ST"])
             raise ValueError("No transaction set header found in data.")
@@ -28,54 +133,75 @@ class EDIGenerator(object):
                 ts_id,
                 "".join(["\n - " + f for f in supported_formats])
             ))
-        edi_format = supported_formats[ts_id]
+        return ts_id, get_compiled_format(ts_id)
 
-        output_segments = []
-
-        # Walk through the format definition to compile the output message
-        for section in edi_format:
-            if section["type"] == "segment":
-                if section["id"] not in data:
-                    if section["req"] == "O":
+    def iter_level(self, level, data, ts_id, control=None, sections=None, report=None, delimiters=None):
+        """
+        Yields the segments for one level of a compiled format: either the
+        top level of the transaction set or a single iteration of a loop.
+        `sections` restricts the walk to part of the level. With `report`
+        (see diagnostics.SegmentReporter), problems are passed to it and
+        the walk carries on instead of raising.
+        """
+        if delimiters is None:
+            delimiters = self.delimiters(data)
+        element_delimiter = delimiters.element
+        for section in (sections if sections is not None else level.sections):
+            if section.kind != LOOP:
+                segment_data = data.get(section.id)
+                if control is not None:
+                    segment_data = control.segment(section.id, segment_data)
+                if segment_data is None:
+                    if section.req == "O":
                         # Optional segment is missing - that's fine, keep going
                         continue
-                    elif section["req"] == "M":
+                    elif section.req == "M":
                         # Mandatory segment is missing - explain it and then fail
-                        Debug.explain(section)
-                        raise ValueError("EDI data is missing mandatory segment '{}'.".format(section["id"]))
+                        if level.id is None:
+                            message = "EDI data is missing mandatory segment '{}'.".format(section.id)
+                            definition = section.definition
+                        else:
+                            message = "EDI data in loop '{}' is missing mandatory segment '{}'.".format(level.id, section.id)
+                            definition = level.definition
+                        if report is not None:
+                            report(MISSING_SEGMENT, message, section.id, None, definition)
+                            continue
+                        Debug.explain(definition)
+                        raise ValueError(message)
                     else:
-                        raise ValueError("Unknown 'req' value '{}' when processing format for segment '{}' in set '{}'".format(section["req"], section["id"], ts_id))
-                output_segments.append(self.build_segment(section, data[section["id"]]))
-            elif section["type"] == "loop":
-                if section["id"] not in data:
-                    mandatory = [segment for segment in section["segments"] if segment["req"] == "M"]
-                    if len(mandatory) > 0:
-                        Debug.explain(section)
-                        raise ValueError("EDI data is missing loop {} with mandatory segment(s) {}".format(section["id"], ", ".join([segment["id"] for segment in mandatory])))
+                        raise ValueError("Unknown 'req' value '{}' when processing format for segment '{}' in set '{}'".format(section.req, section.id, ts_id))
+                if report is not None:
+                    yield encode_segment_reporting(section.definition, segment_data, element_delimiter, report)
+                else:
+                    yield self.segment_encoder(section.definition)(segment_data, element_delimiter)
+            else:
+                loop = section.loop
+                if data.get(section.id) is None:
+                    if len(loop.mandatory) > 0:
+                        message = "EDI data is missing loop {} with mandatory segment(s) {}".format(section.id, ", ".join([segment.id for segment in loop.mandatory]))
+                        if report is not None:
+                            report(MISSING_SEGMENT, message, loop.first.id, None, section.definition)
+                            continue
+                        Debug.explain(section.definition)
+                        raise ValueError(message)
                     else:
                         # No mandatory segments in loop - continue
                         continue
-                # Verify loop length
-                if len(section["segments"]) > section["repeat"]:
-                    raise ValueError("Loop '{}' has {} segments (max {})".format(section["id"], len(section["segments"]), section["repeat"]))
-                # Iterate through and build segments in loop
-                for iteration in data[section["id"]]:
-                    for segment in section["segments"]:
-                        if segment["id"] not in iteration:
-                            if segment["req"] == "O":
-                                # Optional segment is missing - that's fine, keep going
-                                continue
-                            elif segment["req"] == "M":
-                                # Mandatory segment is missing - explain loop and then fail
-                                Debug.explain(section)
-                                raise ValueError("EDI data in loop '{}' is missing mandatory segment '{}'.".format(section["id"], segment["id"]))
-                            else:
-                                raise ValueError("Unknown 'req' value '{}' when processing format for segment '{}' in set '{}'".format(segment["req"], segment["id"], ts_id))
-                        output_segments.append(self.build_segment(segment, iteration[segment["id"]]))
-
-        return self.segment_delimiter.join(output_segments)
+                # Iterate through and build segments in loop, verifying the
+                # loop length as we go (iterations may come from a generator)
+                for count, iteration in enumerate(data[section.id], 1):
+                    if count > loop.repeat:
+                        message = "Loop '{}' has more than {} iterations".format(section.id, loop.repeat)
+                        if report is None:
+                            raise ValueError(message)
+                        elif count == loop.repeat + 1:
+                            report(LOOP_REPEAT, message, loop.first.id, None, section.definition)
+                    for segment in self.iter_level(loop, iteration, ts_id, control, None, report, delimiters):
+                        yield segment
 
     def build_segment(self, segment, segment_data):
+        """ Builds one segment by interpreting its definition. Generation uses the
+        equivalent compiled encoders (see encoders.py); this is the reference. """
         # Parse segment elements
         output_elements = [segment["id"]]
         for e_data, e_format, index in zip(segment_data, segment["elements"], range(len(segment["elements"]))):
@@ -121,10 +247,10 @@ class EDIGenerator(object):
                                 break
                             elif output_elements[idx] != "":
                                 found += 1
-                        if 0 < found < len(rule["criteria"]):
-                            # Some but not all the elements are present
+                        if found == 0:
+                            # None of the other elements are present
                             first_element = "{}{:02d}".format(segment["id"], rule["criteria"][0])
-                            required_elements = ", ".join(["{}{:02d}".format(segment["id"], e) for e in rule["criteria"][0]])
+                            required_elements = ", ".join(["{}{:02d}".format(segment["id"], e) for e in rule["criteria"][1:]])
                             Debug.explain(segment)
                             raise ValueError("Syntax error parsing segment {}: If {} is present, at least one of {} are required.".format(segment["id"], first_element, required_elements))
             
@@ -144,22 +270,17 @@ class EDIGenerator(object):
             if e_format["data_type"] == "AN":
                 formatted_element = str(e_data)
             elif e_format["data_type"] == "DT":
-                if e_format["length"]["max"] == 8:
-                    formatted_element = e_data.strftime("%Y%m%d")
-                elif e_format["length"]["max"] == 6:
-                    formatted_element = e_data.strftime("%y%m%d")
-                else:
-                    raise ValueError("Invalid length ({}) for date field in element '{}' in set '{}'".format(e_format["length"], element_id, ts_id))
+                formatted_element = encode_date(e_data, e_format["length"]["max"])
             elif e_format["data_type"] == "TM":
                 if e_format["length"]["max"] in (4, 6, 7, 8):
-                    #formatted_element = e_data.strftime("%H%M%S%f")
-                    formatted_element = e_data.strftime("%H%M")
+                    formatted_element = encode_time(e_data)
                 else:
                     raise ValueError("Invalid length ({}) for time field in element '{}' in set '{}'".format(e_format["length"], element_id, ts_id))
             elif e_format["data_type"] == "R":
-                formatted_element = str(float(e_data))
+                formatted_element = encode_real(e_data)
             elif e_format["data_type"].startswith("N"):
-                formatted_element = "{:0{length}.{decimal}f}".format(float(e_data), length=e_format["length"]["min"], decimal=e_format["data_type"][1:])
+                # Implied decimal: the value is written without its decimal point
+                formatted_element = encode_implied_decimal(e_data, int(e_format["data_type"][1:]), e_format["length"]["min"])
             elif e_format["data_type"] == "ID":
                 formatted_element = str(e_data)
                 if not e_format["data_type_ids"]:
@@ -170,8 +291,7 @@ class EDIGenerator(object):
                     pass
             elif e_format["data_type"] == "":
                 if element_id == "ISA16":
-                    # Component Element Separator
-                    self.data_delimiter = str(e_data)[0]
+                    # Component Element Separator (see `delimiters`)
                     formatted_element = str(e_data)
                 else:
                     raise ValueError("Undefined behavior for empty data type with element '{}'".format(element_id))
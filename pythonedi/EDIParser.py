@@ -3,164 +3,793 @@ Parses a provided EDI message and tries to build a dictionary from the data
 Provides hints if data is missing, incomplete, or incorrect.
 """
 
-import datetime
+from itertools import accumulate
 
-from .supported_formats import supported_formats
+from .supported_formats import supported_formats, get_compiled_format
+from .compiled_format import SEGMENT, REPEATING_SEGMENT, LOOP, definition_cache
+from .stream import iter_segments, DEFAULT_CHUNK_SIZE
+from . import aio
+from .mapped import MappedFile
+from .index import read_range
+from .delimiters import sniff_delimiters, Delimiters
+from .records import record_class, lazy_record_class
+from .datatypes import decode_element, segment_decoders
+from .columnar import ColumnExtractor
+from .syntax import syntax_checker
+from .projection import compile_projection
+from .structure import structure_machine
+from .diagnostics import Diagnostics, UNRECOGNIZED_SEGMENT, TOO_MANY_ELEMENTS, INVALID_VALUE, MISSING_SEGMENT, SEGMENT_ORDER, UNSUPPORTED_TRANSACTION, MULTIPLE_TRANSACTIONS
+from .metrics import instrument_parser
+from .events import START_INTERCHANGE, END_INTERCHANGE, START_GROUP, END_GROUP, START_TRANSACTION, END_TRANSACTION, START_LOOP, END_LOOP, SEGMENT as SEGMENT_EVENT, dispatch
 from .debug import Debug
 
+OUTPUT_MODES = ("dict", "record", "lazy")
+
+# Marks a section left out of the parser's projection
+SKIP = object()
+
+# Segments that open or close an interchange, group or transaction set
+ENVELOPE_SEGMENTS = ("ISA", "GS", "ST", "GE", "IEA")
+
+# Envelope segment -> event, for iter_events (ST and SE are handled separately)
+ENVELOPE_EVENTS = {"ISA": START_INTERCHANGE, "GS": START_GROUP, "GE": END_GROUP, "IEA": END_INTERCHANGE}
+
+class StreamState(object):
+    """ The envelope and transaction set being collected from a stream (see EDIParser.collect_segment) """
+    __slots__ = ("delimiters", "envelope", "transaction", "segment_index", "offset", "start_index", "start_offset")
+
+    def __init__(self, delimiters):
+        self.delimiters = delimiters # Of the current interchange
+        self.envelope = {}
+        self.transaction = None
+        # Position of the current segment in the stream, for diagnostics
+        self.segment_index = self.offset = 0
+        self.start_index = self.start_offset = 0
+
+class ParseContext(object):
+    """ The segment list being parsed: the Delimiters it uses and, for
+    diagnostics, the index and character offset of its first segment in the
+    data (either may be None when unknown). Made for each call, so nothing
+    outlives it on the parser and one parser can be shared. """
+    __slots__ = ("edi_segments", "first_index", "first_offset", "delimiters", "element_delimiter", "segment_delimiter", "offsets")
+
+    def __init__(self, edi_segments, first_index, first_offset, delimiters):
+        self.edi_segments = edi_segments
+        self.first_index = first_index
+        self.first_offset = first_offset
+        self.delimiters = delimiters
+        self.element_delimiter = delimiters.element
+        self.segment_delimiter = delimiters.segment
+        self.offsets = None
+
+    def position(self, index):
+        """ Returns (segment index, offset) in the data of the segment at `index` of the list """
+        if self.offsets is None:
+            # Character offset of every segment, computed on the first problem
+            delimiter_length = len(self.segment_delimiter)
+            self.offsets = [0] + list(accumulate(len(segment) + delimiter_length for segment in self.edi_segments))
+        segment_index = self.first_index + index if self.first_index is not None else None
+        offset = self.first_offset + self.offsets[index] if self.first_offset is not None else None
+        return segment_index, offset
+
 class EDIParser(object):
-    def __init__(self, edi_format=None, element_delimiter="^", segment_delimiter="\n", data_delimiter="`"):
-        # Set default delimiters
+    def __init__(self, edi_format=None, element_delimiter="^", segment_delimiter="\n", data_delimiter="`", detect_delimiters=True, output="dict", validate=False, diagnostics=None, metrics=None, projection=None, structure=False):
+        # Set default delimiters (used as they are unless detected per interchange)
         self.element_delimiter = element_delimiter
         self.segment_delimiter = segment_delimiter
         self.data_delimiter = data_delimiter
+        # If set, delimiters are taken from each interchange's ISA header
+        self.detect_delimiters = detect_delimiters
+
+        # Segment output: "dict" (keyed by element ID), "record" or "lazy"
+        # (records that decode elements on first access; see records.py)
+        if output not in OUTPUT_MODES:
+            raise ValueError("Unknown output mode '{}'. Valid modes include: {}".format(output, ", ".join(OUTPUT_MODES)))
+        self.output = output
+
+        # If set, each segment's syntax rules are checked as it is parsed (see syntax.py)
+        self.validate = validate
+        # If set, the structure of each transaction set (segment order, mandatory
+        # segments, uses and loop repeats) is checked before it is parsed (see structure.py)
+        self.structure = structure
+
+        # If set to a Diagnostics collector, problems are recorded there
+        # instead of printed or raised, and parsing carries on
+        self.diagnostics = diagnostics
 
         # Set EDI format to use
         if edi_format in supported_formats:
-            self.edi_format = supported_formats[edi_format]
+            self.compiled_format = get_compiled_format(edi_format)
+            self.edi_format = self.compiled_format.definition
         elif edi_format is None:
             self.edi_format = None
+            self.compiled_format = None
         else:
             raise ValueError("Unsupported EDI format {}".format(edi_format))
 
+        # If set, only the segments and elements it names are parsed (see projection.py)
+        self.projection = projection
+        self._projections = definition_cache() # Compiled format -> compiled projection
+        if projection is not None and self.compiled_format is not None:
+            self.projection_for(self.compiled_format) # Check it against the format now
+
+        # Optional instrumentation (see metrics.py); installed on this instance only
+        self.metrics = metrics
+        if metrics is not None:
+            instrument_parser(self, metrics)
+
     def parse(self, data):
         """ Processes each line in the string `data`, attempting to auto-detect the EDI type.
 
+        If the parser has no EDI format, each transaction set (ST..SE) is
+        parsed with the format named by its ST01 value. The data must hold a
+        single transaction set; use `parse_transactions` for more.
+
         Returns the parsed message as a dict. """
 
+        delimiters = self.delimiters(data)
+
         # Break the message up into chunks
-        edi_segments = data.split(self.segment_delimiter)
+        edi_segments = data.split(delimiters.segment)
 
-        # Eventually, find the ST header and parse the EDI format
-        if self.edi_format is None:
-            raise NotImplementedError("EDI format autodetection not built yet. Please specify an EDI format.")
+        return self.parse_segments(edi_segments, context=ParseContext(edi_segments, 0, 0, delimiters))
 
+    def parse_segments(self, edi_segments, index=0, end=None, context=None):
+        """ Parses the list `edi_segments` from `index` up to `end` in a single pass.
+
+        The list is never copied or re-sliced; a cursor is advanced through it
+        instead, so parse time grows linearly with the number of segments.
+        `context` (a ParseContext) gives the list's delimiters and its place in
+        the data for diagnostics; by default the parser's own delimiters are
+        used and the list starts the data.
+
+        Returns (found_segments, dict) just like `parse`. """
+        if end is None:
+            end = len(edi_segments)
+        if context is None:
+            context = ParseContext(edi_segments, 0, 0, self.delimiters())
+        if self.structure:
+            self.check_structure(edi_segments, index, end, context)
+        element_delimiter = context.element_delimiter
+
+        # Without a fixed format, segments before the first ST are parsed with
+        # that set's format, and every ST switches to the format it names
+        route = self.compiled_format is None
+        compiled_format = self.compiled_format
+        if route:
+            compiled_format = self.find_transaction_format(edi_segments, index, end, element_delimiter)
+        dispatch = compiled_format.root.dispatch
+        projection = self.projection_for(compiled_format)
         to_return = {}
         found_segments = []
-        
-        while len(edi_segments) > 0:
-            segment = edi_segments[0]
+
+        while index < end:
+            segment = edi_segments[index]
             if segment == "":
-                edi_segments = edi_segments[1:]
+                index += 1
                 continue # Line is blank, skip
-            # Capture current segment name
-            segment_name = segment.split(self.element_delimiter)[0]
-            segment_obj = None
-            # Find corresponding segment/loop format
-            for seg_format in self.edi_format:
-                # Check if segment is just a segment, a repeating segment, or part of a loop
-                if seg_format["id"] == segment_name and seg_format["max_uses"] == 1:
-                    # Found a segment
-                    segment_obj = self.parse_segment(segment, seg_format)
-                    edi_segments = edi_segments[1:]
-                    break
-                elif seg_format["id"] == segment_name and seg_format["max_uses"] > 1:
-                    # Found a repeating segment
-                    segment_obj, edi_segments = self.parse_repeating_segment(edi_segments, seg_format)
-                    break
-                elif seg_format["id"] == "L_" + segment_name:
-                    # Found a loop
-                    segment_name = seg_format["id"]
-                    segment_obj, edi_segments = self.parse_loop(edi_segments, seg_format)
-                    break
-                
-            if segment_obj is None:
-                Debug.log_error("Unrecognized segment: {}".format(segment))
-                edi_segments = edi_segments[1:] # Skipping segment
+            # Look up the corresponding segment/loop format by segment name
+            segment_name = segment.split(element_delimiter, 1)[0]
+            if segment_name == "ST" and "ST" in to_return:
+                # A second set would overwrite the first one's segments
+                message = "Data holds more than one transaction set (another ST at segment {}); use parse_transactions or parse_stream to parse each one".format(index)
+                if self.diagnostics is None:
+                    raise ValueError(message)
+                self.report(MULTIPLE_TRANSACTIONS, message, index, segment_name, context=context)
+                index = self.skip_transaction(edi_segments, index, end, element_delimiter)
+                continue
+            if route and segment_name == "ST":
+                compiled_format = self.transaction_format(segment, element_delimiter)
+                dispatch = compiled_format.root.dispatch
+                projection = self.projection_for(compiled_format)
+            section = dispatch.get(segment_name)
+            if section is None:
+                if self.diagnostics is not None:
+                    self.report(UNRECOGNIZED_SEGMENT, "Unrecognized segment: {}".format(segment), index, segment_name, context=context)
+                else:
+                    Debug.log_error("Unrecognized segment: {}".format(segment))
+                index += 1 # Skipping segment
                 continue
                 # raise ValueError
 
-            found_segments.append(segment_name)
-            to_return[segment_name] = segment_obj
-
+            if projection is None:
+                segment_obj, index = self.parse_section(edi_segments, index, section, end, None, context)
+            else:
+                wanted = projection.get(section.id, SKIP)
+                if wanted is SKIP:
+                    index = self.skip_section(edi_segments, index, section, end, element_delimiter)
+                    continue
+                segment_obj, index = self.parse_section(edi_segments, index, section, end, wanted, context)
+            found_segments.append(section.id)
+            to_return[section.id] = segment_obj
 
         return found_segments, to_return
 
-    def parse_segment(self, segment, segment_format):
-        """ Parse a segment into a dict according to field IDs """
-        fields = segment.split(self.element_delimiter)
+    def parse_stream(self, source, chunk_size=DEFAULT_CHUNK_SIZE, encoding="utf-8"):
+        """ Parses an interchange incrementally from `source`, which may be a file
+        path, a file object (text or binary) or an iterable of str/bytes chunks.
+
+        Yields one (found_segments, dict) tuple per transaction set (ST..SE),
+        shaped like the output of `parse`: the enclosing ISA and GS segments are
+        included, the GE and IEA trailers are not. Only one transaction set is
+        held in memory at a time.
+
+        If the parser has no EDI format, each transaction set is parsed with
+        the format named by its ST01 value. """
+        state = StreamState(self.delimiters())
+        for segment in iter_segments(source, self.segment_delimiter, chunk_size, encoding, self.detect_delimiters):
+            transaction = self.collect_segment(state, segment)
+            if transaction is not None:
+                yield self.parse_transaction(*transaction)
+        self.end_stream(state)
+
+    async def parse_async(self, source, chunk_size=DEFAULT_CHUNK_SIZE, encoding="utf-8"):
+        """ Like `parse_stream`, for an asyncio.StreamReader or an async iterable of
+        str/bytes chunks (see aio.py): an async generator yielding each
+        transaction set as soon as its SE segment arrives """
+        state = StreamState(self.delimiters())
+        async for segment in aio.iter_segments(source, self.segment_delimiter, chunk_size, encoding, self.detect_delimiters):
+            transaction = self.collect_segment(state, segment)
+            if transaction is not None:
+                yield self.parse_transaction(*transaction)
+        self.end_stream(state)
+
+    def collect_segment(self, state, segment):
+        """ Adds the next segment of a stream to `state` (a StreamState). Returns
+        (envelope, segments, context) once a transaction set is complete, ready
+        for `parse_transaction`, and None otherwise. """
+        if segment[:3] == "ISA":
+            state.delimiters = self.delimiters(segment)
+        segment_name = segment.split(state.delimiters.element, 1)[0]
+        completed = None
+        if state.transaction is not None:
+            state.transaction.append(segment)
+            if segment_name == "SE":
+                context = ParseContext(state.transaction, state.start_index, state.start_offset, state.delimiters)
+                completed = (state.envelope, state.transaction, context)
+                state.transaction = None
+        elif segment_name == "ST":
+            state.transaction = [segment]
+            state.start_index, state.start_offset = state.segment_index, state.offset
+        elif segment_name in ("ISA", "GS"):
+            if segment_name == "ISA":
+                # New interchange; the previous functional group is closed
+                state.envelope = {}
+            # Kept raw until the transaction set's format is known
+            state.envelope[segment_name] = segment
+        elif segment_name in ("GE", "IEA", ""):
+            pass # Envelope trailers and blank lines carry nothing to yield
+        elif self.diagnostics is not None:
+            self.diagnostics.add(UNRECOGNIZED_SEGMENT, "Unrecognized segment outside of a transaction set: {}".format(segment), state.segment_index, state.offset, segment_name)
+        else:
+            Debug.log_error("Unrecognized segment outside of a transaction set: {}".format(segment))
+        state.segment_index += 1
+        state.offset += len(segment) + len(state.delimiters.segment)
+        return completed
+
+    def end_stream(self, state):
+        """ Checks that a stream did not end inside a transaction set """
+        if state.transaction is not None:
+            raise ValueError("Data ended inside transaction set {} (no SE segment found)".format(state.transaction[0]))
+
+    def iter_events(self, source, chunk_size=DEFAULT_CHUNK_SIZE, encoding="utf-8", decode=False):
+        """ Parses an interchange from `source` (anything `parse_stream` accepts)
+        into a flat sequence of (event, name, fields) tuples instead of a tree;
+        see events.py. No containers are built beyond each segment's fields.
+
+        With `decode` set, the fields of `segment` events are decoded by the
+        format definition (as `parse` would output the segment); envelope
+        events always carry the raw fields. If the parser has no EDI format,
+        each transaction set uses the format named by its ST01 value. """
+        levels = None # Open loops of the current transaction set, its top level first
+        # Position of the current segment in the stream, for diagnostics
+        segment_index = offset = 0
+        delimiters = self.delimiters()
+        context = ParseContext((), None, None, delimiters)
+
+        for segment in iter_segments(source, self.segment_delimiter, chunk_size, encoding, self.detect_delimiters):
+            if segment[:3] == "ISA":
+                delimiters = self.delimiters(segment)
+                context = ParseContext((), None, None, delimiters)
+            fields = segment.split(delimiters.element)
+            segment_name = fields[0]
+            if levels is not None and segment_name not in ("SE", ""):
+                # Close loops until one (or the top level) has this segment, as parse_loop does
+                level = levels[-1]
+                section = level.dispatch.get(segment_name)
+                while section is None and len(levels) > 1:
+                    levels.pop()
+                    yield (END_LOOP, level.id, None)
+                    level = levels[-1]
+                    section = level.dispatch.get(segment_name)
+                if section is None:
+                    if self.diagnostics is not None:
+                        self.diagnostics.add(UNRECOGNIZED_SEGMENT, "Unrecognized segment: {}".format(segment), segment_index, offset, segment_name)
+                    else:
+                        Debug.log_error("Unrecognized segment: {}".format(segment))
+                else:
+                    if level.id is not None and section.id == level.first.id:
+                        # Beginning a new iteration of the current loop
+                        yield (END_LOOP, level.id, None)
+                        yield (START_LOOP, level.id, None)
+                    while section.kind == LOOP:
+                        yield (START_LOOP, section.id, None)
+                        levels.append(section.loop)
+                        section = section.loop.first
+                    if decode:
+                        fields = self.parse_segment(segment, section.definition, None, context)
+                    yield (SEGMENT_EVENT, segment_name, fields)
+            elif segment_name == "SE":
+                if levels is None:
+                    raise ValueError("SE segment outside of a transaction set: {}".format(segment))
+                for level in reversed(levels[1:]):
+                    yield (END_LOOP, level.id, None)
+                levels = None
+                yield (END_TRANSACTION, segment_name, fields)
+            elif segment_name == "ST":
+                compiled_format = self.compiled_format
+                if compiled_format is None:
+                    compiled_format = self.transaction_format(segment, delimiters.element)
+                levels = [compiled_format.root]
+                yield (START_TRANSACTION, segment_name, fields)
+            elif segment_name in ENVELOPE_EVENTS:
+                yield (ENVELOPE_EVENTS[segment_name], segment_name, fields)
+            elif segment_name == "":
+                pass # Blank line
+            elif self.diagnostics is not None:
+                self.diagnostics.add(UNRECOGNIZED_SEGMENT, "Unrecognized segment outside of a transaction set: {}".format(segment), segment_index, offset, segment_name)
+            else:
+                Debug.log_error("Unrecognized segment outside of a transaction set: {}".format(segment))
+            segment_index += 1
+            offset += len(segment) + len(delimiters.segment)
+
+        if levels is not None:
+            raise ValueError("Data ended inside a transaction set (no SE segment found)")
+
+    def parse_events(self, source, handler, chunk_size=DEFAULT_CHUNK_SIZE, encoding="utf-8", decode=False):
+        """ Like `iter_events`, calling the matching method of `handler` (an
+        events.EventHandler) for each event """
+        dispatch(self.iter_events(source, chunk_size, encoding, decode), handler)
+
+    def parse_mapped(self, path, encoding="utf-8"):
+        """ Like `parse_stream`, for a file on disk that is memory-mapped instead
+        of read (see mapped.py). Transaction sets are located by searching the
+        mapped bytes and only their segments, plus the ISA and GS segments
+        enclosing them, are decoded; anything else between them is skipped
+        without being reported. Diagnostics carry byte offsets but no segment
+        index. """
+        with MappedFile(path, encoding, self.element_delimiter, self.segment_delimiter, self.data_delimiter, self.detect_delimiters) as mapped:
+            for interchange in mapped.interchanges():
+                delimiters = interchange.delimiters
+                for envelope, start, end in mapped.transactions(interchange):
+                    transaction = mapped.text(start, end).split(delimiters.segment)
+                    yield self.parse_transaction(envelope, transaction, ParseContext(transaction, None, start, delimiters))
+
+    def parse_range(self, path, start, end, encoding="utf-8", delimiters=None):
+        """ Parses bytes `start` to `end` of the file at `path` as `parse` would,
+        without reading the rest of the file. The offsets usually come from an
+        index.OffsetIndex; pass the interchange's `delimiters` (a
+        delimiters.Delimiters) if the range does not begin with its ISA header. """
+        data = read_range(path, start, end, encoding)
+        delimiters = self.delimiters(data, delimiters)
+        edi_segments = data.split(delimiters.segment)
+        return self.parse_segments(edi_segments, context=ParseContext(edi_segments, None, start, delimiters))
+
+    def parse_columns(self, data, elements, loop=None, segment=None, backend="array"):
+        """ Extracts `elements` (element IDs) of a loop or repeated segment in the
+        string `data` into columns, one value per row, instead of nested dicts.
+
+        `parse_columns(data, ["IT102", "IT104", "IT107"], loop="L_IT1")` gives
+        the quantity, unit price and product ID of every line item. Numeric
+        columns are array.array (or NumPy arrays with backend="numpy"); see
+        columnar.ColumnExtractor for how rows are formed. """
+        delimiters = self.delimiters(data)
+        edi_segments = data.split(delimiters.segment)
+        compiled_format = self.compiled_format
+        if compiled_format is None:
+            compiled_format = self.find_transaction_format(edi_segments, 0, len(edi_segments), delimiters.element)
+        extractor = ColumnExtractor(compiled_format, elements, loop, segment, backend)
+        return extractor.extract(edi_segments, delimiters.element)
+
+    def delimiters(self, data=None, delimiters=None):
+        """ Returns the Delimiters to parse `data` (text starting with an ISA header,
+        or None) with: `delimiters` if given, those of its ISA header if the
+        parser detects them, else the parser's own. The parser itself is not
+        changed, so detected delimiters last only for the call using them. """
+        if delimiters is None and data is not None and self.detect_delimiters:
+            delimiters = sniff_delimiters(data)
+        if delimiters is None:
+            return Delimiters(self.element_delimiter, self.segment_delimiter, self.data_delimiter)
+        if delimiters.segment is None:
+            delimiters = delimiters._replace(segment=self.segment_delimiter)
+        return delimiters
+
+    def report(self, rule, message, index=None, segment_id=None, element_id=None, definition=None, context=None):
+        """ Records a problem with the segment at `index` of the segment list
+        `context` (a ParseContext) describes """
+        segment_index = offset = None
+        if index is not None and context is not None:
+            segment_index, offset = context.position(index)
+        self.diagnostics.add(rule, message, segment_index, offset, segment_id, element_id, definition)
+
+    def use_delimiters(self, delimiters):
+        """ Makes `delimiters` (a delimiters.Delimiters) the parser's own, for data
+        without an ISA header to detect them from """
+        if delimiters is None:
+            return
+        self.element_delimiter = delimiters.element
+        self.data_delimiter = delimiters.component
+        if delimiters.segment is not None:
+            self.segment_delimiter = delimiters.segment
+
+    def check_structure(self, edi_segments, index=0, end=None, context=None):
+        """ Runs each transaction set (ST..SE) in `edi_segments` through the
+        structure machine of its format. Problems are recorded as diagnostics
+        or, without a collector, the first one is raised as a ValueError. """
+        if end is None:
+            end = len(edi_segments)
+        if context is None:
+            context = ParseContext(edi_segments, 0, 0, self.delimiters())
+        element_delimiter = context.element_delimiter
+        def report(rule, message, segment_id, definition):
+            if self.diagnostics is None:
+                if definition is not None:
+                    Debug.explain(definition)
+                raise ValueError(message)
+            self.report(rule, message, index, segment_id, None, definition, context)
+
+        cursor = None
+        while index < end:
+            segment_name = edi_segments[index].split(element_delimiter, 1)[0]
+            if segment_name == "ST":
+                compiled_format = self.compiled_format
+                if compiled_format is None:
+                    compiled_format = self.transaction_format(edi_segments[index], element_delimiter)
+                cursor = structure_machine(compiled_format).cursor(report)
+            if cursor is not None and segment_name != "":
+                cursor.advance(segment_name)
+                if segment_name == "SE":
+                    cursor.finish()
+                    cursor = None
+            index += 1
+        if cursor is not None:
+            cursor.finish()
+
+    def validate_stream(self, source, chunk_size=DEFAULT_CHUNK_SIZE, encoding="utf-8"):
+        """ Checks an interchange from `source` (anything `parse_stream` accepts)
+        in one pass without parsing it: envelope nesting, the structure of each
+        transaction set (see structure.py), element counts and syntax rules.
+        Element values are not decoded.
+
+        Returns the parser's Diagnostics collector (or a new one) holding every
+        problem found; nothing is raised for problems in the data. """
+        diagnostics = self.diagnostics if self.diagnostics is not None else Diagnostics()
+        segment_index = offset = 0
+        delimiters = self.delimiters()
+        def report(rule, message, segment_id=None, definition=None):
+            diagnostics.add(rule, message, segment_index, offset, segment_id, None, definition)
+
+        interchange = group = False
+        cursor = None # Structure of the current transaction set
+        skipping = False # Inside a transaction set of an unsupported type
+        for segment in iter_segments(source, self.segment_delimiter, chunk_size, encoding, self.detect_delimiters):
+            if segment[:3] == "ISA":
+                delimiters = self.delimiters(segment)
+            element_delimiter = delimiters.element
+            segment_name = segment.split(element_delimiter, 1)[0]
+            if (cursor is not None or skipping) and segment_name in ENVELOPE_SEGMENTS:
+                report(MISSING_SEGMENT, "Transaction set has no SE segment", segment_name)
+                if cursor is not None:
+                    cursor.finish()
+                cursor, skipping = None, False
+
+            if cursor is not None:
+                section = cursor.advance(segment_name)
+                if section is not None:
+                    segment_format = section.definition
+                    if segment.count(element_delimiter) > len(segment_format["elements"]):
+                        report(TOO_MANY_ELEMENTS, "Segment has more elements than segment definition", segment_name, segment_format)
+                    check = syntax_checker(segment_format)
+                    if check is not None:
+                        broken = check(segment.split(element_delimiter))
+                        if broken is not None:
+                            report(broken.rule, broken.message, segment_name, segment_format)
+                if segment_name == "SE":
+                    cursor.finish()
+                    cursor = None
+            elif skipping:
+                skipping = segment_name != "SE"
+            elif segment_name == "ST":
+                if not group:
+                    report(SEGMENT_ORDER, "Transaction set outside of a functional group", segment_name)
+                try:
+                    compiled_format = self.compiled_format or self.transaction_format(segment, element_delimiter)
+                except ValueError as e:
+                    report(UNSUPPORTED_TRANSACTION, str(e), segment_name)
+                    skipping = True
+                else:
+                    cursor = structure_machine(compiled_format).cursor(report)
+                    cursor.advance(segment_name)
+            elif segment_name == "ISA":
+                if interchange:
+                    report(MISSING_SEGMENT, "Interchange has no IEA segment", segment_name)
+                interchange, group = True, False
+            elif segment_name == "GS":
+                if not interchange:
+                    report(SEGMENT_ORDER, "Functional group outside of an interchange", segment_name)
+                elif group:
+                    report(MISSING_SEGMENT, "Functional group has no GE segment", segment_name)
+                group = True
+            elif segment_name == "GE":
+                if not group:
+                    report(SEGMENT_ORDER, "GE segment outside of a functional group", segment_name)
+                group = False
+            elif segment_name == "IEA":
+                if not interchange:
+                    report(SEGMENT_ORDER, "IEA segment outside of an interchange", segment_name)
+                elif group:
+                    report(MISSING_SEGMENT, "Functional group has no GE segment", segment_name)
+                interchange = group = False
+            elif segment_name != "":
+                report(UNRECOGNIZED_SEGMENT, "Unrecognized segment outside of a transaction set: {}".format(segment), segment_name)
+            segment_index += 1
+            offset += len(segment) + len(delimiters.segment)
+
+        if cursor is not None or skipping:
+            report(MISSING_SEGMENT, "Data ended inside a transaction set (no SE segment found)")
+            if cursor is not None:
+                cursor.finish()
+        elif group:
+            report(MISSING_SEGMENT, "Data ended inside a functional group (no GE segment found)")
+        elif interchange:
+            report(MISSING_SEGMENT, "Data ended inside an interchange (no IEA segment found)")
+        return diagnostics
+
+    def parse_transactions(self, data):
+        """ Like `parse_stream`, but for an interchange already held in the string `data` """
+        return self.parse_stream([data])
+
+    def parse_transaction(self, envelope, edi_segments, context=None):
+        """ Parses the ST..SE segments of one transaction set, prefixed with the
+        `envelope` segments (a dict of raw ISA/GS segment strings). `context`
+        gives their delimiters and place in the data, as for `parse_segments`. """
+        if context is None:
+            context = ParseContext(edi_segments, 0, 0, self.delimiters())
+        compiled_format = self.compiled_format
+        if compiled_format is None:
+            compiled_format = self.transaction_format(edi_segments[0], context.element_delimiter)
+        dispatch = compiled_format.root.dispatch
+        projection = self.projection_for(compiled_format)
+
+        found_segments = []
+        to_return = {}
+        for segment_name, segment in envelope.items():
+            if segment_name in dispatch:
+                if projection is None:
+                    segment_obj = self.parse_segment(segment, dispatch[segment_name].definition, None, context)
+                elif segment_name not in projection:
+                    continue
+                elif projection[segment_name] is None:
+                    segment_obj = self.parse_segment(segment, dispatch[segment_name].definition, None, context)
+                else:
+                    segment_obj = self.project_segment(segment, projection[segment_name], None, context)
+                found_segments.append(segment_name)
+                to_return[segment_name] = segment_obj
+        transaction_segments, edi_data = self.parse_segments(edi_segments, 0, None, context)
+        to_return.update(edi_data)
+        return found_segments + transaction_segments, to_return
+
+    def transaction_format(self, segment, element_delimiter=None):
+        """ Returns the compiled format named by ST01 in the ST segment `segment` """
+        fields = segment.split(element_delimiter or self.element_delimiter, 2)
+        ts_id = fields[1] if len(fields) > 1 else ""
+        if ts_id not in supported_formats:
+            raise ValueError("Transaction set type '{}' is not supported. Valid types include: {}".format(
+                ts_id,
+                "".join(["\n - " + f for f in supported_formats])
+            ))
+        return get_compiled_format(ts_id)
+
+    def skip_transaction(self, edi_segments, index, end, element_delimiter):
+        """ Returns the index just past the SE segment closing the transaction set at `index` """
+        while index < end:
+            index += 1
+            if edi_segments[index - 1].split(element_delimiter, 1)[0] == "SE":
+                break
+        return index
+
+    def find_transaction_format(self, edi_segments, index, end, element_delimiter=None):
+        """ Returns the compiled format of the first transaction set between `index` and `end` """
+        element_delimiter = element_delimiter or self.element_delimiter
+        while index < end:
+            segment = edi_segments[index]
+            if segment.split(element_delimiter, 1)[0] == "ST":
+                return self.transaction_format(segment, element_delimiter)
+            index += 1
+        raise ValueError("No transaction set header found in data.")
+
+    def parse_segment(self, segment, segment_format, index=None, context=None):
+        """ Parse a segment into a dict according to field IDs (or a record, see `output`).
+
+        `index` is the segment's position in the list `context` describes,
+        used for diagnostics; without a context the parser's own delimiters
+        are used. """
+        element_delimiter = context.element_delimiter if context is not None else self.element_delimiter
+        fields = self.check_fields(segment.split(element_delimiter), segment_format, index, context)
+
+        if self.output == "lazy":
+            return lazy_record_class(segment_format, decode_element)(fields)
+        elif self.diagnostics is not None:
+            values = self.decode_fields(fields, segment_format, index, context)
+            if self.output == "record":
+                return record_class(segment_format)(values)
+            return dict(zip([key for key, decode in segment_decoders(segment_format)], values))
+        elif self.output == "record":
+            return record_class(segment_format)(decode(field) for field, (key, decode) in zip(fields[1:], segment_decoders(segment_format)))
+
+        #segment_name = fields[0]
+        to_return = {}
+        for field, (key, decode) in zip(fields[1:], segment_decoders(segment_format)): # Skip the segment name field
+            to_return[key] = decode(field)
+
+        return to_return
+
+    def check_fields(self, fields, segment_format, index=None, context=None):
+        """ Checks a split segment against its definition (and its syntax rules, if
+        validating), returning the fields to decode """
         if fields[0] != segment_format["id"]:
             raise TypeError("Segment type {} does not match provided segment format {}".format(fields[0], segment_format["id"]))
         elif len(fields)-1 > len(segment_format["elements"]):
-            Debug.explain(segment_format)
-            raise TypeError("Segment has more elements than segment definition")
+            if self.diagnostics is None:
+                Debug.explain(segment_format)
+                raise TypeError("Segment has more elements than segment definition")
+            self.report(TOO_MANY_ELEMENTS, "Segment has more elements than segment definition", index, fields[0], None, segment_format, context)
+            fields = fields[:len(segment_format["elements"]) + 1]
+        if self.validate:
+            check = syntax_checker(segment_format)
+            broken = check(fields) if check is not None else None
+            if broken is not None:
+                if self.diagnostics is None:
+                    Debug.explain(segment_format)
+                    raise ValueError(broken.message)
+                self.report(broken.rule, broken.message, index, fields[0], None, segment_format, context)
+        return fields
 
-        #segment_name = fields[0]
-        to_return = {}
-        for field, element in zip(fields[1:], segment_format["elements"]): # Skip the segment name field
-            key = element["id"]
-            if element["data_type"] == "DT":
-                if len(field) == 8:
-                    value = datetime.datetime.strptime(field, "%Y%m%d")
-                elif len(field) == 6:
-                    value = datetime.datetime.strptime(field, "%y%m%d")
-                else:
-                    value = field
-            elif element["data_type"] == "TM":
-                if len(field) == 4:
-                    value = datetime.datetime.strptime(field, "%H%M")
-                elif len(field) == 6:
-                    value = datetime.datetime.strptime(field, "%H%M%S")
-            elif element["data_type"] == "N0" and field != "":
-                value = int(field)
-            elif element["data_type"].startswith("N") and field != "":
-                value = float(field) / (10**int(element["data_type"][-1]))
-            elif element["data_type"] == "R" and field != "":
-                value = float(field)
-            else:
-                value = field
-            to_return[key] = value
+    def project_segment(self, segment, projection, index=None, context=None):
+        """ Parses only the elements selected by `projection` (a
+        projection.SegmentProjection) of a segment. Outputs a dict of just those
+        elements, or a record with None for the rest; lazy records decode on
+        access anyway, so get every element. """
+        segment_format = projection.definition
+        element_delimiter = context.element_delimiter if context is not None else self.element_delimiter
+        if self.validate or self.output == "lazy":
+            # Syntax rules look at every element
+            fields = self.check_fields(segment.split(element_delimiter), segment_format, index, context)
+            if self.output == "lazy":
+                return lazy_record_class(segment_format, decode_element)(fields)
+        else:
+            fields = segment.split(element_delimiter, projection.maxsplit)
+            if fields[0] != projection.segment_id:
+                raise TypeError("Segment type {} does not match provided segment format {}".format(fields[0], projection.segment_id))
 
+        to_return = {}
+        for key, position, decode in projection.elements:
+            if position >= len(fields):
+                break # Elements missing from the end of the segment
+            try:
+                to_return[key] = decode(fields[position])
+            except ValueError as e:
+                if self.diagnostics is None:
+                    raise
+                self.report(INVALID_VALUE, "Invalid value for element {}: {}".format(key, e), index, fields[0], key, segment_format, context)
+                to_return[key] = fields[position]
+        if self.output == "record":
+            return record_class(segment_format)(to_return.get(key) for key, decode in segment_decoders(segment_format))
         return to_return
 
+    def projection_for(self, compiled_format):
+        """ Returns the parser's projection compiled for `compiled_format`, or None """
+        if self.projection is None:
+            return None
+        projection = self._projections.get(compiled_format)
+        if projection is None:
+            projection = self._projections.set(compiled_format, compile_projection(compiled_format.root, self.projection))
+        return projection
 
-    def parse_repeating_segment(self, edi_segments, segment_format):
-        """ Parse all instances of this segment, and return any remaining segments with the seg_list """
+    def decode_fields(self, fields, segment_format, index=None, context=None):
+        """ Decodes a split segment's element values, recording any that can't be
+        converted as diagnostics and keeping their raw strings """
+        values = []
+        for field, (key, decode) in zip(fields[1:], segment_decoders(segment_format)):
+            try:
+                values.append(decode(field))
+            except ValueError as e:
+                self.report(INVALID_VALUE, "Invalid value for element {}: {}".format(key, e), index, fields[0], key, segment_format, context)
+                values.append(field)
+        return values
+
+    def parse_repeating_segment(self, edi_segments, index, segment_format, end=None, projection=None, context=None):
+        """ Parse all instances of this segment starting at `index`, and return the seg_list with the index of the next unparsed segment """
+        if end is None:
+            end = len(edi_segments)
+        element_delimiter = context.element_delimiter if context is not None else self.element_delimiter
         seg_list = []
 
-        while len(edi_segments) > 0:
-            segment = edi_segments[0]
-            segment_name = segment.split(self.element_delimiter)[0]
+        while index < end:
+            segment = edi_segments[index]
+            segment_name = segment.split(element_delimiter, 1)[0]
             if segment_name != segment_format["id"]:
                 break
-            seg_list.append(self.parse_segment(segment, segment_format))
-            edi_segments = edi_segments[1:]
+            if projection is None:
+                seg_list.append(self.parse_segment(segment, segment_format, index, context))
+            else:
+                seg_list.append(self.project_segment(segment, projection, index, context))
+            index += 1
 
-        return seg_list, edi_segments
+        return seg_list, index
 
-    def parse_loop(self, edi_segments, loop_format):
-        """ Parse all segments that are part of this loop, and return any remaining segments with the loop_list """
+    def parse_loop(self, edi_segments, index, loop, end=None, projection=None, context=None):
+        """ Parse all segments that are part of the compiled `loop` starting at `index`, and return the loop_list with the index of the next unparsed segment """
+        if end is None:
+            end = len(edi_segments)
+        if context is None:
+            context = ParseContext(edi_segments, 0, 0, self.delimiters())
+        element_delimiter = context.element_delimiter
+        dispatch = loop.dispatch
+        first_id = loop.first.id
         loop_list = []
-        loop_dict = {}
-
-        while len(edi_segments) > 0:
-            segment = edi_segments[0]
-            segment_name = segment.split(self.element_delimiter)[0]
-            segment_obj = None
-
-            # Find corresponding segment/loop format
-            for seg_format in loop_format["segments"]:
-                # Check if segment is just a segment, a repeating segment, or part of a loop
-                if seg_format["id"] == segment_name and seg_format["max_uses"] == 1:
-                    # Found a segment
-                    segment_obj = self.parse_segment(segment, seg_format)
-                    edi_segments = edi_segments[1:]
-                elif seg_format["id"] == segment_name and seg_format["max_uses"] > 1:
-                    # Found a repeating segment
-                    segment_obj, edi_segments = self.parse_repeating_segment(edi_segments, seg_format)
-                elif seg_format["id"] == "L_" + segment_name:
-                    # Found a loop
-                    segment_name = seg_format["id"]
-                    segment_obj, edi_segments = self.parse_loop(edi_segments, seg_format)
-            #print(segment_name, segment_obj)
-            if segment_obj is None:
+        loop_dict = None
+
+        while index < end:
+            segment = edi_segments[index]
+            section = dispatch.get(segment.split(element_delimiter, 1)[0])
+            if section is None:
                 # Reached the end of valid segments; return what we have
                 break
-            elif segment_name == loop_format["segments"][0]["id"] and loop_dict != {}: 
+            if section.id == first_id or loop_dict is None:
                 # Beginning a new loop, tie off this one and start fresh
-                loop_list.append(loop_dict.copy())
+                if loop_dict is not None:
+                    loop_list.append(loop_dict)
                 loop_dict = {}
-            loop_dict[segment_name] = segment_obj
-        if loop_dict != {}:
-            loop_list.append(loop_dict.copy())
-        return loop_list, edi_segments
+            if projection is None:
+                segment_obj, index = self.parse_section(edi_segments, index, section, end, None, context)
+            else:
+                wanted = projection.get(section.id, SKIP)
+                if wanted is SKIP:
+                    index = self.skip_section(edi_segments, index, section, end, element_delimiter)
+                    continue
+                segment_obj, index = self.parse_section(edi_segments, index, section, end, wanted, context)
+            loop_dict[section.id] = segment_obj
+        if loop_dict is not None:
+            loop_list.append(loop_dict)
+        return loop_list, index
+
+    def parse_section(self, edi_segments, index, section, end, projection=None, context=None):
+        """ Parse the compiled `section` (a segment, repeating segment or loop) found
+        at `index`, limited to `projection` if one is given """
+        if section.kind == SEGMENT:
+            if projection is not None:
+                return self.project_segment(edi_segments[index], projection, index, context), index + 1
+            return self.parse_segment(edi_segments[index], section.definition, index, context), index + 1
+        elif section.kind == REPEATING_SEGMENT:
+            return self.parse_repeating_segment(edi_segments, index, section.definition, end, projection, context)
+        return self.parse_loop(edi_segments, index, section.loop, end, projection, context)
+
+    def skip_section(self, edi_segments, index, section, end, element_delimiter):
+        """ Returns the index after the compiled `section` found at `index`, reading
+        only segment IDs """
+        if section.kind == SEGMENT:
+            return index + 1
+        if section.kind == REPEATING_SEGMENT:
+            segment_id = section.id
+            index += 1
+            while index < end and edi_segments[index].split(element_delimiter, 1)[0] == segment_id:
+                index += 1
+            return index
+        dispatch = section.loop.dispatch
+        while index < end:
+            inner = dispatch.get(edi_segments[index].split(element_delimiter, 1)[0])
+            if inner is None:
+                break
+            index = self.skip_section(edi_segments, index, inner, end, element_delimiter) if inner.kind == LOOP else index + 1
+        return index
@@ -0,0 +1,120 @@
+"""
+Writes EDI messages to a file-like sink as they are built, keeping running
+segment counts and control numbers for the envelope trailers.
+"""
+
+import io
+
+from .EDIGenerator import EDIGenerator
+
+class ControlNumbers(object):
+    """ Tracks envelope state while a message is generated.
+
+    Fills in SE, GE and IEA trailers (or the missing values in them) from
+    the segments seen so far, and assigns ST02 when it is left as None. """
+    def __init__(self, first_transaction_number=1):
+        self.next_transaction_number = first_transaction_number
+        self.interchange_control_number = None # ISA13
+        self.group_control_number = None       # GS06
+        self.transaction_control_number = None # ST02
+        self.group_count = 0       # Functional groups in the current interchange
+        self.transaction_count = 0 # Transaction sets in the current group
+        self.segment_count = 0     # Segments in the current transaction set, ST included
+
+    def segment(self, segment_id, segment_data):
+        """ Called for each segment in the format before it is built. Returns the
+        (possibly completed) segment data, or None if the segment is omitted. """
+        if segment_data is None and segment_id in ("ISA", "GS", "ST"):
+            # Nothing to track; the generator reports the missing segment
+            return None
+        if segment_id == "ISA":
+            self.group_count = 0
+            self.interchange_control_number = segment_data[12]
+        elif segment_id == "GS":
+            self.group_count += 1
+            self.transaction_count = 0
+            self.group_control_number = segment_data[5]
+        elif segment_id == "ST":
+            self.segment_count = 0
+            if len(segment_data) < 2 or segment_data[1] is None:
+                segment_data = [segment_data[0], "{:04d}".format(self.next_transaction_number)] + list(segment_data[2:])
+                self.next_transaction_number += 1
+            self.transaction_control_number = segment_data[1]
+        elif segment_id == "SE":
+            segment_data = self.fill(segment_data, [self.segment_count + 1, self.transaction_control_number])
+            self.transaction_count += 1
+        elif segment_id == "GE":
+            segment_data = self.fill(segment_data, [self.transaction_count, self.group_control_number])
+        elif segment_id == "IEA":
+            segment_data = self.fill(segment_data, [self.group_count, self.interchange_control_number])
+
+        if segment_data is not None:
+            self.segment_count += 1
+        return segment_data
+
+    def fill(self, segment_data, computed):
+        """ Replaces missing values in `segment_data` with the `computed` ones """
+        if segment_data is None:
+            return computed
+        segment_data = list(segment_data)
+        for index, value in enumerate(computed):
+            if index >= len(segment_data):
+                segment_data.append(value)
+            elif segment_data[index] is None:
+                segment_data[index] = value
+        return segment_data
+
+class EDIWriter(object):
+    """ Builds EDI messages segment by segment straight into `sink`.
+
+    `sink` is anything with a `write` method. Text is written unless an
+    `encoding` is given, in which case each segment is encoded to bytes
+    first (for binary files and sockets). Every segment is followed by the
+    segment delimiter of its build (see EDIGenerator.delimiters). """
+    def __init__(self, sink, generator=None, encoding=None):
+        self.sink = sink
+        self.generator = generator if generator is not None else EDIGenerator()
+        self.encoding = encoding
+        self.control = ControlNumbers()
+        self.segments_written = 0
+
+    def write(self, data, delimiters=None):
+        """ Builds the transaction set `data` (as accepted by EDIGenerator.build)
+        into the sink. Loop iterations may be generators. SE, GE and IEA may be
+        omitted or contain None values; they are filled in from running counts.
+        `delimiters` overrides the generator's for this transaction set. """
+        delimiters = self.generator.delimiters(data, delimiters)
+        for segment in self.generator.iter_segments(data, self.control, delimiters=delimiters):
+            self.write_segment_string(segment, delimiters.segment)
+
+    def write_interchange(self, envelope, transactions, delimiters=None):
+        """ Builds one interchange holding every transaction set in the iterable
+        `transactions` into the sink (see EDIGenerator.iter_interchange).
+
+        `envelope` holds the ISA and GS segments; GE and IEA may be left out.
+        Each set's ST02 may be None to number the sets 0001, 0002, ...; SE may
+        be left out. `delimiters` overrides the generator's for this interchange. """
+        delimiters = self.generator.delimiters(envelope, delimiters)
+        for segment in self.generator.iter_interchange(envelope, transactions, self.control, delimiters=delimiters):
+            self.write_segment_string(segment, delimiters.segment)
+
+    def write_segment_string(self, segment, terminator=None):
+        """ Writes an already built segment and its terminator (by default the
+        generator's segment delimiter) to the sink """
+        segment += terminator if terminator is not None else self.generator.segment_delimiter
+        if self.encoding is not None:
+            segment = segment.encode(self.encoding)
+        self.sink.write(segment)
+        self.segments_written += 1
+
+    def flush(self):
+        """ Flushes the sink, if it supports flushing """
+        if hasattr(self.sink, "flush"):
+            self.sink.flush()
+
+def build_interchange(envelope, transactions, generator=None, delimiters=None):
+    """ Returns one interchange holding every transaction set in `transactions`
+    as a string, with control numbers and trailer counts filled in """
+    sink = io.StringIO()
+    EDIWriter(sink, generator).write_interchange(envelope, transactions, delimiters)
+    return sink.getvalue()
@@ -10,6 +10,10 @@ import os
 
 from .EDIGenerator import EDIGenerator, Debug, supported_formats
 from .EDIParser import EDIParser
+from .EDIWriter import EDIWriter, build_interchange
+from .aio import AsyncEDIWriter
+from .diagnostics import Diagnostics
+from .metrics import Metrics
 
 def explain(edi_format, section_id=""):
     """ Explains the referenced section of the referenced EDI format.
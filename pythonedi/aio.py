@@ -0,0 +1,91 @@
+"""
+asyncio support
+
+Reads EDI data from an asyncio.StreamReader or an async iterable of chunks,
+splitting it into segments as it arrives (see EDIParser.parse_async), and
+writes generated EDI to an asyncio.StreamWriter with backpressure (see
+AsyncEDIWriter). Parsing and building themselves are unchanged and run
+between reads and writes, one segment or transaction set at a time.
+
+    reader, writer = await asyncio.open_connection(host, port)
+    async for found_segments, edi_data in EDIParser().parse_async(reader):
+        ...
+"""
+
+from .stream import SegmentSplitter, DEFAULT_CHUNK_SIZE
+from .EDIWriter import EDIWriter
+
+async def read_chunks(source, chunk_size=DEFAULT_CHUNK_SIZE):
+    """ Yields chunks from an asyncio.StreamReader (or anything with an async
+    `read(n)` method returning an empty chunk at the end) or an async iterable
+    of chunks """
+    if hasattr(source, "read"):
+        while True:
+            chunk = await source.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    elif hasattr(source, "__aiter__"):
+        async for chunk in source:
+            yield chunk
+    else:
+        raise TypeError("Expected an asyncio.StreamReader or an async iterable of chunks, not {!r}".format(source))
+
+async def iter_segments(source, segment_delimiter="\n", chunk_size=DEFAULT_CHUNK_SIZE, encoding="utf-8", detect=False):
+    """ Yields segments from `source` as they arrive; the async counterpart of
+    stream.iter_segments. See `read_chunks` for accepted sources. """
+    splitter = SegmentSplitter(segment_delimiter, encoding, detect)
+    async for chunk in read_chunks(source, chunk_size):
+        for segment in splitter.feed(chunk):
+            yield segment
+    for segment in splitter.close():
+        yield segment
+
+class AsyncEDIWriter(EDIWriter):
+    """ EDIWriter for an asyncio.StreamWriter, or anything with `write` and an
+    awaitable `drain`.
+
+    Segments are encoded (as UTF-8 unless another `encoding` is given) and
+    written as they are built; every `drain_size` characters the writer
+    waits on `drain`, so a slow peer holds generation back instead of the
+    output piling up in the transport's buffer. """
+    def __init__(self, sink, generator=None, encoding="utf-8", drain_size=DEFAULT_CHUNK_SIZE):
+        EDIWriter.__init__(self, sink, generator, encoding)
+        self.drain_size = drain_size
+        self.pending = 0 # Characters written since the last drain
+
+    async def write(self, data, delimiters=None):
+        """ Builds the transaction set `data` into the sink; see EDIWriter.write """
+        delimiters = self.generator.delimiters(data, delimiters)
+        await self._write_segments(self.generator.iter_segments(data, self.control, delimiters=delimiters), delimiters.segment)
+
+    async def write_interchange(self, envelope, transactions, delimiters=None):
+        """ Builds one interchange into the sink; see EDIWriter.write_interchange """
+        delimiters = self.generator.delimiters(envelope, delimiters)
+        await self._write_segments(self.generator.iter_interchange(envelope, transactions, self.control, delimiters=delimiters), delimiters.segment)
+
+    async def _write_segments(self, segments, terminator):
+        for segment in segments:
+            self.write_segment_string(segment, terminator)
+            if self.pending >= self.drain_size:
+                await self.drain()
+
+    def write_segment_string(self, segment, terminator=None):
+        EDIWriter.write_segment_string(self, segment, terminator)
+        self.pending += len(segment) + len(terminator if terminator is not None else self.generator.segment_delimiter)
+
+    async def drain(self):
+        """ Waits until the sink's buffer has room again """
+        self.pending = 0
+        await self.sink.drain()
+
+    async def flush(self):
+        """ Waits until everything written so far has been handed to the transport """
+        await self.drain()
+
+    async def close(self):
+        """ Drains and closes the sink """
+        await self.drain()
+        self.sink.close()
+        if hasattr(self.sink, "wait_closed"):
+            await self.sink.wait_closed()
@@ -0,0 +1,204 @@
+"""
+Parses many EDI files in parallel across a pool of worker processes.
+
+Each worker builds its own EDIParser (and compiled format) once and reuses it
+for every file it is given. Per-file errors are captured in the results
+instead of being raised, and throughput statistics are kept for the run.
+
+`build_batch` generates many messages on a pool of threads sharing a single
+EDIGenerator.
+
+Also usable from the command line: `pythonedi-batch --help`
+"""
+
+import os
+import sys
+import json
+import time
+import fnmatch
+import argparse
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+
+from .EDIParser import EDIParser
+from .EDIGenerator import EDIGenerator
+from .delimiters import sniff_delimiters
+
+class BatchResult(object):
+    """ Outcome of parsing a single file """
+    __slots__ = ("path", "found_segments", "data", "error", "size", "segments", "seconds")
+
+    def __init__(self, path, found_segments=None, data=None, error=None, size=0, segments=0, seconds=0.0):
+        self.path = path
+        self.found_segments = found_segments
+        self.data = data
+        self.error = error # "ExceptionType: message" if parsing failed, else None
+        self.size = size
+        self.segments = segments
+        self.seconds = seconds
+
+    @property
+    def ok(self):
+        return self.error is None
+
+class BatchStats(object):
+    """ Throughput statistics for a batch run """
+    def __init__(self):
+        self.files = 0
+        self.failed = 0
+        self.bytes = 0
+        self.segments = 0
+        self.parse_seconds = 0.0 # Summed across workers
+        self.started = None
+        self.finished = None
+
+    def add(self, result):
+        self.files += 1
+        if result.error is not None:
+            self.failed += 1
+        self.bytes += result.size
+        self.segments += result.segments
+        self.parse_seconds += result.seconds
+
+    @property
+    def elapsed(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished if self.finished is not None else time.perf_counter()) - self.started
+
+    def as_dict(self):
+        elapsed = self.elapsed
+        return {
+            "files": self.files,
+            "failed": self.failed,
+            "bytes": self.bytes,
+            "segments": self.segments,
+            "elapsed_seconds": elapsed,
+            "parse_seconds": self.parse_seconds,
+            "files_per_second": self.files / elapsed if elapsed else 0.0,
+            "segments_per_second": self.segments / elapsed if elapsed else 0.0,
+            "mb_per_second": self.bytes / 1e6 / elapsed if elapsed else 0.0,
+        }
+
+    def __str__(self):
+        return ("{files} files ({failed} failed), {segments} segments, {bytes} bytes in {elapsed_seconds:.2f}s: "
+                "{files_per_second:.1f} files/s, {segments_per_second:.0f} segments/s, {mb_per_second:.2f} MB/s").format(**self.as_dict())
+
+# The parser owned by this worker process, built once by `_init_worker`
+_worker_parser = None
+
+def _init_worker(edi_format, parser_options):
+    global _worker_parser
+    _worker_parser = EDIParser(edi_format=edi_format, **parser_options)
+
+def _parse_file(path):
+    """ Parses one file with this worker's parser, capturing any error """
+    start = time.perf_counter()
+    size = 0
+    try:
+        with open(path, "rb") as edi_file:
+            raw = edi_file.read()
+        size = len(raw)
+        data = raw.decode("utf-8")
+        found_segments, edi_data = _worker_parser.parse(data)
+        delimiters = sniff_delimiters(data) if _worker_parser.detect_delimiters else None
+        terminator = delimiters.segment if delimiters is not None and delimiters.segment else _worker_parser.segment_delimiter
+        segments = sum(1 for segment in data.split(terminator) if segment.strip() != "")
+        return BatchResult(path, found_segments, edi_data, None, size, segments, time.perf_counter() - start)
+    except Exception as e:
+        return BatchResult(path, error="{}: {}".format(type(e).__name__, e), size=size, seconds=time.perf_counter() - start)
+
+def collect_paths(paths, pattern="*"):
+    """ Expands directories in `paths` to the files in them matching `pattern` (sorted) """
+    if isinstance(paths, (str, os.PathLike)):
+        paths = [paths]
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for filename in sorted(files):
+                    if fnmatch.fnmatch(filename, pattern):
+                        yield os.path.join(root, filename)
+        else:
+            yield path
+
+class BatchParser(object):
+    """ Parses files across `processes` worker processes (default: one per CPU).
+
+    Extra keyword arguments are passed to each worker's EDIParser. With
+    `ordered` unset, results are yielded as soon as any worker finishes. """
+    def __init__(self, edi_format=None, processes=None, ordered=True, chunksize=1, **parser_options):
+        self.edi_format = edi_format
+        self.processes = processes if processes is not None else os.cpu_count() or 1
+        self.ordered = ordered
+        self.chunksize = chunksize
+        self.parser_options = parser_options
+        self.stats = BatchStats()
+
+    def parse(self, paths, pattern="*"):
+        """ Yields a BatchResult for each file in `paths` (files and/or directories).
+
+        `self.stats` is reset at the start and complete once the iterator is exhausted. """
+        self.stats = BatchStats()
+        self.stats.started = time.perf_counter()
+        paths = collect_paths(paths, pattern)
+        try:
+            if self.processes == 1:
+                # Not worth a pool; parse in this process
+                _init_worker(self.edi_format, self.parser_options)
+                for path in paths:
+                    result = _parse_file(path)
+                    self.stats.add(result)
+                    yield result
+            else:
+                pool = multiprocessing.Pool(self.processes, _init_worker, (self.edi_format, self.parser_options))
+                try:
+                    mapper = pool.imap if self.ordered else pool.imap_unordered
+                    for result in mapper(_parse_file, paths, self.chunksize):
+                        self.stats.add(result)
+                        yield result
+                finally:
+                    pool.terminate()
+                    pool.join()
+        finally:
+            self.stats.finished = time.perf_counter()
+
+def parse_files(paths, edi_format=None, processes=None, ordered=True, **parser_options):
+    """ Shortcut for BatchParser(...).parse(paths) when the statistics aren't needed """
+    return BatchParser(edi_format, processes, ordered, **parser_options).parse(paths)
+
+def build_batch(transactions, threads=None, generator=None, delimiters=None):
+    """ Builds every transaction set in `transactions` (see EDIGenerator.build) on
+    `threads` threads (default: one per CPU) sharing `generator` (or a new
+    EDIGenerator) and its compiled formats. Returns the messages in the order
+    of `transactions`; the first error is raised. """
+    generator = generator if generator is not None else EDIGenerator()
+    threads = threads if threads is not None else os.cpu_count() or 1
+    with ThreadPoolExecutor(threads) as executor:
+        return list(executor.map(lambda data: generator.build(data, delimiters=delimiters), transactions))
+
+def main(argv=None):
+    """ Console entry point """
+    arg_parser = argparse.ArgumentParser(description="Parse EDI files in parallel.")
+    arg_parser.add_argument("paths", nargs="+", help="EDI files or directories of them")
+    arg_parser.add_argument("-f", "--format", dest="edi_format", default=None, help="EDI format (default: detect from ST01)")
+    arg_parser.add_argument("-p", "--processes", type=int, default=None, help="worker processes (default: CPU count)")
+    arg_parser.add_argument("-u", "--unordered", action="store_true", help="report files as they finish")
+    arg_parser.add_argument("--pattern", default="*", help="file name pattern within directories (default: *)")
+    arg_parser.add_argument("--json", action="store_true", help="print one JSON object per file and for the summary")
+    args = arg_parser.parse_args(argv)
+
+    batch = BatchParser(args.edi_format, args.processes, not args.unordered)
+    for result in batch.parse(args.paths, args.pattern):
+        if args.json:
+            print(json.dumps({"path": result.path, "error": result.error, "segments": result.segments, "bytes": result.size}))
+        elif result.error is not None:
+            print("{}: {}".format(result.path, result.error))
+    if args.json:
+        print(json.dumps(batch.stats.as_dict()))
+    else:
+        print(batch.stats, file=sys.stderr)
+    return 1 if batch.stats.failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,256 @@
+"""
+Columnar export of repeated segments and loops
+
+Extracts chosen elements of a repeated segment or loop (e.g. IT102, IT104
+and IT107 of every L_IT1 line item) straight into one column per element,
+without building a dict per line. Raw fields are gathered first and each
+column is then converted in one batch: numeric elements become
+`array.array` (or NumPy) arrays, everything else stays a list of strings.
+
+NumPy and pyarrow are optional; they are only imported when used.
+"""
+
+from array import array
+
+from .compiled_format import LOOP
+
+BACKENDS = ("array", "numpy")
+
+def _import_optional(module_name, purpose):
+    try:
+        return __import__(module_name)
+    except ImportError:
+        raise ImportError("{} requires the '{}' package".format(purpose, module_name))
+
+def column_kind(element):
+    """ Returns (kind, scale) for an element definition: kind is "int", "float" or "str" """
+    data_type = element["data_type"]
+    if data_type == "N0":
+        return "int", 1
+    elif data_type.startswith("N") and data_type[1:].isdigit():
+        return "float", 10**int(data_type[1:])
+    elif data_type == "R":
+        return "float", 1
+    return "str", 1
+
+def array_column(raw, kind, scale=1):
+    """ Converts a list of raw fields to an array.array ('q' for whole numbers, 'd' otherwise).
+
+    Empty fields become NaN, so a whole-number column with gaps is returned as floats. """
+    if kind == "str":
+        return raw
+    if kind == "int" and "" not in raw:
+        try:
+            return array("q", map(int, raw))
+        except (ValueError, OverflowError):
+            pass # Decimal points or huge values; fall back to floats
+    if "" in raw:
+        raw = [field or "nan" for field in raw]
+    values = array("d", map(float, raw))
+    if scale != 1:
+        values = array("d", [value / scale for value in values])
+    return values
+
+def numpy_column(raw, kind, scale=1):
+    """ Converts a list of raw fields to a NumPy array (int64, float64 or fixed-width unicode) """
+    numpy = _import_optional("numpy", "The numpy backend")
+    values = numpy.array(raw, dtype=str)
+    if kind == "str":
+        return values
+    missing = values == ""
+    if kind == "int" and not missing.any():
+        try:
+            return values.astype(numpy.int64)
+        except (ValueError, OverflowError):
+            pass
+    if missing.any():
+        values = numpy.where(missing, "nan", values)
+    values = values.astype(numpy.float64)
+    if scale != 1:
+        values /= scale
+    return values
+
+class Columns(dict):
+    """ Element ID -> column, in the order the elements were requested """
+    def __init__(self, columns, rows):
+        dict.__init__(self, columns)
+        self.rows = rows
+
+    def to_arrow(self):
+        """ Returns the columns as a pyarrow RecordBatch. array.array columns are shared, not copied. """
+        pyarrow = _import_optional("pyarrow", "Arrow export")
+        arrays = []
+        for column in self.values():
+            if isinstance(column, array):
+                arrow_type = pyarrow.int64() if column.typecode == "q" else pyarrow.float64()
+                arrays.append(pyarrow.Array.from_buffers(arrow_type, len(column), [None, pyarrow.py_buffer(column)]))
+            else:
+                arrays.append(pyarrow.array(column))
+        return pyarrow.RecordBatch.from_arrays(arrays, names=list(self))
+
+def _loop_tags(loop):
+    """ Every segment tag within a compiled loop, including nested loops """
+    tags = set()
+    for section in loop.sections:
+        if section.kind == LOOP:
+            tags.update(_loop_tags(section.loop))
+        else:
+            tags.add(section.tag)
+    return tags
+
+def _find_loop(level, loop_id):
+    for section in level.sections:
+        if section.kind == LOOP:
+            if section.id == loop_id:
+                return section.loop
+            found = _find_loop(section.loop, loop_id)
+            if found is not None:
+                return found
+    return None
+
+def _segment_definitions(level):
+    """ Yields every segment definition within a compiled level, in order """
+    for section in level.sections:
+        if section.kind == LOOP:
+            for definition in _segment_definitions(section.loop):
+                yield definition
+        else:
+            yield section.definition
+
+class ColumnExtractor(object):
+    """ Gathers the `elements` (element IDs) of a repeated segment or loop into columns.
+
+    With `loop`, there is one row per iteration of the loop and the elements
+    may come from any of its segments (the first occurrence within an
+    iteration wins; absent elements are empty). With `segment`, there is one
+    row per occurrence of that segment, within `loop` if it is also given. """
+    def __init__(self, compiled_format, elements, loop=None, segment=None, backend="array"):
+        if loop is None and segment is None:
+            raise ValueError("Either a loop or a segment is required for columnar output")
+        if backend not in BACKENDS:
+            raise ValueError("Unknown columnar backend '{}'. Valid backends include: {}".format(backend, ", ".join(BACKENDS)))
+        self.compiled_format = compiled_format
+        self.backend = backend
+
+        if loop is not None:
+            self.loop = _find_loop(compiled_format.root, loop)
+            if self.loop is None:
+                raise ValueError("Loop '{}' is not part of EDI format {}".format(loop, compiled_format.id))
+            self.path = self.loop.path
+            self.loop_first = self.loop.first.tag
+            self.loop_tags = _loop_tags(self.loop)
+            definitions = list(_segment_definitions(self.loop))
+        else:
+            sections = compiled_format.lookup(segment)
+            if not sections:
+                raise ValueError("Segment '{}' is not part of EDI format {}".format(segment, compiled_format.id))
+            self.loop = None
+            self.path = sections[0].path
+            definitions = [sections[0].definition]
+            if self.path:
+                # A segment defined in a loop is only picked up inside that loop
+                enclosing = _find_loop(compiled_format.root, self.path[-1])
+                self.loop_first = enclosing.first.tag
+                self.loop_tags = _loop_tags(enclosing)
+        if segment is not None:
+            definitions = [definition for definition in definitions if definition["id"] == segment]
+            if not definitions:
+                raise ValueError("Segment '{}' is not part of loop '{}'".format(segment, loop))
+        self.row_tag = segment if segment is not None else self.loop_first
+
+        # Element ID -> (segment tag, field position, element definition)
+        located = {}
+        for definition in definitions:
+            for position, element in enumerate(definition["elements"]):
+                located.setdefault(element["id"], (definition["id"], position + 1, element))
+        self.elements = list(elements)
+        self.columns = []
+        for element_id in self.elements:
+            if element_id not in located:
+                raise ValueError("Element '{}' is not part of {}".format(element_id, segment if segment is not None else loop))
+            self.columns.append(located[element_id])
+        # Tag of a top-level loop's first segment -> (loop ID, every tag within the loop)
+        self.top_loops = {}
+        for section in compiled_format.root.sections:
+            if section.kind == LOOP:
+                self.top_loops.setdefault(section.tag, (section.id, _loop_tags(section.loop)))
+        # Segment tag -> [(column index, field position), ...]
+        self.by_tag = {}
+        for index, (tag, position, element) in enumerate(self.columns):
+            self.by_tag.setdefault(tag, []).append((index, position))
+
+    def extract(self, edi_segments, element_delimiter="^"):
+        """ Collects the columns from an iterable of segment strings and returns them as Columns """
+        raw = [[] for _ in self.columns]
+        width = len(self.columns)
+        known = self.compiled_format.segments
+        top_loops = self.top_loops
+        path = self.path
+        outer = path[0] if path else None
+        loop_first = self.loop_first if path else None
+        loop_tags = self.loop_tags if path else ()
+        row_tag = self.row_tag
+        by_tag = self.by_tag
+        # Every column comes from the row segment: no need to hold a row open
+        single = list(by_tag) == [row_tag]
+        row_columns = [(raw[index], position) for index, position in by_tag[row_tag]] if single else None
+
+        top = None # ID of the top-level loop the segment is in, if any
+        top_tags = ()
+        inside = not path
+        row = None
+        rows = 0
+        for segment in edi_segments:
+            tag = segment.partition(element_delimiter)[0]
+            if tag not in known:
+                continue # Blank or unknown segment; the parser skips these too
+
+            # Follow the loop structure far enough to tell which loop the segment is in
+            if tag not in top_tags:
+                top, top_tags = top_loops.get(tag, (None, ()))
+            if path:
+                if tag == loop_first and top == outer:
+                    inside = True
+                elif not (inside and top == outer and tag in loop_tags):
+                    inside = False
+            else:
+                inside = top is None
+
+            if single:
+                if inside and tag == row_tag:
+                    fields = segment.split(element_delimiter)
+                    count = len(fields)
+                    for column, position in row_columns:
+                        column.append(fields[position] if position < count else "")
+                    rows += 1
+                continue
+
+            if not inside or tag == row_tag:
+                if row is not None:
+                    for index in range(width):
+                        raw[index].append(row[index] if row[index] is not None else "")
+                    row = None
+                if not inside:
+                    continue
+                row = [None] * width
+                rows += 1
+            wanted = by_tag.get(tag)
+            if wanted is None or row is None:
+                continue
+            fields = segment.split(element_delimiter)
+            for index, position in wanted:
+                if row[index] is None:
+                    row[index] = fields[position] if position < len(fields) else ""
+        if row is not None:
+            for index in range(width):
+                raw[index].append(row[index] if row[index] is not None else "")
+
+        convert = numpy_column if self.backend == "numpy" else array_column
+        columns = []
+        for element_id, (tag, position, element), fields in zip(self.elements, self.columns, raw):
+            kind, scale = column_kind(element)
+            try:
+                columns.append((element_id, convert(fields, kind, scale)))
+            except ValueError as e:
+                raise ValueError("Invalid value in column {}: {}".format(element_id, e))
+        return Columns(columns, rows)
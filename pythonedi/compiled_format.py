@@ -0,0 +1,139 @@
+"""
+Compiles EDI format definitions into dispatch tables
+
+The JSON definitions are nested lists, so finding the format for a segment
+means scanning them. A compiled format indexes every level of a definition
+by segment tag once, giving the parser and generator direct lookups.
+"""
+
+import weakref
+
+# Section kinds
+SEGMENT = "segment"
+REPEATING_SEGMENT = "repeating_segment"
+LOOP = "loop"
+
+class CompiledSection(object):
+    """ A segment or loop at a fixed position within its parent level """
+    __slots__ = ("id", "tag", "kind", "req", "position", "definition", "parent", "loop", "path")
+
+    def __init__(self, definition, position, parent):
+        self.id = definition["id"]
+        self.req = definition["req"]
+        self.position = position
+        self.definition = definition
+        self.parent = parent
+        # Loop IDs this section is nested in, outermost first
+        self.path = parent.path
+        if definition["type"] == "loop":
+            self.kind = LOOP
+            self.loop = CompiledLoop(definition["id"], definition["segments"], definition, self)
+            # A loop is triggered by its first segment
+            self.tag = self.loop.first.tag
+        elif definition["type"] == "segment":
+            self.kind = SEGMENT if definition["max_uses"] == 1 else REPEATING_SEGMENT
+            self.loop = None
+            self.tag = definition["id"]
+        else:
+            raise TypeError("Unknown section type '{}' for section '{}'".format(definition["type"], definition["id"]))
+
+    def __repr__(self):
+        return "<CompiledSection {} ({}) at {}{}>".format(self.id, self.kind, "/".join(self.path + ("",)), self.position)
+
+class CompiledLoop(object):
+    """ One level of a format definition: the top level of a set, or a loop """
+    def __init__(self, loop_id, segments, definition=None, section=None):
+        self.id = loop_id
+        self.definition = definition
+        self.section = section
+        self.path = section.path + (loop_id,) if section is not None else ()
+        self.repeat = definition["repeat"] if definition is not None else 1
+        self.sections = []
+        # Segment tag -> section at this level. If a tag appears twice on one
+        # level, the first section wins, matching the order of the definition.
+        self.dispatch = {}
+        for position, section_def in enumerate(segments):
+            compiled = CompiledSection(section_def, position, self)
+            self.sections.append(compiled)
+            self.dispatch.setdefault(compiled.tag, compiled)
+        if loop_id is not None and not self.sections:
+            raise ValueError("Loop '{}' has no segments".format(loop_id))
+        self.first = self.sections[0] if self.sections else None
+        self.mandatory = [section for section in self.sections if section.req == "M"]
+
+class CompiledFormat(object):
+    """ Dispatch structure for a format definition (a list of segments and loops) """
+    def __init__(self, format_id, definition):
+        self.id = format_id
+        self.definition = definition
+        self.root = CompiledLoop(None, definition)
+        # Segment tag -> every section with that tag, anywhere in the format
+        self.segments = {}
+        self._index(self.root)
+        # Top-level sections split around the transaction set: the envelope
+        # headers (ISA, GS), ST..SE, and the envelope trailers (GE, IEA)
+        ids = [section.id for section in self.root.sections]
+        start = ids.index("ST") if "ST" in ids else 0
+        end = ids.index("SE") + 1 if "SE" in ids[start:] else len(ids)
+        self.header_sections = self.root.sections[:start]
+        self.transaction_sections = self.root.sections[start:end]
+        self.trailer_sections = self.root.sections[end:]
+
+    def _index(self, level):
+        for section in level.sections:
+            if section.kind == LOOP:
+                self._index(section.loop)
+            else:
+                self.segments.setdefault(section.tag, []).append(section)
+
+    def lookup(self, tag):
+        """ Returns every section (definition, loop path and position) for segment `tag` """
+        return self.segments.get(tag, [])
+
+    def segment_format(self, tag):
+        """ Returns the first segment definition for `tag`, or None """
+        sections = self.segments.get(tag)
+        return sections[0].definition if sections else None
+
+class DefinitionCache(object):
+    """ Values derived from definitions (or compiled formats), looked up by
+    the definition object itself.
+
+    Definitions are dicts and lists, which can't be hashed, so entries are
+    keyed by id(). Each entry holds on to its definition: while the entry
+    exists the definition can't be collected and its id reused by another
+    one. Replacing a definition in the registry clears every cache (see
+    `clear_definition_caches`), so replaced definitions don't stay alive. """
+    def __init__(self):
+        self._entries = {} # id(definition) -> (definition, value)
+
+    def get(self, definition, default=None):
+        """ Returns the value cached for `definition`, or `default` """
+        entry = self._entries.get(id(definition))
+        if entry is not None and entry[0] is definition:
+            return entry[1]
+        return default
+
+    def set(self, definition, value):
+        """ Caches `value` for `definition` and returns it """
+        self._entries[id(definition)] = (definition, value)
+        return value
+
+    def clear(self):
+        self._entries = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+_definition_caches = weakref.WeakSet()
+
+def definition_cache():
+    """ Returns a new DefinitionCache, cleared with all the others by `clear_definition_caches` """
+    cache = DefinitionCache()
+    _definition_caches.add(cache)
+    return cache
+
+def clear_definition_caches():
+    """ Empties every DefinitionCache, letting go of the definitions they hold """
+    for cache in list(_definition_caches):
+        cache.clear()
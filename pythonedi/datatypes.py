@@ -0,0 +1,158 @@
+"""
+Codecs for X12 element data types
+
+Shared by EDIParser (decoding) and EDIGenerator (encoding). Fixed-layout
+dates and times are sliced instead of going through strptime/strftime,
+repeated values are memoized (an interchange tends to reuse a handful of
+dates), and Nx implied decimals are converted with integer arithmetic.
+"""
+
+import datetime
+from functools import lru_cache
+
+from .compiled_format import definition_cache
+
+CACHE_SIZE = 4096
+
+# Element/segment definition -> decoder(s), see `decoder_for` and `segment_decoders`
+_decoders = definition_cache()
+_segment_decoders = definition_cache()
+
+def _digits(field):
+    if not (field.isdigit() and field.isascii()):
+        raise ValueError("'{}' is not a valid date/time value".format(field))
+
+@lru_cache(maxsize=CACHE_SIZE)
+def decode_date(field):
+    """ CCYYMMDD or YYMMDD -> datetime. Two-digit years follow strptime: 69-99 are 19xx, 00-68 are 20xx """
+    _digits(field)
+    if len(field) == 8:
+        return datetime.datetime(int(field[:4]), int(field[4:6]), int(field[6:8]))
+    elif len(field) == 6:
+        year = int(field[:2])
+        return datetime.datetime(year + (1900 if year >= 69 else 2000), int(field[2:4]), int(field[4:6]))
+    raise ValueError("'{}' is not a CCYYMMDD or YYMMDD date".format(field))
+
+@lru_cache(maxsize=CACHE_SIZE)
+def decode_time(field):
+    """ HHMM or HHMMSS -> datetime on 1900-01-01, as strptime returns """
+    _digits(field)
+    if len(field) == 4:
+        return datetime.datetime(1900, 1, 1, int(field[:2]), int(field[2:4]))
+    elif len(field) == 6:
+        return datetime.datetime(1900, 1, 1, int(field[:2]), int(field[2:4]), int(field[4:6]))
+    raise ValueError("'{}' is not an HHMM or HHMMSS time".format(field))
+
+def decode_implied_decimal(field, decimals):
+    """ Nx field -> number: an int for N0, otherwise the field divided by 10**x """
+    try:
+        value = int(field)
+    except ValueError:
+        # Not strictly Nx (e.g. it has a decimal point); be lenient
+        return float(field) / (10**decimals)
+    if decimals == 0:
+        return value
+    return value / (10**decimals)
+
+def decoder_for(element):
+    """ Returns a function converting a raw field to a Python value for the element definition `element` """
+    decoder = _decoders.get(element)
+    if decoder is not None:
+        return decoder
+
+    data_type = element["data_type"]
+    if data_type == "DT":
+        def decode(field):
+            return decode_date(field) if len(field) in (6, 8) else field
+    elif data_type == "TM":
+        def decode(field):
+            return decode_time(field) if len(field) in (4, 6) else field
+    elif data_type == "N0":
+        def decode(field):
+            if field == "":
+                return field
+            try:
+                return int(field)
+            except ValueError:
+                return float(field)
+    elif data_type.startswith("N") and data_type[1:].isdigit():
+        scale = 10**int(data_type[1:])
+        def decode(field):
+            if field == "":
+                return field
+            try:
+                return int(field) / scale
+            except ValueError:
+                return float(field) / scale
+    elif data_type == "R":
+        def decode(field):
+            return float(field) if field != "" else field
+    else:
+        def decode(field):
+            return field
+
+    return _decoders.set(element, decode)
+
+def segment_decoders(segment_format):
+    """ Returns [(element_id, decoder), ...] for every element of a segment definition """
+    decoders = _segment_decoders.get(segment_format)
+    if decoders is None:
+        decoders = _segment_decoders.set(segment_format, [(element["id"], decoder_for(element)) for element in segment_format["elements"]])
+    return decoders
+
+def decode_element(field, element):
+    """ Converts the raw string `field` to a Python value according to its element definition """
+    return decoder_for(element)(field)
+
+@lru_cache(maxsize=CACHE_SIZE)
+def encode_date(value, length=8):
+    """ date/datetime -> CCYYMMDD (length 8) or YYMMDD (length 6) """
+    if length == 8:
+        return "{:04d}{:02d}{:02d}".format(value.year, value.month, value.day)
+    elif length == 6:
+        return "{:02d}{:02d}{:02d}".format(value.year % 100, value.month, value.day)
+    raise ValueError("Invalid length ({}) for date".format(length))
+
+@lru_cache(maxsize=CACHE_SIZE)
+def encode_time(value):
+    """ time/datetime -> HHMM """
+    return "{:02d}{:02d}".format(value.hour, value.minute)
+
+@lru_cache(maxsize=CACHE_SIZE, typed=True)
+def encode_real(value):
+    """ Number -> R field, as str(float(value)) """
+    return str(float(value))
+
+@lru_cache(maxsize=CACHE_SIZE, typed=True)
+def encode_implied_decimal(value, decimals, min_length=1):
+    """ Number -> Nx field: the value times 10**x as zero-padded digits, e.g. 24669.39 as N2 is "2466939".
+
+    Floats are scaled through their shortest decimal representation, so no
+    binary rounding error creeps in. The sign does not count toward `min_length`. """
+    if isinstance(value, bool):
+        raise ValueError("Expected a number, not {!r}".format(value))
+    if isinstance(value, int):
+        scaled = value * 10**decimals
+    else:
+        text = repr(value) if isinstance(value, float) else str(value)
+        scaled = _scale_decimal_text(text.strip(), decimals)
+        if scaled is None:
+            scaled = int(round(float(value) * 10**decimals))
+    digits = str(abs(scaled)).zfill(min_length)
+    return "-" + digits if scaled < 0 else digits
+
+def _scale_decimal_text(text, decimals):
+    """ Scales a plain decimal string like "-12.345" by 10**decimals, rounding half away from zero.
+
+    Returns None for anything else (exponents, inf, nan). """
+    negative = text.startswith("-")
+    if text[:1] in "+-":
+        text = text[1:]
+    whole, _, fraction = text.partition(".")
+    if not (whole or fraction) or not (whole.isdigit() or whole == "") or not (fraction.isdigit() or fraction == ""):
+        return None
+    fraction += "0" * decimals
+    scaled = int((whole or "0") + fraction[:decimals])
+    if fraction[decimals:decimals+1] >= "5":
+        scaled += 1
+    return -scaled if negative else scaled
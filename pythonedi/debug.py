@@ -4,8 +4,17 @@ Debug printer
 Handles logging at different debug levels
 """
 
-from colorama import Fore, Style, init
-init()
+_colorama = None
+
+def colors():
+    """ Returns colorama's (Fore, Style), importing and initializing colorama
+    on first use rather than when the package is imported """
+    global _colorama
+    if _colorama is None:
+        from colorama import Fore, Style, init
+        init()
+        _colorama = (Fore, Style)
+    return _colorama
 
 LOOP_TEMPLATE = """
 {tab_level}{HEADER_COLOR}[{id}] {name}{END_COLOR}
@@ -34,11 +43,18 @@ class DebugMaster(object):
     """ Auto-instantiated as Debug to provide a single point of contact """
     def __init__(self):
         self.level = 3
-        self.tags = {
-            "ERROR":   "{}[ ERROR ]{} ".format(Fore.RED+Style.BRIGHT, Style.RESET_ALL),
-            "WARNING": "{}[WARNING]{} ".format(Fore.YELLOW+Style.BRIGHT, Style.RESET_ALL),
-            "MESSAGE": "{}[MESSAGE]{} ".format(Fore.CYAN+Style.BRIGHT, Style.RESET_ALL)
-        }
+        self._tags = None
+
+    @property
+    def tags(self):
+        if self._tags is None:
+            Fore, Style = colors()
+            self._tags = {
+                "ERROR":   "{}[ ERROR ]{} ".format(Fore.RED+Style.BRIGHT, Style.RESET_ALL),
+                "WARNING": "{}[WARNING]{} ".format(Fore.YELLOW+Style.BRIGHT, Style.RESET_ALL),
+                "MESSAGE": "{}[MESSAGE]{} ".format(Fore.CYAN+Style.BRIGHT, Style.RESET_ALL)
+            }
+        return self._tags
 
     def log(self, message, level=1):
         """ Creates a custom message at the specified level """
@@ -58,7 +74,6 @@ class DebugMaster(object):
         self.log(self.tags["MESSAGE"] + message, 3)
 
     def explain(self, structure):
-        print(self.level)
         if self.level <= 1:
             return # Only explain if debugging level is 2+
         # Decide which type of structure this is
@@ -78,6 +93,7 @@ class DebugMaster(object):
     def explain_segment(self, segment, tab_level = ""):
         if self.level <= 1:
             return # Only explain if debugging level is 2+
+        Fore, Style = colors()
         print(Fore.CYAN + "\n" + tab_level + "-- [Segment] --" + Fore.RESET)
         if segment["type"] == "segment":
             # Parse syntax rules into human-readable format
@@ -121,6 +137,7 @@ class DebugMaster(object):
     def explain_element(self, index, element, tab_level = ""):
         if self.level <= 1:
             return # Only explain if debugging level is 2+
+        Fore, Style = colors()
         # Print template
         print(ELEMENT_TEMPLATE.format(
             tab_level=tab_level,
@@ -133,6 +150,7 @@ class DebugMaster(object):
     def explain_loop(self, loop, tab_level=""):
         if self.level <= 1:
             return # Only explain if debugging level is 2+
+        Fore, Style = colors()
         print(Fore.RED + "-- [Loop] --" + Style.RESET_ALL)
         print(LOOP_TEMPLATE.format(
             tab_level=tab_level,
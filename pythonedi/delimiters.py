@@ -0,0 +1,54 @@
+"""
+Detects X12 delimiters from the ISA interchange header
+
+The ISA segment is fixed width: the element separator is the character right
+after "ISA", the component separator is ISA16 and the segment terminator
+follows it, 106 characters into the interchange.
+"""
+
+from collections import namedtuple
+
+ISA_HEADER_LENGTH = 106
+
+# Offsets of the element separators in a fixed-width ISA header
+ISA_ELEMENT_POSITIONS = (3, 6, 17, 20, 31, 34, 50, 53, 69, 76, 81, 83, 89, 99, 101, 103)
+
+Delimiters = namedtuple("Delimiters", ["element", "segment", "component"])
+
+def sniff_delimiters(data):
+    """ Detects the delimiters used by the interchange that starts `data` (str or bytes).
+
+    Returns a Delimiters tuple, or None if `data` does not begin with an ISA
+    header. A line break following the segment terminator is treated as part
+    of the terminator. `segment` is None if `data` ends before the terminator. """
+    head = data[:ISA_HEADER_LENGTH + 64]
+    if isinstance(head, bytes):
+        head = head.decode("latin-1")
+    head = head.lstrip()
+    if head[:3] != "ISA" or len(head) < 4:
+        return None
+
+    element = head[3]
+    if len(head) >= ISA_HEADER_LENGTH and all(head[position] == element for position in ISA_ELEMENT_POSITIONS):
+        component = head[ISA_HEADER_LENGTH - 2]
+        segment = head[ISA_HEADER_LENGTH - 1]
+        rest = head[ISA_HEADER_LENGTH:]
+    else:
+        # Header is not padded to its fixed width; count elements instead
+        fields = head.split(element, 16)
+        if len(fields) < 17 or fields[16] == "":
+            return None
+        component = fields[16][0]
+        segment = fields[16][1:2] or None
+        rest = fields[16][2:]
+
+    if segment is not None:
+        # Many partners put each segment on its own line after the terminator
+        if segment == "\r" and rest[:1] == "\n":
+            segment = "\r\n"
+        elif segment not in ("\r", "\n"):
+            if rest[:2] == "\r\n":
+                segment += "\r\n"
+            elif rest[:1] == "\n":
+                segment += "\n"
+    return Delimiters(element, segment, component)
@@ -0,0 +1,114 @@
+"""
+Structured diagnostics
+
+Collects validation problems as objects instead of printing them. Give an
+EDIParser or EDIGenerator a Diagnostics collector and it records every
+problem it can recover from and carries on; nothing is printed until
+`render` is called.
+"""
+
+from .debug import Debug
+
+# Rules (kinds of problem) reported by the parser and generator
+UNRECOGNIZED_SEGMENT = "unrecognized_segment"
+TOO_MANY_ELEMENTS = "too_many_elements"
+INVALID_VALUE = "invalid_value"
+MISSING_SEGMENT = "missing_segment"
+MISSING_ELEMENT = "missing_element"
+LOOP_REPEAT = "loop_repeat"
+MAX_USES = "max_uses"
+SEGMENT_ORDER = "segment_order"
+UNSUPPORTED_TRANSACTION = "unsupported_transaction_set"
+MULTIPLE_TRANSACTIONS = "multiple_transaction_sets"
+# Syntax rules use their names from the format definition: ATLEASTONE, ALLORNONE, IFATLEASTONE
+
+class Diagnostic(object):
+    """ One problem found in EDI data.
+
+    `segment_index` counts segments from the start of the data (or
+    interchange being written) and `offset` is the position of the segment's
+    first character, which is its byte offset for ASCII data. Either may be
+    None when unknown. """
+    __slots__ = ("rule", "message", "segment_index", "offset", "segment_id", "element_id", "definition")
+
+    def __init__(self, rule, message, segment_index=None, offset=None, segment_id=None, element_id=None, definition=None):
+        self.rule = rule
+        self.message = message
+        self.segment_index = segment_index
+        self.offset = offset
+        self.segment_id = segment_id
+        self.element_id = element_id
+        self.definition = definition # Format definition of the segment or loop, for `explain`
+
+    def as_dict(self):
+        return {
+            "rule": self.rule,
+            "message": self.message,
+            "segment_index": self.segment_index,
+            "offset": self.offset,
+            "segment_id": self.segment_id,
+            "element_id": self.element_id,
+        }
+
+    def explain(self):
+        """ Prints the problem and the definition it concerns through Debug """
+        location = ""
+        if self.segment_index is not None:
+            location = "Segment {}{}: ".format(self.segment_index, " (offset {})".format(self.offset) if self.offset is not None else "")
+        Debug.log_error(location + self.message)
+        if self.definition is not None:
+            Debug.explain(self.definition)
+
+    def __repr__(self):
+        return "<Diagnostic {} at segment {}: {}>".format(self.rule, self.segment_index, self.message)
+
+class Diagnostics(object):
+    """ Collects Diagnostic objects. Stops recording (but keeps counting) after `limit` of them. """
+    def __init__(self, limit=None):
+        self.limit = limit
+        self.errors = []
+        self.count = 0
+
+    def add(self, rule, message, segment_index=None, offset=None, segment_id=None, element_id=None, definition=None):
+        self.count += 1
+        if self.limit is None or len(self.errors) < self.limit:
+            self.errors.append(Diagnostic(rule, message, segment_index, offset, segment_id, element_id, definition))
+
+    def clear(self):
+        self.errors = []
+        self.count = 0
+
+    def __len__(self):
+        return len(self.errors)
+
+    def __iter__(self):
+        return iter(self.errors)
+
+    def __bool__(self):
+        return self.count > 0
+
+    def as_dicts(self):
+        return [error.as_dict() for error in self.errors]
+
+    def render(self):
+        """ Prints every recorded problem through Debug """
+        for error in self.errors:
+            error.explain()
+        if self.count > len(self.errors):
+            Debug.log_error("... and {} more".format(self.count - len(self.errors)))
+
+class SegmentReporter(object):
+    """ Records problems into `diagnostics` at the position of the segment
+    being written; `advance` is called after each segment is output """
+    def __init__(self, diagnostics, segment_delimiter):
+        self.diagnostics = diagnostics
+        self.delimiter_length = len(segment_delimiter)
+        self.segment_index = 0
+        self.offset = 0
+
+    def advance(self, segment):
+        self.segment_index += 1
+        self.offset += len(segment) + self.delimiter_length
+
+    def __call__(self, rule, message, segment_id=None, element_id=None, definition=None):
+        self.diagnostics.add(rule, message, self.segment_index, self.offset, segment_id, element_id, definition)
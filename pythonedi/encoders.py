@@ -0,0 +1,120 @@
+"""
+Compiled segment encoders for EDIGenerator
+
+EDIGenerator.build_segment interprets a segment definition for every
+segment it writes. Here each definition is compiled once into an encoder
+function with the element converters, padding/trimming widths and syntax
+rules (see syntax.py) already bound; the generator then only calls it. build_segment stays
+as the reference implementation the encoders must match.
+"""
+
+from .compiled_format import definition_cache
+from .datatypes import encode_date, encode_time, encode_real, encode_implied_decimal
+from .syntax import syntax_checker
+from .diagnostics import MISSING_ELEMENT, INVALID_VALUE
+from .debug import Debug
+
+# Segment definition -> (encoder, element encoders, syntax check), see `segment_encoder`
+_segment_encoders = definition_cache()
+
+def _converter(element):
+    """ Returns the function formatting a (non-None) value for the element definition `element` """
+    data_type = element["data_type"]
+    if data_type in ("AN", "ID"):
+        return str
+    elif data_type == "DT":
+        length = element["length"]["max"]
+        return lambda value: encode_date(value, length)
+    elif data_type == "TM":
+        if element["length"]["max"] in (4, 6, 7, 8):
+            return encode_time
+        def invalid_time(value):
+            raise ValueError("Invalid length ({}) for time field in element '{}'".format(element["length"], element["id"]))
+        return invalid_time
+    elif data_type == "R":
+        return encode_real
+    elif data_type.startswith("N"):
+        decimals = int(data_type[1:])
+        min_length = element["length"]["min"]
+        return lambda value: encode_implied_decimal(value, decimals, min_length)
+    elif data_type == "" and element["id"] == "ISA16":
+        # Component Element Separator
+        return str
+    def undefined(value):
+        raise ValueError("Undefined behavior for empty data type with element '{}'".format(element["id"]))
+    return undefined
+
+def element_encoder(element):
+    """ Returns a function formatting a value for the element definition `element`, as
+    EDIGenerator.build_element does: converted, then padded and trimmed to length """
+    element_id = element["id"]
+    data_type = element["data_type"]
+    req = element["req"]
+    min_length = element["length"]["min"]
+    max_length = element["length"]["max"]
+    convert = _converter(element)
+
+    def encode(value):
+        if value is None:
+            if req == "O":
+                return ""
+            elif req == "M":
+                raise ValueError("Element {} ({}) is mandatory".format(element_id, element["name"]))
+            raise ValueError("Unknown 'req' value '{}' when processing format for element '{}'".format(req, element_id))
+        try:
+            text = convert(value)
+        except Exception:
+            raise ValueError("Error converting '{}' to data type '{}'".format(value, data_type))
+        if len(text) < min_length:
+            text += " " * (min_length - len(text))
+        return text if len(text) <= max_length else text[:max_length]
+    return encode
+
+def segment_encoder(segment):
+    """ Returns the compiled encoder for a segment definition, compiling it on first use.
+
+    The encoder takes the segment's data (a list of element values) and the
+    element delimiter, and returns the segment string. """
+    cached = _segment_encoders.get(segment)
+    if cached is not None:
+        return cached[0]
+
+    segment_id = segment["id"]
+    encoders = [element_encoder(element) for element in segment["elements"]]
+    check = syntax_checker(segment)
+
+    if check is not None:
+        def encode(segment_data, element_delimiter):
+            output = [segment_id]
+            output += [encoder(value) for encoder, value in zip(encoders, segment_data)]
+            broken = check(output)
+            if broken is not None:
+                Debug.explain(segment)
+                raise ValueError(broken.message)
+            return element_delimiter.join(output)
+    else:
+        def encode(segment_data, element_delimiter):
+            output = [segment_id]
+            output += [encoder(value) for encoder, value in zip(encoders, segment_data)]
+            return element_delimiter.join(output)
+
+    _segment_encoders.set(segment, (encode, encoders, check))
+    return encode
+
+def encode_segment_reporting(segment, segment_data, element_delimiter, report):
+    """ Like the compiled encoder, but passes each problem to
+    `report(rule, message, segment_id, element_id, definition)` instead of
+    raising, leaving invalid elements empty. Used to collect diagnostics. """
+    segment_encoder(segment)
+    encoders, check = _segment_encoders.get(segment)[1:]
+    output = [segment["id"]]
+    for encoder, element, value in zip(encoders, segment["elements"], segment_data):
+        try:
+            output.append(encoder(value))
+        except ValueError as e:
+            report(MISSING_ELEMENT if value is None else INVALID_VALUE, str(e), segment["id"], element["id"], segment)
+            output.append("")
+    broken = check(output) if check is not None else None
+    if broken is not None:
+        report(broken.rule, broken.message, segment["id"], None, segment)
+    return element_delimiter.join(output)
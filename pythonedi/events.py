@@ -0,0 +1,88 @@
+"""
+Event-driven parsing
+
+EDIParser.iter_events reports an interchange as a flat sequence of events,
+in the manner of SAX, instead of building nested dicts and lists: each one
+is an (event, name, fields) tuple, where `fields` is the segment split into
+its ID and element values. Loop events follow the loop structure of the
+format definition, with one start_loop/end_loop pair per loop iteration:
+
+    start_interchange  ISA  fields
+    start_group        GS   fields
+    start_transaction  ST   fields
+    segment            BIG  fields
+    start_loop         L_IT1 None
+    segment            IT1  fields
+    ...
+    end_loop           L_IT1 None
+    end_transaction    SE   fields
+    end_group          GE   fields
+    end_interchange    IEA  fields
+
+Only one segment is held at a time, so memory use does not grow with the
+size of the data. Pass an EventHandler to EDIParser.parse_events to have
+its methods called instead.
+"""
+
+START_INTERCHANGE = "start_interchange"
+END_INTERCHANGE = "end_interchange"
+START_GROUP = "start_group"
+END_GROUP = "end_group"
+START_TRANSACTION = "start_transaction"
+END_TRANSACTION = "end_transaction"
+START_LOOP = "start_loop"
+END_LOOP = "end_loop"
+SEGMENT = "segment"
+
+class EventHandler(object):
+    """ Base class for parse_events handlers. Override the methods for the events
+    of interest; the rest do nothing. Envelope methods receive the envelope
+    segment's fields. """
+    def start_interchange(self, fields):
+        pass
+
+    def end_interchange(self, fields):
+        pass
+
+    def start_group(self, fields):
+        pass
+
+    def end_group(self, fields):
+        pass
+
+    def start_transaction(self, fields):
+        pass
+
+    def end_transaction(self, fields):
+        pass
+
+    def start_loop(self, loop_id):
+        pass
+
+    def end_loop(self, loop_id):
+        pass
+
+    def segment(self, segment_id, fields):
+        pass
+
+def dispatch(events, handler):
+    """ Calls the `handler` method for each of `events` """
+    # Envelope event -> method, looked up once rather than per event
+    methods = {
+        START_INTERCHANGE: handler.start_interchange,
+        END_INTERCHANGE: handler.end_interchange,
+        START_GROUP: handler.start_group,
+        END_GROUP: handler.end_group,
+        START_TRANSACTION: handler.start_transaction,
+        END_TRANSACTION: handler.end_transaction,
+    }
+    segment, start_loop, end_loop = handler.segment, handler.start_loop, handler.end_loop
+    for event, name, fields in events:
+        if event == SEGMENT:
+            segment(name, fields)
+        elif event == START_LOOP:
+            start_loop(name)
+        elif event == END_LOOP:
+            end_loop(name)
+        else:
+            methods[event](fields)
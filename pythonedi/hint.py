@@ -3,10 +3,7 @@ Explainer produces a human-readable version of the expectation for the
 formatted data.
 """
 
-from colorama import Fore, Style, init
-
-# Initialize colorama wrapper
-init()
+from .debug import colors
 
 SEGMENT_TEMPLATE = """
 {HEADER_COLOR}[{id}] {name}{END_COLOR}
@@ -42,6 +39,7 @@ def explain(structure):
     
 
 def explain_segment(segment):
+    Fore, Style = colors()
     print(Fore.CYAN + "\n-- [Segment] --" + Fore.RESET)
     if segment["type"] == "segment":
         # Parse syntax rules into human-readable format
@@ -82,6 +80,7 @@ def explain_segment(segment):
     print(Fore.CYAN + "--------------------" + Fore.RESET)
 
 def explain_element(index, element):
+    Fore, Style = colors()
     # Print template
     print(ELEMENT_TEMPLATE.format(
         index=index,
@@ -0,0 +1,197 @@
+"""
+Offset index for random access into EDI files
+
+Records where each interchange, functional group, transaction set and loop
+iteration starts in a file, and saves that next to it (as "<file>.idx",
+JSON), so one transaction set or one invoice line can be parsed again later
+without parsing everything before it. Building the index searches the
+memory-mapped file (see mapped.py) rather than parsing it.
+
+    index = OffsetIndex.open("archive.edi")   # Loads or builds the index
+    found_segments, edi_data = index.get_transaction(12)
+    line = index.get_loop(12, "L_IT1", 3)
+
+EDIParser.parse_range parses any other byte range of the file.
+"""
+
+import os
+import json
+
+from .mapped import MappedFile
+from .delimiters import Delimiters
+from .compiled_format import LOOP
+from .supported_formats import supported_formats, get_compiled_format
+
+INDEX_VERSION = 1
+INDEX_SUFFIX = ".idx"
+
+def indexed_loops(compiled_format, loops=None):
+    """ Returns {loop ID: trigger tag} for the top-level loops of a transaction set
+    to index. Loop iterations are found by searching for their first segment,
+    so only loops whose first segment appears nowhere else in the format can
+    be indexed. By default that is every such loop; naming any other in
+    `loops` raises ValueError. """
+    found = {}
+    for section in compiled_format.root.sections:
+        if section.kind != LOOP or (loops is not None and section.id not in loops):
+            continue
+        if len(compiled_format.lookup(section.tag)) == 1:
+            found[section.id] = section.tag
+        elif loops is not None:
+            raise ValueError("Loop '{}' can't be indexed: its first segment {} also appears elsewhere in format '{}'".format(section.id, section.tag, compiled_format.id))
+    if loops is not None:
+        missing = [loop_id for loop_id in loops if loop_id not in found]
+        if missing:
+            raise ValueError("Format '{}' has no top-level loop(s) {}".format(compiled_format.id, ", ".join(missing)))
+    return found
+
+class OffsetIndex(object):
+    """ Byte offsets of the interchanges, transaction sets and loop iterations in the file at `path`.
+
+    `interchanges` is a list of dicts with the interchange's "start" and
+    "end" offsets, the "header_end" of its ISA segment (None without one) and its "delimiters"
+    (element, segment, component). `transactions` is a list of dicts, in
+    file order, with the set's "interchange" (position in `interchanges`),
+    the [start, end] offsets of its "group" GS segment (or None), the
+    "start" and "end" of its ST..SE segments, its
+    "set" ID (ST01) and "loops", mapping loop IDs to the offset of each
+    iteration. """
+    def __init__(self, path, interchanges, transactions, size=None, mtime=None, encoding="utf-8"):
+        self.path = path
+        self.encoding = encoding
+        self.interchanges = interchanges
+        self.transactions = transactions
+        self.size = size
+        self.mtime = mtime
+
+    @classmethod
+    def build(cls, path, loops=None, encoding="utf-8"):
+        """ Indexes the file at `path`. Each set's loops are found from the format
+        named by its ST01; `loops` restricts them (see `indexed_loops`). """
+        stat = os.stat(path)
+        interchanges = []
+        transactions = []
+        with MappedFile(path, encoding) as mapped:
+            for interchange in mapped.interchanges():
+                element, segment = mapped.encoded(interchange.delimiters)
+                def segment_end(start):
+                    stop = mapped.map.find(segment, start, interchange.end)
+                    return stop if stop >= 0 else interchange.end
+                interchanges.append({
+                    "start": interchange.start,
+                    "header_end": segment_end(interchange.start) if mapped.map[interchange.start:interchange.start+3] == b"ISA" else None,
+                    "end": interchange.end,
+                    "delimiters": list(interchange.delimiters),
+                })
+                group = None
+                for group_start, start, end in mapped.transaction_offsets(interchange):
+                    if group_start is not None:
+                        group = [group_start, segment_end(group_start)]
+                    ts_id = mapped.element(start, end, 1, element)
+                    if ts_id not in supported_formats:
+                        raise ValueError("Transaction set type '{}' at offset {} is not supported".format(ts_id, start))
+                    iterations = {}
+                    for loop_id, tag in indexed_loops(get_compiled_format(ts_id), loops).items():
+                        marker = segment + tag.encode(encoding) + element
+                        offsets = iterations[loop_id] = []
+                        found = mapped.map.find(marker, start, end)
+                        while found >= 0:
+                            offsets.append(found + len(segment))
+                            found = mapped.map.find(marker, found + len(marker), end)
+                    transactions.append({
+                        "interchange": len(interchanges) - 1,
+                        "group": group,
+                        "start": start,
+                        "end": end,
+                        "set": ts_id,
+                        "loops": iterations,
+                    })
+        return cls(path, interchanges, transactions, stat.st_size, stat.st_mtime_ns, encoding)
+
+    @classmethod
+    def load(cls, path, index_path=None):
+        """ Loads the saved index of the file at `path`. Raises ValueError if the
+        file has changed since it was indexed (by size and modification time). """
+        with open(index_path or path + INDEX_SUFFIX) as index_file:
+            saved = json.load(index_file)
+        if saved.get("version") != INDEX_VERSION:
+            raise ValueError("Index for '{}' has version {}; expected {}".format(path, saved.get("version"), INDEX_VERSION))
+        stat = os.stat(path)
+        if (saved["size"], saved["mtime"]) != (stat.st_size, stat.st_mtime_ns):
+            raise ValueError("Index for '{}' is out of date".format(path))
+        return cls(path, saved["interchanges"], saved["transactions"], saved["size"], saved["mtime"], saved["encoding"])
+
+    @classmethod
+    def open(cls, path, loops=None, encoding="utf-8"):
+        """ Loads the saved index of the file at `path`, or builds and saves one
+        if there is none or it is out of date """
+        try:
+            return cls.load(path)
+        except (OSError, ValueError):
+            index = cls.build(path, loops, encoding)
+            index.save()
+            return index
+
+    def save(self, index_path=None):
+        """ Writes the index next to the file (or to `index_path`) """
+        with open(index_path or self.path + INDEX_SUFFIX, "w") as index_file:
+            json.dump({
+                "version": INDEX_VERSION,
+                "size": self.size,
+                "mtime": self.mtime,
+                "encoding": self.encoding,
+                "interchanges": self.interchanges,
+                "transactions": self.transactions,
+            }, index_file)
+
+    def __len__(self):
+        """ Number of transaction sets """
+        return len(self.transactions)
+
+    def delimiters(self, transaction):
+        """ The Delimiters of the interchange holding `transaction` (a position) """
+        return Delimiters(*self.interchanges[self.transactions[transaction]["interchange"]]["delimiters"])
+
+    def _parser(self, parser, n):
+        """ Returns `parser`, or a new EDIParser for the format of transaction set `n` """
+        if parser is None:
+            from .EDIParser import EDIParser
+            parser = EDIParser(edi_format=self.transactions[n]["set"])
+        return parser
+
+    def _context(self, n, segments, start):
+        """ Returns the ParseContext for `segments` of transaction set `n`, read from offset `start` """
+        from .EDIParser import ParseContext
+        return ParseContext(segments, None, start, self.delimiters(n))
+
+    def get_transaction(self, n, parser=None):
+        """ Parses transaction set `n` (counting from 0 across the file) with its
+        ISA and GS segments, returning (found_segments, dict) as
+        EDIParser.parse_stream does for each set """
+        entry = self.transactions[n]
+        interchange = self.interchanges[entry["interchange"]]
+        parser = self._parser(parser, n)
+        envelope = {}
+        if interchange["header_end"] is not None:
+            envelope["ISA"] = read_range(self.path, interchange["start"], interchange["header_end"], self.encoding)
+        if entry["group"] is not None:
+            envelope["GS"] = read_range(self.path, entry["group"][0], entry["group"][1], self.encoding)
+        transaction = read_range(self.path, entry["start"], entry["end"], self.encoding).split(self.delimiters(n).segment)
+        return parser.parse_transaction(envelope, transaction, self._context(n, transaction, entry["start"]))
+
+    def get_loop(self, n, loop_id, iteration, parser=None):
+        """ Parses iteration `iteration` of the top-level loop `loop_id` in
+        transaction set `n`, returning its dict """
+        entry = self.transactions[n]
+        offsets = entry["loops"][loop_id]
+        end = offsets[iteration + 1] if iteration + 1 < len(offsets) else entry["end"]
+        parser = self._parser(parser, n)
+        loop = next(section.loop for section in get_compiled_format(entry["set"]).root.sections if section.id == loop_id)
+        segments = read_range(self.path, offsets[iteration], end, self.encoding).split(self.delimiters(n).segment)
+        return parser.parse_loop(segments, 0, loop, None, None, self._context(n, segments, offsets[iteration]))[0][0]
+
+def read_range(path, start, end, encoding="utf-8"):
+    """ Reads and decodes bytes `start` to `end` of the file at `path` """
+    with open(path, "rb") as edi_file:
+        edi_file.seek(start)
+        return edi_file.read(end - start).decode(encoding)
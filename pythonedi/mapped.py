@@ -0,0 +1,195 @@
+"""
+Memory-mapped segment scanning
+
+Maps an EDI file into memory and finds segments and elements by searching
+the mapped bytes for delimiters, instead of reading the file into a string
+and splitting all of it. Only the parts that are asked for are decoded to
+str, so pulling one element out of every invoice in a large archive (see
+`MappedFile.skim`) runs at close to disk speed.
+
+Offsets are byte offsets into the file. Delimiters must be single-byte
+characters in the file's encoding (they are ASCII in X12), which holds for
+UTF-8 and Latin-1 data.
+"""
+
+import mmap
+from collections import namedtuple
+
+from .delimiters import sniff_delimiters, Delimiters, ISA_HEADER_LENGTH
+
+# Byte range and delimiters of one interchange (or of the whole file if it has no ISA header)
+Interchange = namedtuple("Interchange", ["start", "end", "delimiters"])
+
+def split_element_id(element_id):
+    """ "BIG02" -> ("BIG", 2) """
+    if len(element_id) < 3 or not element_id[-2:].isdigit():
+        raise ValueError("Expected an element ID like 'BIG02', not '{}'".format(element_id))
+    return element_id[:-2], int(element_id[-2:])
+
+class MappedFile(object):
+    """ A read-only memory map of the EDI file at `path`.
+
+    With `detect_delimiters` set, each interchange's delimiters are read from
+    its ISA header; otherwise (or if the file has no ISA header) the given
+    delimiters are used. Close it, or use it as a context manager, to unmap
+    the file. """
+    def __init__(self, path, encoding="utf-8", element_delimiter="^", segment_delimiter="\n", data_delimiter="`", detect_delimiters=True):
+        self.path = path
+        self.encoding = encoding
+        self.default_delimiters = Delimiters(element_delimiter, segment_delimiter, data_delimiter)
+        self.detect_delimiters = detect_delimiters
+        with open(path, "rb") as mapped_file:
+            try:
+                self.map = mmap.mmap(mapped_file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                self.map = b"" # Empty files can't be mapped
+        self.view = memoryview(self.map)
+
+    def close(self):
+        self.view.release()
+        if isinstance(self.map, mmap.mmap):
+            self.map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return len(self.map)
+
+    def text(self, start, end):
+        """ Decodes the bytes from `start` to `end` """
+        return str(self.view[start:end], self.encoding)
+
+    def encoded(self, delimiters):
+        """ Returns the (element, segment) delimiters of a Delimiters tuple as bytes """
+        return delimiters.element.encode(self.encoding), delimiters.segment.encode(self.encoding)
+
+    def _skip_whitespace(self, position):
+        while position < len(self.map) and self.map[position:position+1].isspace():
+            position += 1
+        return position
+
+    def interchanges(self):
+        """ Yields an Interchange for each ISA..IEA interchange in the file. Each one
+        is found by searching for its IEA trailer, without visiting its segments. """
+        size = len(self.map)
+        position = self._skip_whitespace(0)
+        while position < size:
+            delimiters = None
+            if self.detect_delimiters:
+                delimiters = sniff_delimiters(self.map[position:position + ISA_HEADER_LENGTH + 64])
+            if delimiters is None:
+                yield Interchange(position, size, self.default_delimiters)
+                return
+            if delimiters.segment is None:
+                delimiters = delimiters._replace(segment=self.default_delimiters.segment)
+            element, segment = self.encoded(delimiters)
+            end = size
+            trailer = self.map.find(segment + b"IEA" + element, position)
+            if trailer >= 0:
+                end = self.map.find(segment, trailer + len(segment))
+                end = size if end < 0 else end + len(segment)
+            yield Interchange(position, end, delimiters)
+            position = self._skip_whitespace(end)
+
+    def segment_offsets(self, interchange):
+        """ Yields (start, end) for each segment of `interchange`, excluding the terminator """
+        segment = self.encoded(interchange.delimiters)[1]
+        find = self.map.find
+        position, end = interchange.start, interchange.end
+        while position < end:
+            stop = find(segment, position, end)
+            if stop < 0:
+                stop = end
+            if stop > position:
+                yield position, stop
+            position = stop + len(segment)
+
+    def element(self, start, end, position, element_delimiter):
+        """ Decodes element `position` (0 being the segment ID) of the segment from
+        `start` to `end`, or returns None if the segment has fewer elements.
+        `element_delimiter` is in bytes. """
+        find = self.map.find
+        for _ in range(position):
+            start = find(element_delimiter, start, end)
+            if start < 0:
+                return None
+            start += len(element_delimiter)
+        stop = find(element_delimiter, start, end)
+        return self.text(start, stop if stop >= 0 else end)
+
+    def skim(self, element_id):
+        """ Yields the raw value of `element_id` (for example "BIG02") from every
+        segment with that ID, in file order; None where the segment is too
+        short to have it. Only those segments are looked at. """
+        segment_id, position = split_element_id(element_id)
+        for interchange in self.interchanges():
+            element, segment = self.encoded(interchange.delimiters)
+            marker = segment + segment_id.encode(self.encoding) + element
+            start, end = interchange.start, interchange.end
+            if self.map[start:start + len(marker) - len(segment)] == marker[len(segment):]:
+                # The interchange starts with the segment (only likely for ISA)
+                stop = self.map.find(segment, start, end)
+                yield self.element(start, stop if stop >= 0 else end, position, element)
+            while True:
+                found = self.map.find(marker, start, end)
+                if found < 0:
+                    break
+                found += len(segment)
+                stop = self.map.find(segment, found, end)
+                stop = stop if stop >= 0 else end
+                yield self.element(found, stop, position, element)
+                start = stop
+
+    def transactions(self, interchange):
+        """ Yields (envelope, start, end) for each ST..SE transaction set in
+        `interchange`: the byte range of its segments, SE included but not its
+        terminator, and a dict of the raw ISA and GS segments enclosing it.
+        Transaction sets are found by searching for ST and SE, so the segments
+        between them are not visited. """
+        envelope = {}
+        if self.map[interchange.start:interchange.start+3] == b"ISA":
+            envelope["ISA"] = self.segment_at(interchange.start, interchange)
+        for group, start, end in self.transaction_offsets(interchange):
+            if group is not None:
+                envelope = dict(envelope, GS=self.segment_at(group, interchange))
+            yield envelope, start, end
+
+    def segment_at(self, start, interchange):
+        """ Decodes the segment of `interchange` starting at `start` """
+        stop = self.map.find(self.encoded(interchange.delimiters)[1], start, interchange.end)
+        return self.text(start, stop if stop >= 0 else interchange.end)
+
+    def transaction_offsets(self, interchange):
+        """ Yields (group, start, end) for each transaction set in `interchange`,
+        where `group` is the start of the GS segment opening a new functional
+        group before the set, or None. See `transactions`. """
+        element, segment = self.encoded(interchange.delimiters)
+        find, end = self.map.find, interchange.end
+        st_marker, se_marker, gs_marker = (segment + segment_id + element for segment_id in (b"ST", b"SE", b"GS"))
+        position = interchange.start
+        while True:
+            transaction_start = find(st_marker, position, end)
+            if transaction_start < 0:
+                return
+            group = self.map.rfind(gs_marker, position, transaction_start + len(segment))
+            group = group + len(segment) if group >= 0 else None
+            transaction_start += len(segment)
+            trailer = find(se_marker, transaction_start, end)
+            if trailer < 0:
+                raise ValueError("Data ended inside transaction set {} (no SE segment found)".format(
+                    self.text(transaction_start, find(segment, transaction_start, end))))
+            transaction_end = find(segment, trailer + len(segment), end)
+            if transaction_end < 0:
+                transaction_end = end
+            yield group, transaction_start, transaction_end
+            position = transaction_end
+
+def skim(path, element_id, encoding="utf-8"):
+    """ Returns the values of `element_id` (like "BIG02") in every segment of the
+    EDI file at `path` that has it. See MappedFile.skim. """
+    with MappedFile(path, encoding) as mapped:
+        return list(mapped.skim(element_id))
@@ -0,0 +1,186 @@
+"""
+Parser and generator instrumentation
+
+Pass a Metrics object to EDIParser or EDIGenerator to count and time the
+segments they process. Instrumentation is installed on that one instance
+when it is created, by wrapping its hot methods; uninstrumented instances
+run the plain methods and pay nothing for it.
+
+Per segment type, the time spent converting segments (splitting and
+decoding elements, or encoding them) is measured directly. The rest of a
+run's time is format lookup and walking the structure, reported as
+`lookup_seconds`.
+"""
+
+import threading
+import time
+from functools import wraps
+
+from .compiled_format import definition_cache
+
+class Metrics(object):
+    """ Counters and timings for parse/build runs.
+
+    Totals accumulate across runs until `reset`. If `callback` is given it
+    is called with the `as_dict()` summary of each run as the run finishes
+    (for a generator, when it is exhausted).
+
+    One Metrics can be shared by instances used on different threads: each
+    thread tracks its own run in progress, and finished runs are added to
+    the totals under a lock. """
+    def __init__(self, callback=None):
+        self.callback = callback
+        self.reset()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    @property
+    def _run(self):
+        """ [seconds, segment types] of this thread's run in progress, or None """
+        return getattr(self._local, "run", None)
+
+    @_run.setter
+    def _run(self, run):
+        self._local.run = run
+
+    def reset(self):
+        self.runs = 0
+        self.seconds = 0.0
+        self.segment_types = {} # Segment ID -> [count, seconds, bytes]
+
+    def as_dict(self):
+        return self._summary(self.runs, self.seconds, self.segment_types)
+
+    @staticmethod
+    def _summary(runs, seconds, segment_types):
+        segments = sum(stats[0] for stats in segment_types.values())
+        conversion_seconds = sum(stats[1] for stats in segment_types.values())
+        size = sum(stats[2] for stats in segment_types.values())
+        return {
+            "runs": runs,
+            "segments": segments,
+            "bytes": size,
+            "seconds": seconds,
+            "conversion_seconds": conversion_seconds,
+            "lookup_seconds": max(seconds - conversion_seconds, 0.0),
+            "segments_per_second": segments / seconds if seconds else 0.0,
+            "segment_types": dict((segment_id, {"count": stats[0], "seconds": stats[1], "bytes": stats[2]})
+                                  for segment_id, stats in segment_types.items()),
+        }
+
+    def segment(self, segment_id, seconds, size):
+        """ Records one segment converted in the current run """
+        run = self._run
+        if run is None:
+            with self._lock:
+                self._add(self.segment_types, segment_id, 1, seconds, size)
+        else:
+            self._add(run[1], segment_id, 1, seconds, size)
+
+    @staticmethod
+    def _add(segment_types, segment_id, count, seconds, size):
+        stats = segment_types.get(segment_id)
+        if stats is None:
+            segment_types[segment_id] = [count, seconds, size]
+        else:
+            stats[0] += count
+            stats[1] += seconds
+            stats[2] += size
+
+    def _finish(self, run):
+        seconds, segment_types = run
+        with self._lock:
+            self.runs += 1
+            self.seconds += seconds
+            for segment_id, (count, segment_seconds, size) in segment_types.items():
+                self._add(self.segment_types, segment_id, count, segment_seconds, size)
+        if self.callback is not None:
+            self.callback(self._summary(1, seconds, segment_types))
+
+    def timed(self, function):
+        """ Wraps `function` so a call to it that is not part of another run counts as one run """
+        @wraps(function)
+        def timed_function(*args, **kwargs):
+            if self._run is not None:
+                return function(*args, **kwargs)
+            run = self._run = [0.0, {}]
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                run[0] += time.perf_counter() - start
+                self._run = None
+                self._finish(run)
+        return timed_function
+
+    def timed_iterator(self, function):
+        """ Wraps the generator function `function` so that iterating a call to it
+        counts as one run. Only time spent inside the generator is counted, not
+        time the consumer spends between items. """
+        @wraps(function)
+        def timed_function(*args, **kwargs):
+            if self._run is not None:
+                return function(*args, **kwargs)
+            return self._iterate(function(*args, **kwargs))
+        return timed_function
+
+    def _iterate(self, iterator):
+        run = [0.0, {}]
+        try:
+            while True:
+                # Segments converted while the generator runs belong to its run,
+                # even if the consumer interleaves other runs between items
+                outer, self._run = self._run, run
+                start = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+                finally:
+                    run[0] += time.perf_counter() - start
+                    self._run = outer
+                yield item
+        finally:
+            self._finish(run)
+
+def instrument_parser(parser, metrics):
+    """ Installs `metrics` on an EDIParser instance """
+    parse_segment = parser.parse_segment
+    def timed_parse_segment(segment, segment_format, index=None, context=None):
+        start = time.perf_counter()
+        result = parse_segment(segment, segment_format, index, context)
+        metrics.segment(segment_format["id"], time.perf_counter() - start, len(segment) + len(context.segment_delimiter if context is not None else parser.segment_delimiter))
+        return result
+    parser.parse_segment = timed_parse_segment
+    project_segment = parser.project_segment
+    def timed_project_segment(segment, projection, index=None, context=None):
+        start = time.perf_counter()
+        result = project_segment(segment, projection, index, context)
+        metrics.segment(projection.segment_id, time.perf_counter() - start, len(segment) + len(context.segment_delimiter if context is not None else parser.segment_delimiter))
+        return result
+    parser.project_segment = timed_project_segment
+    for name in ("parse", "parse_segments", "parse_transaction"):
+        setattr(parser, name, metrics.timed(getattr(parser, name)))
+    for name in ("parse_stream", "parse_transactions", "parse_mapped", "iter_events"):
+        setattr(parser, name, metrics.timed_iterator(getattr(parser, name)))
+
+def instrument_generator(generator, metrics):
+    """ Installs `metrics` on an EDIGenerator instance """
+    encoders = definition_cache()
+    segment_encoder = generator.segment_encoder
+    def timed_segment_encoder(segment):
+        cached = encoders.get(segment)
+        if cached is not None:
+            return cached
+        encode = segment_encoder(segment)
+        segment_id = segment["id"]
+        def timed_encode(segment_data, element_delimiter):
+            start = time.perf_counter()
+            output = encode(segment_data, element_delimiter)
+            metrics.segment(segment_id, time.perf_counter() - start, len(output) + len(generator.segment_delimiter))
+            return output
+        return encoders.set(segment, timed_encode)
+    generator.segment_encoder = timed_segment_encoder
+    generator.build = metrics.timed(generator.build)
+    for name in ("iter_segments", "iter_interchange"):
+        setattr(generator, name, metrics.timed_iterator(getattr(generator, name)))
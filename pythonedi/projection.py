@@ -0,0 +1,63 @@
+"""
+Projection parsing
+
+A projection names the parts of a transaction set to parse, nested like the
+parser's output:
+
+    {"BIG": ["BIG02"], "L_IT1": {"IT1": ["IT102", "IT104"]}, "TDS": None}
+
+Segments map to the element IDs to decode (None for all of them) and loops
+to a projection of their own (None for the whole loop). Anything not named
+is skipped by EDIParser after reading only its segment ID: it is neither
+split into elements nor decoded, and named segments are only split as far
+as their last requested element.
+
+`compile_projection` checks a projection against a compiled format and
+turns it into the {section ID: SegmentProjection, dict or None} tables the
+parser walks.
+"""
+
+from .compiled_format import LOOP
+from .datatypes import segment_decoders
+
+class SegmentProjection(object):
+    """ The elements of one segment definition to decode """
+    __slots__ = ("definition", "segment_id", "elements", "maxsplit")
+
+    def __init__(self, definition, element_ids):
+        self.definition = definition
+        self.segment_id = definition["id"]
+        decoders = segment_decoders(definition)
+        positions = dict((key, position) for position, (key, decode) in enumerate(decoders, 1))
+        # (element ID, position in the split segment, decoder) for each requested element
+        self.elements = []
+        for element_id in element_ids:
+            if element_id not in positions:
+                raise ValueError("Projection names element '{}', which segment {} does not have".format(element_id, self.segment_id))
+            position = positions[element_id]
+            self.elements.append((element_id, position, decoders[position - 1][1]))
+        self.elements.sort(key=lambda element: element[1])
+        # Split just past the last requested element; what follows stays in one piece
+        self.maxsplit = self.elements[-1][1] + 1 if self.elements else 1
+
+def compile_projection(level, projection):
+    """ Compiles `projection` for `level` (a CompiledLoop, usually a format's root).
+    Raises ValueError for IDs the level doesn't have and TypeError for
+    projections of the wrong shape. """
+    if not isinstance(projection, dict):
+        raise TypeError("Expected a dict for the projection of {}, not {!r}".format(level.id or "the transaction set", projection))
+    sections = dict((section.id, section) for section in level.sections)
+    compiled = {}
+    for section_id, wanted in projection.items():
+        section = sections.get(section_id)
+        if section is None:
+            raise ValueError("Projection names '{}', which is not a segment or loop of {}".format(section_id, level.id or "the transaction set"))
+        if wanted is None:
+            compiled[section_id] = None
+        elif section.kind == LOOP:
+            compiled[section_id] = compile_projection(section.loop, wanted)
+        elif isinstance(wanted, (str, dict)):
+            raise TypeError("Expected a list of element IDs for the projection of segment '{}', not {!r}".format(section_id, wanted))
+        else:
+            compiled[section_id] = SegmentProjection(section.definition, wanted)
+    return compiled
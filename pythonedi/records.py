@@ -0,0 +1,220 @@
+"""
+Compact segment records
+
+An alternative to the dict EDIParser.parse_segment builds for every
+segment. A record is a tuple of the segment's element values; the element
+IDs live once on a record class shared by every record of that segment
+definition, so a record costs no more memory than a plain tuple.
+
+Lazy records go further and keep the raw field strings, converting an
+element (dates, numbers) only when it is first read.
+"""
+
+from .compiled_format import definition_cache
+
+# Segment definition -> record class, see `record_class` and `lazy_record_class`
+_record_classes = definition_cache()
+_lazy_record_classes = definition_cache()
+
+# Marks a lazy record element that has not been decoded yet
+_PENDING = object()
+
+class SegmentRecord(tuple):
+    """ Base class for segment records; use `record_class` to get one per segment definition.
+
+    Supports positional access (`record[1]`), access by element ID
+    (`record["BIG02"]`, `record.get("BIG02")`) and attribute access
+    (`record.BIG02`). As with the dict output, elements missing from the
+    end of the segment raise KeyError by ID; as attributes they are None. """
+    __slots__ = ()
+    segment_id = None
+    element_ids = ()
+    _index = {}
+
+    def __getitem__(self, key):
+        if key.__class__ is str:
+            position = self._index.get(key)
+            if position is None or position >= len(self):
+                raise KeyError(key)
+            return tuple.__getitem__(self, position)
+        return tuple.__getitem__(self, key)
+
+    def get(self, key, default=None):
+        """ Returns the value of element ID `key`, or `default` if it is not present """
+        position = self._index.get(key)
+        if position is None or position >= len(self):
+            return default
+        return tuple.__getitem__(self, position)
+
+    def keys(self):
+        """ Element IDs present in this segment, in order """
+        return self.element_ids[:len(self)]
+
+    def items(self):
+        return zip(self.element_ids, self)
+
+    def to_dict(self):
+        """ Converts the record to the dict EDIParser builds by default """
+        return dict(zip(self.element_ids, self))
+
+    def __repr__(self):
+        return "{}({})".format(self.segment_id, ", ".join("{}={!r}".format(key, value) for key, value in self.items()))
+
+    def __reduce__(self):
+        # Rebuild through record_class so unpickled records share the class
+        return (_unpickle_record, (self.segment_id, self.element_ids, tuple(self)))
+
+def _element_property(position):
+    def get_element(self):
+        return tuple.__getitem__(self, position) if position < len(self) else None
+    return property(get_element)
+
+def make_record_class(segment_id, element_ids, base=SegmentRecord):
+    """ Creates a record class for a segment with the given element IDs """
+    namespace = {
+        "__slots__": (),
+        "segment_id": segment_id,
+        "element_ids": tuple(element_ids),
+        "_index": dict((element_id, position) for position, element_id in enumerate(element_ids)),
+    }
+    for position, element_id in enumerate(element_ids):
+        namespace[element_id] = _element_property(position)
+    return type(str(segment_id) + "Record", (base,), namespace)
+
+def record_class(segment_format):
+    """ Returns the record class for a segment definition, creating it on first use """
+    cls = _record_classes.get(segment_format)
+    if cls is None:
+        cls = _record_classes.set(segment_format, make_record_class(segment_format["id"], [element["id"] for element in segment_format["elements"]]))
+    return cls
+
+_unpickled_classes = {}
+
+def _unpickle_record(segment_id, element_ids, values):
+    key = (segment_id, element_ids)
+    if key not in _unpickled_classes:
+        _unpickled_classes[key] = make_record_class(segment_id, element_ids)
+    return _unpickled_classes[key](values)
+
+class LazySegmentRecord(object):
+    """ Base class for lazy segment records; use `lazy_record_class` to get one per segment definition.
+
+    Holds the segment's raw fields and decodes each element on first access,
+    remembering the result. Access works as for SegmentRecord; `raw(key)`
+    returns the undecoded string. Pickling decodes every element and
+    produces a plain SegmentRecord. """
+    __slots__ = ("_fields", "_decoded")
+    segment_id = None
+    element_ids = ()
+    _index = {}
+    _elements = ()
+    _decode = None
+
+    def __init__(self, fields):
+        # fields[0] is the segment ID; element values follow it
+        self._fields = fields
+        self._decoded = None
+
+    def _value(self, position):
+        decoded = self._decoded
+        if decoded is None:
+            decoded = self._decoded = [_PENDING] * (len(self._fields) - 1)
+        value = decoded[position]
+        if value is _PENDING:
+            value = decoded[position] = self._decode(self._fields[position + 1], self._elements[position])
+        return value
+
+    def _position(self, key):
+        if key.__class__ is str:
+            position = self._index.get(key)
+            if position is None or position >= len(self._fields) - 1:
+                raise KeyError(key)
+            return position
+        if key < 0:
+            key += len(self._fields) - 1
+        if not 0 <= key < len(self._fields) - 1:
+            raise IndexError("segment element index out of range")
+        return key
+
+    def __getitem__(self, key):
+        return self._value(self._position(key))
+
+    def raw(self, key):
+        """ Returns the undecoded string for element ID or position `key` """
+        return self._fields[self._position(key) + 1]
+
+    def get(self, key, default=None):
+        """ Returns the value of element ID `key`, or `default` if it is not present """
+        position = self._index.get(key)
+        if position is None or position >= len(self._fields) - 1:
+            return default
+        return self._value(position)
+
+    def __len__(self):
+        return len(self._fields) - 1
+
+    def __iter__(self):
+        for position in range(len(self._fields) - 1):
+            yield self._value(position)
+
+    def keys(self):
+        """ Element IDs present in this segment, in order """
+        return self.element_ids[:len(self._fields) - 1]
+
+    def items(self):
+        return zip(self.element_ids, self)
+
+    def to_dict(self):
+        """ Converts the record to the dict EDIParser builds by default """
+        return dict(zip(self.element_ids, self))
+
+    def __eq__(self, other):
+        if isinstance(other, LazySegmentRecord):
+            return self.segment_id == other.segment_id and self._fields == other._fields
+        return tuple(self) == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return "{}({})".format(self.segment_id, ", ".join("{}={!r}".format(key, self.raw(key)) for key in self.keys()))
+
+    def __reduce__(self):
+        return (_unpickle_record, (self.segment_id, self.element_ids, tuple(self)))
+
+def _lazy_element_property(position):
+    def get_element(self):
+        return self._value(position) if position < len(self._fields) - 1 else None
+    return property(get_element)
+
+def lazy_record_class(segment_format, decode):
+    """ Returns the lazy record class for a segment definition, creating it on first use.
+
+    `decode(field, element)` converts a raw field using its element definition. """
+    cls = _lazy_record_classes.get(segment_format)
+    if cls is None or cls._decode is not decode:
+        element_ids = tuple(element["id"] for element in segment_format["elements"])
+        namespace = {
+            "__slots__": (),
+            "segment_id": segment_format["id"],
+            "element_ids": element_ids,
+            "_index": dict((element_id, position) for position, element_id in enumerate(element_ids)),
+            "_elements": tuple(segment_format["elements"]),
+            "_decode": staticmethod(decode),
+        }
+        for position, element_id in enumerate(element_ids):
+            namespace[element_id] = _lazy_element_property(position)
+        cls = _lazy_record_classes.set(segment_format, type(str(segment_format["id"]) + "LazyRecord", (LazySegmentRecord,), namespace))
+    return cls
+
+def as_dicts(edi_data):
+    """ Converts parsed output containing records (at any depth) to the default dict shape """
+    if isinstance(edi_data, (SegmentRecord, LazySegmentRecord)):
+        return edi_data.to_dict()
+    elif isinstance(edi_data, dict):
+        return dict((key, as_dicts(value)) for key, value in edi_data.items())
+    elif isinstance(edi_data, list):
+        return [as_dicts(value) for value in edi_data]
+    return edi_data
@@ -0,0 +1,113 @@
+"""
+Incremental segment reading
+
+Splits EDI data into segments as it is read from a file, path or iterable of
+chunks, so an interchange never has to be held in memory as a whole.
+"""
+
+import os
+import codecs
+
+from .delimiters import sniff_delimiters, ISA_HEADER_LENGTH
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+class SegmentSplitter(object):
+    """ Push-based segment splitter.
+
+    Feed it chunks of `str` or `bytes`; it returns the segments completed by
+    each chunk and keeps any trailing partial segment (including a segment
+    terminator split across two chunks) until the next one arrives.
+
+    With `detect` set, the segment terminator is sniffed from the ISA header
+    at the start of the data and again after every IEA trailer, so
+    concatenated interchanges may each use their own delimiters. """
+    def __init__(self, segment_delimiter="\n", encoding="utf-8", detect=False):
+        self.segment_delimiter = segment_delimiter
+        self.encoding = encoding
+        self.detect = detect
+        self._decoder = codecs.getincrementaldecoder(encoding)()
+        self._tail = ""
+        self._sniff = detect
+
+    def feed(self, chunk):
+        """ Adds `chunk` to the buffer and returns a list of the completed segments """
+        if isinstance(chunk, bytes):
+            chunk = self._decoder.decode(chunk)
+        if chunk == "":
+            return []
+        return self._split(self._tail + chunk, False)
+
+    def close(self):
+        """ Flushes the buffer, returning the final unterminated segment (if any) in a list """
+        segments = self._split(self._tail + self._decoder.decode(b"", final=True), True)
+        tail, self._tail = self._tail, ""
+        if tail.strip() != "":
+            segments.append(tail)
+        return segments
+
+    def _split(self, text, final):
+        segments = []
+        while True:
+            if self._sniff:
+                head = text[:ISA_HEADER_LENGTH + 64].lstrip()
+                if "ISA".startswith(head[:3]) and len(head) < ISA_HEADER_LENGTH + 2 and not final:
+                    # Wait for the rest of the header
+                    self._tail = text
+                    return segments
+                delimiters = sniff_delimiters(head)
+                if delimiters is not None and delimiters.segment is not None:
+                    self.segment_delimiter = delimiters.segment
+                self._sniff = False
+
+            pieces = text.split(self.segment_delimiter)
+            text = pieces.pop()
+            for index, piece in enumerate(pieces):
+                segments.append(piece)
+                if self.detect and (piece[:3] == "IEA" or (piece[:1].isspace() and piece.lstrip()[:3] == "IEA")):
+                    rest = pieces[index+1:]
+                    if rest and self._same_header(rest[0], rest[1] if len(rest) > 1 else text):
+                        continue
+                    # Next interchange may use another terminator; split the rest again
+                    text = self.segment_delimiter.join(rest + [text])
+                    self._sniff = True
+                    break
+            else:
+                self._tail = text
+                return segments
+
+    def _same_header(self, piece, following):
+        """ True if `piece` is a complete ISA header ended by the current terminator
+        (and not by the terminator plus a line break the current one lacks) """
+        return piece[:3] == "ISA" and len(piece) == ISA_HEADER_LENGTH - 1 and following[:1] not in ("", "\r", "\n")
+
+    @property
+    def pending(self):
+        """ The partial segment currently buffered """
+        return self._tail
+
+def read_chunks(source, chunk_size=DEFAULT_CHUNK_SIZE):
+    """ Yields chunks from a path, a file object (text or binary) or an iterable of chunks """
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as source_file:
+            for chunk in read_chunks(source_file, chunk_size):
+                yield chunk
+    elif hasattr(source, "read"):
+        while True:
+            chunk = source.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    else:
+        for chunk in source:
+            yield chunk
+
+def iter_segments(source, segment_delimiter="\n", chunk_size=DEFAULT_CHUNK_SIZE, encoding="utf-8", detect=False):
+    """ Yields segments from `source` one at a time. See `read_chunks` for accepted sources
+    and `SegmentSplitter` for `detect`. """
+    splitter = SegmentSplitter(segment_delimiter, encoding, detect)
+    for chunk in read_chunks(source, chunk_size):
+        for segment in splitter.feed(chunk):
+            yield segment
+    for segment in splitter.close():
+        yield segment
@@ -0,0 +1,164 @@
+"""
+Compiled structural validation
+
+Compiles a format definition into a state machine over segment IDs that
+checks a transaction set's structure: segment order, mandatory ("M")
+segments and loops, `max_uses` and loop `repeat` limits. The state is a
+stack of (level, position, uses, iterations) frames, one per open loop;
+moving to the next segment is a few dict lookups per open loop, however
+large the format or the data.
+
+Order follows the parser's rules: within a level, sections must appear in
+the order of the definition, the first segment of a loop always starts a
+new iteration, and a segment the current loop does not have closes it.
+
+Used by EDIParser(structure=True), which checks every transaction set it
+parses, and by EDIParser.validate_stream, which only checks.
+"""
+
+from .compiled_format import LOOP, definition_cache
+from .diagnostics import MISSING_SEGMENT, LOOP_REPEAT, MAX_USES, SEGMENT_ORDER, UNRECOGNIZED_SEGMENT
+
+# Compiled format -> machine, see `structure_machine`
+_machines = definition_cache()
+
+# How a segment was accepted, see StructureCursor.advance
+_REPEAT, _ITERATION, _FORWARD = range(3)
+
+class StructureLevel(object):
+    """ Transition tables for one level: the transaction set (ST..SE) or a loop """
+    __slots__ = ("id", "definition", "sections", "children", "first_tag", "repeat", "forward", "mandatory_before")
+
+    def __init__(self, loop_id, definition, sections, repeat):
+        self.id = loop_id
+        self.definition = definition
+        self.sections = sections
+        self.children = [None] * len(sections) # StructureLevel of each loop section
+        self.first_tag = sections[0].tag if loop_id is not None else None
+        self.repeat = repeat
+        # forward[position + 1]: tag -> first position after `position` with that tag
+        self.forward = []
+        for position in range(-1, len(sections)):
+            table = {}
+            for target in range(len(sections) - 1, position, -1):
+                table[sections[target].tag] = target
+            self.forward.append(table)
+        # mandatory_before[position]: mandatory sections before `position`
+        self.mandatory_before = [0]
+        for section in sections:
+            self.mandatory_before.append(self.mandatory_before[-1] + (section.req == "M"))
+
+    def missing(self, after, before):
+        """ IDs of the mandatory sections strictly between positions `after` and `before` """
+        if self.mandatory_before[before] == self.mandatory_before[after + 1]:
+            return []
+        return [section.id for section in self.sections[after + 1:before] if section.req == "M"]
+
+class StructureMachine(object):
+    """ The compiled structure of one format's transaction set """
+    def __init__(self, compiled_format):
+        self.compiled_format = compiled_format
+        self.root = self._compile(None, None, compiled_format.transaction_sections, 1)
+
+    def _compile(self, loop_id, definition, sections, repeat):
+        level = StructureLevel(loop_id, definition, sections, repeat)
+        for position, section in enumerate(sections):
+            if section.kind == LOOP:
+                level.children[position] = self._compile(section.id, section.definition, section.loop.sections, section.loop.repeat)
+        return level
+
+    def cursor(self, report):
+        """ Returns a StructureCursor at the start of a transaction set """
+        return StructureCursor(self, report)
+
+def structure_machine(compiled_format):
+    """ Returns the StructureMachine for a compiled format, compiling it on first use """
+    machine = _machines.get(compiled_format)
+    if machine is None:
+        machine = _machines.set(compiled_format, StructureMachine(compiled_format))
+    return machine
+
+class StructureCursor(object):
+    """ Position of one transaction set in a StructureMachine.
+
+    Feed it each segment ID from ST to SE with `advance`, then call `finish`.
+    Problems are passed to `report(rule, message, segment_id, definition)`,
+    which may raise to stop at the first one. """
+    def __init__(self, machine, report):
+        self.machine = machine
+        self.report = report
+        self.frames = [[machine.root, -1, 0, 1]] # [level, position, uses, iterations]
+
+    def advance(self, tag):
+        """ Moves past a segment with ID `tag`. Returns its compiled section, or None
+        (after reporting it) if the segment does not belong here; the position
+        is then left as it was. """
+        frames = self.frames
+        depth = len(frames) - 1
+        while depth >= 0:
+            level, position = frames[depth][0], frames[depth][1]
+            if tag == level.first_tag:
+                action = _ITERATION
+                break
+            if position >= 0 and tag == level.sections[position].tag:
+                action = _REPEAT
+                break
+            target = level.forward[position + 1].get(tag)
+            if target is not None:
+                action = _FORWARD
+                break
+            depth -= 1
+        else:
+            sections = self.machine.compiled_format.lookup(tag)
+            if sections:
+                self.report(SEGMENT_ORDER, "Segment {} is out of order".format(tag), tag, sections[0].definition)
+            else:
+                self.report(UNRECOGNIZED_SEGMENT, "Unrecognized segment: {}".format(tag), tag, None)
+            return None
+
+        # The loops above the one that has the segment are finished
+        while len(frames) - 1 > depth:
+            self.close(frames.pop())
+        frame = frames[depth]
+        if action == _REPEAT:
+            frame[2] += 1
+            section = level.sections[frame[1]]
+            if frame[2] == section.definition["max_uses"] + 1:
+                self.report(MAX_USES, "Segment {} is used more than {} times".format(tag, section.definition["max_uses"]), tag, section.definition)
+            return section
+        if action == _ITERATION:
+            self.close(frame)
+            frame[3] += 1
+            if frame[3] == level.repeat + 1:
+                self.report(LOOP_REPEAT, "Loop '{}' has more than {} iterations".format(level.id, level.repeat), tag, level.definition)
+            target = 0
+        else:
+            for section_id in level.missing(frame[1], target):
+                self.missing(level, section_id, tag)
+        frame[1], frame[2] = target, 1
+
+        # Entering a loop (or loops, if one starts with another)
+        section = level.sections[target]
+        while section.kind == LOOP:
+            level = level.children[target]
+            frames.append([level, 0, 1, 1])
+            target = 0
+            section = level.sections[0]
+        return section
+
+    def close(self, frame):
+        """ Reports the mandatory sections missing after a frame's position """
+        level, position = frame[0], frame[1]
+        for section_id in level.missing(position, len(level.sections)):
+            self.missing(level, section_id, None)
+
+    def missing(self, level, section_id, tag):
+        if level.id is None:
+            self.report(MISSING_SEGMENT, "EDI data is missing mandatory segment '{}'.".format(section_id), tag, None)
+        else:
+            self.report(MISSING_SEGMENT, "EDI data in loop '{}' is missing mandatory segment '{}'.".format(level.id, section_id), tag, level.definition)
+
+    def finish(self):
+        """ Closes every open loop and the transaction set itself """
+        while self.frames:
+            self.close(self.frames.pop())
@@ -1,20 +1,170 @@
 """
 Imports and manages EDI format definitions
+
+Definitions are read from the formats/ directory the first time a
+transaction set id is used, not when the package is imported. Compiled
+formats can optionally be cached on disk (see `enable_format_cache`).
 """
 
 import os
 import json
+import pickle
+import threading
+from collections.abc import MutableMapping
+
+from .compiled_format import CompiledFormat, clear_definition_caches
+
+FORMATS_PATH = os.path.join(os.path.dirname(__file__), "formats")
+
+# Bump when CompiledFormat changes shape, so stale cache files are ignored
+CACHE_VERSION = 2
+
+def load_format(path):
+    """ Loads a single JSON format definition """
+    with open(path) as format_file:
+        format_def = json.load(format_file)
+    if type(format_def) is not list:
+        raise TypeError("Imported definition {} is not a list of segments".format(os.path.basename(path)[:-5]))
+    return format_def
 
 def load_supported_formats(formats_path):
+    """ Eagerly loads every definition in `formats_path` into a dict """
     supported_formats = {}
     for filename in os.listdir(formats_path):
         if filename.endswith(".json"):
-            format_name = filename[:-5]
-            with open(os.path.join(formats_path, filename)) as format_file:
-                format_def = json.load(format_file)
-            if type(format_def) is not list:
-                raise TypeError("Imported definition {} is not a list of segments".format(format_name))
-            supported_formats[format_name] = format_def
+            supported_formats[filename[:-5]] = load_format(os.path.join(formats_path, filename))
     return supported_formats
 
-supported_formats = load_supported_formats(os.path.join(os.path.dirname(__file__), "formats"))
+class FormatRegistry(MutableMapping):
+    """ Dict-like collection of format definitions, keyed by transaction set id.
+
+    Names are discovered from the *.json files in `formats_path`, but each
+    file is only read and parsed when its definition is first requested.
+    Definitions can also be added (or replaced) by assigning to a key. """
+    def __init__(self, formats_path):
+        self.formats_path = formats_path
+        self._paths = None
+        self._definitions = {}
+        self._assigned = set()
+
+    @property
+    def paths(self):
+        """ Format name -> JSON file, for definitions shipped as files """
+        if self._paths is None:
+            # Fill a local dict and publish it once, so other threads never see it half-built
+            paths = {}
+            for filename in os.listdir(self.formats_path):
+                if filename.endswith(".json"):
+                    paths[filename[:-5]] = os.path.join(self.formats_path, filename)
+            self._paths = paths
+        return self._paths
+
+    def __getitem__(self, format_name):
+        if format_name not in self._definitions:
+            if format_name not in self.paths:
+                raise KeyError(format_name)
+            self._definitions[format_name] = load_format(self.paths[format_name])
+        return self._definitions[format_name]
+
+    def __setitem__(self, format_name, format_def):
+        if type(format_def) is not list:
+            raise TypeError("Definition {} is not a list of segments".format(format_name))
+        replaced = self._definitions.get(format_name)
+        self._definitions[format_name] = format_def
+        self._assigned.add(format_name)
+        compiled_formats.pop(format_name, None)
+        if replaced is not None and replaced is not format_def:
+            # Let go of encoders, decoders etc. built for the old definition
+            clear_definition_caches()
+
+    def __delitem__(self, format_name):
+        if format_name not in self:
+            raise KeyError(format_name)
+        self._definitions.pop(format_name, None)
+        self._assigned.discard(format_name)
+        self.paths.pop(format_name, None)
+        compiled_formats.pop(format_name, None)
+        clear_definition_caches()
+
+    def __contains__(self, format_name):
+        return format_name in self._definitions or format_name in self.paths
+
+    def __iter__(self):
+        names = list(self.paths)
+        names.extend(name for name in self._definitions if name not in self.paths)
+        return iter(names)
+
+    def __len__(self):
+        return len(list(iter(self)))
+
+    def share_definition(self, format_name, format_def):
+        """ Uses `format_def`, loaded from the file's cached compiled format,
+        as the definition of `format_name` instead of reading the JSON again """
+        self._definitions[format_name] = format_def
+
+    def source_path(self, format_name):
+        """ Returns the JSON file `format_name` is defined by, or None if it was assigned in code """
+        if format_name in self._assigned:
+            return None
+        return self.paths.get(format_name)
+
+supported_formats = FormatRegistry(FORMATS_PATH)
+
+compiled_formats = {}
+
+# Serializes compiling, so threads starting at once share one compiled format
+_compile_lock = threading.Lock()
+
+# Directory for serialized compiled formats; None disables the cache
+format_cache_dir = os.environ.get("PYTHONEDI_FORMAT_CACHE") or None
+
+def enable_format_cache(cache_dir):
+    """ Opts in to caching compiled formats as pickles in `cache_dir`.
+
+    Later processes then load a format straight from its pickle instead of
+    parsing and compiling the JSON. Only definitions shipped as files are
+    cached; a cache file is ignored once its JSON file changes. The cache
+    can also be enabled with the PYTHONEDI_FORMAT_CACHE environment variable.
+    Pass None to disable it again. """
+    global format_cache_dir
+    if cache_dir is not None and not os.path.isdir(cache_dir):
+        os.makedirs(cache_dir)
+    format_cache_dir = cache_dir
+
+def cache_path(format_name):
+    """ Returns the cache file for `format_name`, or None if it can't be cached """
+    source_path = supported_formats.source_path(format_name)
+    if format_cache_dir is None or source_path is None:
+        return None
+    stat = os.stat(source_path)
+    return os.path.join(format_cache_dir, "{}-{}-{}-{}.pickle".format(format_name, CACHE_VERSION, stat.st_mtime_ns, stat.st_size))
+
+def get_compiled_format(format_name):
+    """ Returns the compiled dispatch structure for `format_name`, compiling it on first use """
+    compiled = compiled_formats.get(format_name)
+    if compiled is not None:
+        return compiled
+    with _compile_lock:
+        if format_name not in compiled_formats:
+            _compile_format(format_name)
+        return compiled_formats[format_name]
+
+def _compile_format(format_name):
+    """ Compiles (or loads from the cache) `format_name` into `compiled_formats` """
+    if format_name not in supported_formats:
+        raise ValueError("Unsupported EDI format {}".format(format_name))
+    path = cache_path(format_name)
+    if path is not None and os.path.exists(path):
+        with open(path, "rb") as cache_file:
+            compiled = pickle.load(cache_file)
+        # Share the cached definition rather than reading the JSON too
+        supported_formats.share_definition(format_name, compiled.definition)
+    else:
+        compiled = CompiledFormat(format_name, supported_formats[format_name])
+        if path is not None:
+            # Write to a temporary file first so readers never see a partial pickle
+            temporary_path = "{}.{}.tmp".format(path, os.getpid())
+            with open(temporary_path, "wb") as cache_file:
+                pickle.dump(compiled, cache_file, pickle.HIGHEST_PROTOCOL)
+            os.replace(temporary_path, path)
+    compiled_formats[format_name] = compiled
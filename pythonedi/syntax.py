@@ -0,0 +1,99 @@
+"""
+Compiled syntax rule validation
+
+A segment definition's `syntax` rules (ATLEASTONE, ALLORNONE, IFATLEASTONE)
+only depend on which of the segment's elements are present. Each rule is
+compiled into bitmasks over element positions, a segment is reduced to the
+bitmask of its non-empty fields, and the outcome is remembered per bitmask,
+so validating a segment usually costs one mask and one dict lookup.
+
+Used by the generator's compiled encoders and by EDIParser(validate=True).
+"""
+
+from itertools import compress
+
+from .compiled_format import definition_cache
+
+# Outcomes remembered per segment definition before the memo stops growing
+MEMO_SIZE = 1024
+
+# Segment definition -> checker, see `syntax_checker`
+_checkers = definition_cache()
+
+class SyntaxRule(object):
+    """ One compiled syntax rule. Criteria are one-based element positions,
+    matching a split segment (or generator output) with the segment ID first. """
+    __slots__ = ("rule", "criteria", "segment_id", "mask", "first", "others")
+
+    def __init__(self, segment_id, rule):
+        self.rule = rule["rule"]
+        self.criteria = tuple(rule["criteria"])
+        self.segment_id = segment_id
+        self.mask = 0
+        for position in self.criteria:
+            self.mask |= 1 << position
+        self.first = 1 << self.criteria[0]
+        self.others = self.mask & ~self.first
+
+    def violated(self, mask):
+        """ True if a segment with the presence bitmask `mask` breaks this rule """
+        if self.rule == "ATLEASTONE":
+            return not mask & self.mask
+        elif self.rule == "ALLORNONE":
+            present = mask & self.mask
+            return present != 0 and present != self.mask
+        elif self.rule == "IFATLEASTONE":
+            return bool(mask & self.first) and not mask & self.others
+        return False
+
+    def element_ids(self, criteria=None):
+        return ", ".join(["{}{:02d}".format(self.segment_id, position) for position in (criteria or self.criteria)])
+
+    @property
+    def message(self):
+        """ Describes the rule as a syntax error """
+        if self.rule == "ATLEASTONE":
+            return "Syntax error parsing segment {}: At least one of {} is required.".format(self.segment_id, self.element_ids())
+        elif self.rule == "ALLORNONE":
+            return "Syntax error parsing segment {}: If one of {} is present, all are required.".format(self.segment_id, self.element_ids())
+        return "Syntax error parsing segment {}: If {} is present, at least one of {} are required.".format(
+            self.segment_id, self.element_ids(self.criteria[:1]), self.element_ids(self.criteria[1:]))
+
+def compile_rules(segment_format):
+    """ Compiles the `syntax` list of a segment definition; unknown rule types are ignored """
+    return [SyntaxRule(segment_format["id"], rule) for rule in segment_format.get("syntax", [])
+            if rule["rule"] in ("ATLEASTONE", "ALLORNONE", "IFATLEASTONE")]
+
+def syntax_checker(segment_format):
+    """ Returns check(fields) for a segment definition, or None if it has no syntax rules.
+
+    `fields` is the segment split into its ID and element values (empty
+    strings for absent elements). check returns the first rule the segment
+    breaks, or None. """
+    check = _checkers.get(segment_format, False) # None is cached for segments without rules
+    if check is not False:
+        return check
+
+    rules = compile_rules(segment_format)
+    if rules:
+        # Bit value of each position a rule looks at; positions past the end are absent
+        bits = [1 << position for position in range(max(max(rule.criteria) for rule in rules) + 1)]
+        outcomes = {}
+        def check(fields):
+            mask = sum(compress(bits, fields))
+            try:
+                return outcomes[mask]
+            except KeyError:
+                pass
+            broken = None
+            for rule in rules:
+                if rule.violated(mask):
+                    broken = rule
+                    break
+            if len(outcomes) < MEMO_SIZE:
+                outcomes[mask] = broken
+            return broken
+    else:
+        check = None
+
+    return _checkers.set(segment_format, check)
@@ -0,0 +1,63 @@
+"""
+Test helpers
+
+EchoServer stands in for a trading partner or VAN in tests of network code:
+an in-process TCP server on the loopback interface that sends every byte it
+receives straight back, then closes its side when the client does.
+
+    async with EchoServer() as server:
+        reader, writer = await server.connect()
+        edi_writer = AsyncEDIWriter(writer)
+        await edi_writer.write_interchange(envelope, transactions)
+        writer.write_eof()
+        async for found_segments, edi_data in EDIParser().parse_async(reader):
+            ...
+"""
+
+import asyncio
+
+from .stream import DEFAULT_CHUNK_SIZE
+
+class EchoServer(object):
+    """ TCP echo server run by the current event loop. `port` 0 picks a free
+    port; the one chosen is in `port` once the server has started. """
+    def __init__(self, host="127.0.0.1", port=0, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.host = host
+        self.port = port
+        self.chunk_size = chunk_size
+        self.server = None
+        self.received = 0 # Bytes echoed, across all connections
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.echo, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def close(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def connect(self):
+        """ Opens a connection to the server, returning (StreamReader, StreamWriter) """
+        return await asyncio.open_connection(self.host, self.port)
+
+    async def echo(self, reader, writer):
+        """ Handles one connection """
+        try:
+            while True:
+                chunk = await reader.read(self.chunk_size)
+                if not chunk:
+                    break
+                self.received += len(chunk)
+                writer.write(chunk)
+                await writer.drain()
+            if writer.can_write_eof():
+                writer.write_eof()
+        finally:
+            writer.close()
@@ -28,5 +28,9 @@ setup(
     packages=find_packages(exclude=['test']),
     package_data={"pythonedi.formats": ["810.json", "ST.json"]},
     install_requires=['colorama'],
+    python_requires=">=3.7",
     include_package_data=True,
+    entry_points={
+        "console_scripts": ["pythonedi-batch=pythonedi.batch:main"],
+    },
 )
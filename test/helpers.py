@@ -0,0 +1,33 @@
+"""
+Test data shared by several test modules
+"""
+
+from datetime import datetime
+
+with open("test/test_edi.txt", "r") as test_edi_file:
+    TEST_EDI = test_edi_file.read()
+
+def redelimit(data, element, terminator, component=">"):
+    """ Rewrites the test interchange with other delimiters """
+    segments = [segment for segment in data.split("\n") if segment != ""]
+    segments[0] = segments[0][:-1] + component
+    return terminator.join(segment.replace("^", element) for segment in segments) + terminator
+
+def invoice(items):
+    """ Builds a minimal 810 with the IT1 loop iterations from `items` """
+    return {
+        "ISA": ["00", "", "00", "", "ZZ", "306000000", "ZZ", "306009503", datetime(2006, 6, 24, 10, 0), datetime(2006, 6, 24, 10, 0), "U", "00401", "000010770", "0", "P", "/"],
+        "GS": ["IN", "306000000", "306009503", datetime(2006, 6, 24, 10, 0), datetime(2006, 6, 24, 10, 0), "1164", "X", "004010"],
+        "ST": ["810", "11640002"],
+        "BIG": [datetime(2006, 6, 24), "INV-00777", datetime(2006, 6, 22), "PO-001063"],
+        "L_IT1": items,
+        "TDS": [100],
+    }
+
+def items(count):
+    """ Yields `count` IT1 loop iterations """
+    for i in range(count):
+        yield {
+            "IT1": [str(i + 1), 2, "EA", 5.25, None, "VC", "SKU{}".format(i)],
+            "L_PID": [{"PID": ["F", None, None, None, "ITEM {}".format(i)]}],
+        }
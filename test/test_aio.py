@@ -0,0 +1,67 @@
+""" asyncio test cases for PythonEDI """
+
+import asyncio
+import unittest
+
+import pythonedi
+from pythonedi.testing import EchoServer
+
+from test.helpers import invoice, items
+
+async def chunks(data, size):
+    """ Yields `data` in pieces of `size`, as a network read would """
+    for start in range(0, len(data), size):
+        await asyncio.sleep(0)
+        yield data[start:start + size]
+
+async def collect(transactions):
+    return [transaction async for transaction in transactions]
+
+class TestAsync(unittest.TestCase):
+    """ Tests EDIParser.parse_async, AsyncEDIWriter and the echo server harness """
+    def setUp(self):
+        with open("test/test_edi.txt", "r") as test_edi_file:
+            self.test_edi = test_edi_file.read()
+
+    def test_parse_async_iterable(self):
+        expected = list(pythonedi.EDIParser(edi_format="810").parse_stream([self.test_edi]))
+        source = chunks(self.test_edi.encode("utf-8"), 7)
+        parsed = asyncio.run(collect(pythonedi.EDIParser(edi_format="810").parse_async(source)))
+        self.assertEqual(parsed, expected)
+
+    def test_parse_async_incomplete(self):
+        data = self.test_edi[:self.test_edi.index("\nSE^")]
+        with self.assertRaises(ValueError):
+            asyncio.run(collect(pythonedi.EDIParser(edi_format="810").parse_async(chunks(data, 100))))
+
+    def test_round_trip(self):
+        transactions = []
+        for count in (1, 50, 2000):
+            data = invoice(items(count))
+            data["ST"] = ["810", None]
+            del data["ISA"], data["GS"]
+            transactions.append(data)
+
+        async def round_trip():
+            async with EchoServer() as server:
+                reader, writer = await server.connect()
+                edi_writer = pythonedi.AsyncEDIWriter(writer, drain_size=4096)
+                async def send():
+                    try:
+                        await edi_writer.write_interchange(invoice([]), iter(transactions))
+                        await edi_writer.drain()
+                    finally:
+                        # Let the parser see the end of the data even if writing failed
+                        writer.write_eof()
+                sending = asyncio.ensure_future(send())
+                parsed = await collect(pythonedi.EDIParser().parse_async(reader, chunk_size=1000))
+                await sending
+                writer.close()
+                return parsed, server.received
+
+        parsed, received = asyncio.run(asyncio.wait_for(round_trip(), 30))
+        self.assertEqual([len(edi_data["L_IT1"]) for found_segments, edi_data in parsed], [1, 50, 2000])
+        self.assertEqual([edi_data["ST"]["ST02"] for found_segments, edi_data in parsed], ["0001", "0002", "0003"])
+        self.assertEqual(parsed[2][1]["L_IT1"][-1]["IT1"]["IT107"], "SKU1999")
+        expected = pythonedi.build_interchange(invoice([]), [dict(data, L_IT1=items(count)) for data, count in zip(transactions, (1, 50, 2000))])
+        self.assertEqual(received, len(expected.encode("utf-8")))
@@ -0,0 +1,76 @@
+""" Transaction set autodetection test cases for PythonEDI """
+
+import unittest
+
+import pythonedi
+from pythonedi.supported_formats import supported_formats, compiled_formats
+
+def element(element_id, data_type="AN", req="M"):
+    return {"id": element_id, "type": "element", "name": element_id, "req": req, "data_type": data_type,
+            "data_type_ids": None, "length": {"min": 1, "max": 10}, "notes": ""}
+
+def segment(segment_id, *elements):
+    return {"id": segment_id, "type": "segment", "name": segment_id, "req": "M", "max_uses": 1,
+            "notes": "", "elements": list(elements)}
+
+def envelope(segment_id):
+    """ Borrows an envelope segment definition from the 810 format """
+    return next(section for section in supported_formats["810"] if section["id"] == segment_id)
+
+# A cut-down functional acknowledgment, enough to mix with the 810 test data
+FORMAT_997 = [
+    envelope("ISA"),
+    envelope("GS"),
+    segment("ST", element("ST01", "ID"), element("ST02")),
+    segment("AK1", element("AK101", "ID"), element("AK102", "N0")),
+    segment("AK9", element("AK901", "ID"), element("AK902", "N0")),
+    segment("SE", element("SE01", "N0"), element("SE02")),
+    envelope("GE"),
+    envelope("IEA"),
+]
+
+ACKNOWLEDGMENT = ["ST^997^0002", "AK1^IN^5814", "AK9^A^1", "SE^4^0002"]
+
+class TestAutodetect(unittest.TestCase):
+    """ Tests parsing without an EDI format """
+    def setUp(self):
+        supported_formats["997"] = FORMAT_997
+        with open("test/test_edi.txt", "r") as test_edi_file:
+            self.lines = test_edi_file.read().split("\n")
+        # Insert the acknowledgment after the invoice's SE segment
+        position = self.lines.index("SE^262^0001") + 1
+        self.mixed = "\n".join(self.lines[:position] + ACKNOWLEDGMENT + self.lines[position:])
+
+    def tearDown(self):
+        del supported_formats["997"]
+        compiled_formats.pop("997", None)
+
+    def test_parse_single_format(self):
+        expected = pythonedi.EDIParser(edi_format="810").parse("\n".join(self.lines))
+        self.assertEqual(pythonedi.EDIParser().parse("\n".join(self.lines)), expected)
+
+    def test_parse_mixed(self):
+        # parse returns one transaction set; a second one is an error rather than overwriting it
+        with self.assertRaises(ValueError):
+            pythonedi.EDIParser().parse(self.mixed)
+
+        diagnostics = pythonedi.Diagnostics()
+        found_segments, edi_data = pythonedi.EDIParser(diagnostics=diagnostics).parse(self.mixed)
+        self.assertEqual(edi_data["ST"]["ST01"], "810")
+        self.assertIn("L_IT1", found_segments)
+        self.assertNotIn("AK9", found_segments)
+        self.assertEqual(found_segments[-2:], ["GE", "IEA"])
+        self.assertEqual([diagnostic.rule for diagnostic in diagnostics], ["multiple_transaction_sets"])
+
+    def test_parse_transactions(self):
+        results = list(pythonedi.EDIParser().parse_transactions(self.mixed))
+        self.assertEqual([edi_data["ST"]["ST01"] for _, edi_data in results], ["810", "997"])
+        found_segments, edi_data = results[1]
+        self.assertEqual(found_segments, ["ISA", "GS", "ST", "AK1", "AK9", "SE"])
+        self.assertEqual(edi_data["GS"]["GS06"], 5814)
+
+    def test_unsupported(self):
+        with self.assertRaises(ValueError):
+            pythonedi.EDIParser().parse(self.mixed.replace("ST^997", "ST^850"))
+        with self.assertRaises(ValueError):
+            pythonedi.EDIParser().parse("ISA^00")
@@ -0,0 +1,54 @@
+""" Batch parsing test cases for PythonEDI """
+
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from contextlib import redirect_stdout, redirect_stderr
+
+from pythonedi.batch import BatchParser, parse_files, main
+
+class TestBatchParser(unittest.TestCase):
+    """ Tests parsing a directory of files across processes """
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        with open("test/test_edi.txt", "r") as test_edi_file:
+            test_edi = test_edi_file.read()
+        for i in range(6):
+            with open(os.path.join(self.directory, "{:02d}.edi".format(i)), "w") as edi_file:
+                edi_file.write(test_edi)
+        with open(os.path.join(self.directory, "03.edi"), "w") as edi_file:
+            edi_file.write(test_edi.replace("ST^810", "ST^999"))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_ordered(self):
+        batch = BatchParser(processes=2)
+        results = list(batch.parse(self.directory, "*.edi"))
+        self.assertEqual([os.path.basename(result.path) for result in results], ["{:02d}.edi".format(i) for i in range(6)])
+        self.assertEqual([result.ok for result in results], [True, True, True, False, True, True])
+        self.assertIn("ValueError", results[3].error)
+        self.assertEqual(len(results[0].data["L_IT1"]), 124)
+
+        self.assertEqual(batch.stats.files, 6)
+        self.assertEqual(batch.stats.failed, 1)
+        self.assertEqual(batch.stats.segments, 5 * 266)
+        self.assertEqual(batch.stats.bytes, sum(os.path.getsize(result.path) for result in results))
+        self.assertGreater(batch.stats.as_dict()["files_per_second"], 0)
+
+    def test_unordered_in_process(self):
+        for processes in (1, 3):
+            # With a fixed format, ST01 is not used to pick one, so nothing fails
+            results = list(parse_files([self.directory], edi_format="810", processes=processes, ordered=False))
+            self.assertEqual(sorted(os.path.basename(result.path) for result in results if result.ok),
+                             ["{:02d}.edi".format(i) for i in range(6)])
+
+    def test_main(self):
+        stdout, stderr = io.StringIO(), io.StringIO()
+        with redirect_stdout(stdout), redirect_stderr(stderr):
+            status = main([self.directory, "--processes", "2"])
+        self.assertEqual(status, 1)
+        self.assertIn("03.edi: ValueError", stdout.getvalue())
+        self.assertIn("6 files (1 failed)", stderr.getvalue())
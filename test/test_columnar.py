@@ -0,0 +1,55 @@
+""" Columnar export test cases for PythonEDI """
+
+import unittest
+from array import array
+
+import pythonedi
+from pythonedi.columnar import array_column
+
+class TestColumnar(unittest.TestCase):
+    """ Tests EDIParser.parse_columns """
+    def setUp(self):
+        with open("test/test_edi.txt", "r") as test_edi_file:
+            self.test_edi = test_edi_file.read()
+        self.parser = pythonedi.EDIParser(edi_format="810")
+
+    def test_loop_columns_match_parse(self):
+        columns = self.parser.parse_columns(self.test_edi, ["IT102", "IT104", "IT107", "PID05"], loop="L_IT1")
+        found_segments, edi_data = pythonedi.EDIParser(edi_format="810").parse(self.test_edi)
+        items = edi_data["L_IT1"]
+
+        self.assertEqual(list(columns), ["IT102", "IT104", "IT107", "PID05"])
+        self.assertEqual(columns.rows, len(items))
+        self.assertIsInstance(columns["IT102"], array)
+        self.assertEqual(list(columns["IT102"]), [item["IT1"]["IT102"] for item in items])
+        self.assertEqual(list(columns["IT104"]), [item["IT1"]["IT104"] for item in items])
+        self.assertEqual(columns["IT107"], [item["IT1"]["IT107"] for item in items])
+        self.assertEqual(columns["PID05"], [item["L_PID"][0]["PID"]["PID05"] for item in items])
+
+    def test_segment_columns(self):
+        # REF is defined both at the top level and in L_IT1; only the header REFs are top-level
+        columns = self.parser.parse_columns(self.test_edi, ["REF01", "REF02"], segment="REF")
+        self.assertEqual(columns["REF01"], ["OQ", "VN"])
+        self.assertEqual(columns.rows, 2)
+
+        columns = self.parser.parse_columns(self.test_edi, ["TDS01"], segment="TDS")
+        self.assertEqual(list(columns["TDS01"]), [24669.39]) # N2
+
+    def test_missing_elements(self):
+        data = self.test_edi.replace("IT1^2^1^CS^56.7100^CT^VC^471565^IN^000035^MG^7086", "IT1^2^^CS")
+        columns = self.parser.parse_columns(data, ["IT102", "IT107"], loop="L_IT1")
+        self.assertNotEqual(columns["IT102"][1], columns["IT102"][1]) # NaN
+        self.assertEqual(columns["IT107"][1], "")
+
+    def test_array_column(self):
+        self.assertEqual(array_column(["1", "22"], "int").typecode, "q")
+        self.assertEqual(list(array_column(["150", "25"], "float", 100)), [1.5, 0.25])
+        self.assertEqual(array_column(["1", ""], "int").typecode, "d")
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            self.parser.parse_columns(self.test_edi, ["IT102"], loop="L_XYZ")
+        with self.assertRaises(ValueError):
+            self.parser.parse_columns(self.test_edi, ["BIG02"], loop="L_IT1")
+        with self.assertRaises(ValueError):
+            self.parser.parse_columns(self.test_edi, ["IT102"])
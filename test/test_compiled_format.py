@@ -0,0 +1,30 @@
+""" Test cases for compiled format dispatch tables """
+
+import unittest
+
+from pythonedi.supported_formats import get_compiled_format
+from pythonedi.compiled_format import SEGMENT, REPEATING_SEGMENT, LOOP
+
+class TestCompiledFormat(unittest.TestCase):
+    """ Tests compiling the 810 definition """
+    def setUp(self):
+        self.compiled = get_compiled_format("810")
+
+    def test_cached(self):
+        self.assertIs(self.compiled, get_compiled_format("810"))
+
+    def test_top_level_dispatch(self):
+        dispatch = self.compiled.root.dispatch
+        self.assertEqual(dispatch["BIG"].kind, SEGMENT)
+        self.assertEqual(dispatch["REF"].kind, REPEATING_SEGMENT)
+        self.assertEqual(dispatch["IT1"].kind, LOOP)
+        self.assertEqual(dispatch["IT1"].id, "L_IT1")
+        self.assertNotIn("PID", dispatch)
+
+    def test_lookup(self):
+        pid, = self.compiled.lookup("PID")
+        self.assertEqual(pid.path, ("L_IT1", "L_PID"))
+        self.assertEqual(pid.position, 0)
+        # TXI is defined at the top level, in L_IT1 and in L_SAC
+        self.assertEqual(sorted(section.path for section in self.compiled.lookup("TXI")), [(), ("L_IT1",), ("L_SAC",)])
+        self.assertEqual(self.compiled.lookup("ZZZ"), [])
@@ -0,0 +1,109 @@
+""" Concurrent generation test cases for PythonEDI """
+
+import io
+import sys
+import threading
+import unittest
+
+import pythonedi
+from pythonedi.supported_formats import supported_formats, compiled_formats
+from pythonedi.batch import build_batch
+from pythonedi.delimiters import Delimiters
+
+from test.helpers import invoice, items
+
+def invoices(count):
+    """ `count` invoices of different sizes and component separators """
+    transactions = []
+    for i in range(count):
+        lines = i % 7 + 1
+        data = invoice(list(items(lines)))
+        data["ISA"][15] = "/:>"[i % 3]
+        data["BIG"][1] = "INV-{:05d}".format(i)
+        data.update({"SE": [4 + 2 * lines, "11640002"], "GE": [1, "1164"], "IEA": [1, "000010770"]})
+        transactions.append(data)
+    return transactions
+
+class TestConcurrentGeneration(unittest.TestCase):
+    """ Tests sharing one EDIGenerator across threads """
+    def setUp(self):
+        self.switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6) # Switch threads as often as possible
+
+    def tearDown(self):
+        sys.setswitchinterval(self.switch_interval)
+
+    def test_build_leaves_generator_unchanged(self):
+        generator = pythonedi.EDIGenerator()
+        message = generator.build(invoices(2)[1])
+        self.assertEqual(generator.data_delimiter, "`")
+        self.assertEqual(generator.delimiters(invoices(2)[1]), Delimiters("^", "\n", ":"))
+        starred = generator.build(invoices(2)[1], delimiters=Delimiters("*", "~", ":"))
+        self.assertEqual(starred, message.replace("^", "*").replace("\n", "~"))
+        self.assertEqual((generator.element_delimiter, generator.segment_delimiter), ("^", "\n"))
+
+    def test_writer_delimiters(self):
+        generator = pythonedi.EDIGenerator()
+        data = invoices(1)[0]
+        starred = Delimiters("*", "~", "/")
+        sink = io.StringIO()
+        pythonedi.EDIWriter(sink, generator).write(data, starred)
+        self.assertEqual(sink.getvalue(), generator.build(data, delimiters=starred) + "~")
+        envelope = dict((key, data[key]) for key in ("ISA", "GS"))
+        transaction = dict((key, value) for key, value in data.items() if key not in ("ISA", "GS", "GE", "IEA"))
+        output = pythonedi.build_interchange(envelope, [transaction], generator, starred)
+        self.assertEqual(output, sink.getvalue())
+
+    def test_build_batch(self):
+        transactions = invoices(200)
+        expected = [pythonedi.EDIGenerator().build(data) for data in transactions]
+        self.assertEqual(build_batch(transactions, threads=8), expected)
+
+        generator = pythonedi.EDIGenerator()
+        with self.assertRaises(ValueError):
+            build_batch(transactions[:3] + [{"ST": ["999", "0001"]}], threads=2, generator=generator)
+
+    def test_build_batch_before_formats_are_loaded(self):
+        transactions = invoices(50)
+        expected = [pythonedi.EDIGenerator().build(data) for data in transactions]
+        saved = (supported_formats._paths, dict(supported_formats._definitions), dict(compiled_formats))
+        try:
+            for attempt in range(10):
+                supported_formats._paths = None
+                supported_formats._definitions.clear()
+                compiled_formats.clear()
+                self.assertEqual(build_batch(transactions, threads=8), expected)
+        finally:
+            supported_formats._paths = saved[0]
+            supported_formats._definitions.clear()
+            supported_formats._definitions.update(saved[1])
+            compiled_formats.clear()
+            compiled_formats.update(saved[2])
+
+    def test_shared_generator_under_contention(self):
+        transactions = invoices(21)
+        styles = [None, Delimiters("*", "~", ">"), Delimiters("|", "\r\n", ":")]
+        expected = dict(((style, i), pythonedi.EDIGenerator().build(data, delimiters=style))
+                        for style in styles for i, data in enumerate(transactions))
+
+        generator = pythonedi.EDIGenerator()
+        threads = 8
+        barrier = threading.Barrier(threads)
+        results = [None] * threads
+        def work(n):
+            barrier.wait()
+            output = {}
+            for repeat in range(5):
+                for i in range(len(transactions)):
+                    style = styles[(n + i + repeat) % len(styles)]
+                    output.setdefault((style, i), set()).add(generator.build(transactions[i], delimiters=style))
+            results[n] = output
+
+        workers = [threading.Thread(target=work, args=(n,)) for n in range(threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        for output in results:
+            for key, messages in output.items():
+                self.assertEqual(messages, set([expected[key]]))
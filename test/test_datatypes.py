@@ -0,0 +1,59 @@
+""" Element codec test cases for PythonEDI """
+
+import unittest
+from datetime import datetime, date, timedelta
+from decimal import Decimal
+
+from pythonedi.datatypes import decode_date, decode_time, decode_implied_decimal, decode_element, \
+    encode_date, encode_time, encode_implied_decimal
+
+class TestDecode(unittest.TestCase):
+    """ Tests the parsing codecs against strptime """
+    def test_dates(self):
+        day = datetime(1965, 1, 1)
+        while day < datetime(2070, 1, 1):
+            self.assertEqual(decode_date(day.strftime("%Y%m%d")), day)
+            self.assertEqual(decode_date(day.strftime("%y%m%d")), datetime.strptime(day.strftime("%y%m%d"), "%y%m%d"))
+            day += timedelta(days=13)
+        for invalid in ("20171310", "2017031A", "17-3-1"):
+            with self.assertRaises(ValueError):
+                decode_date(invalid)
+
+    def test_times(self):
+        self.assertEqual(decode_time("1102"), datetime.strptime("1102", "%H%M"))
+        self.assertEqual(decode_time("235959"), datetime.strptime("235959", "%H%M%S"))
+        with self.assertRaises(ValueError):
+            decode_time("2460")
+
+    def test_numbers(self):
+        self.assertEqual(decode_implied_decimal("2466939", 2), 24669.39)
+        self.assertEqual(decode_implied_decimal("000005814", 0), 5814)
+        self.assertIsInstance(decode_implied_decimal("5814", 0), int)
+        self.assertEqual(decode_implied_decimal("-125", 1), -12.5)
+
+    def test_decode_element(self):
+        self.assertEqual(decode_element("", {"data_type": "N2"}), "")
+        self.assertEqual(decode_element("1.5", {"data_type": "R"}), 1.5)
+        self.assertEqual(decode_element("2017", {"data_type": "DT"}), "2017") # Unknown layout stays raw
+
+class TestEncode(unittest.TestCase):
+    """ Tests the generating codecs """
+    def test_dates(self):
+        self.assertEqual(encode_date(datetime(2006, 6, 24, 10, 0), 8), "20060624")
+        self.assertEqual(encode_date(date(2006, 6, 24), 6), "060624")
+        self.assertEqual(encode_time(datetime(2006, 6, 24, 9, 5)), "0905")
+
+    def test_implied_decimal(self):
+        self.assertEqual(encode_implied_decimal(24669.39, 2), "2466939")
+        self.assertEqual(encode_implied_decimal(1.005, 2), "101") # 1.005 rounds up, unlike round(1.005 * 100)
+        self.assertEqual(encode_implied_decimal(Decimal("12.3"), 2, 6), "001230")
+        self.assertEqual(encode_implied_decimal("000010770", 0, 9), "000010770")
+        self.assertEqual(encode_implied_decimal(-5, 2, 4), "-0500")
+        self.assertEqual(encode_implied_decimal(1e-7, 2), "0")
+        self.assertEqual(encode_implied_decimal(10**20, 0), "1" + "0" * 20)
+        with self.assertRaises(ValueError):
+            encode_implied_decimal("abc", 2)
+
+    def test_round_trip(self):
+        for value in (0, 0.01, 19.99, 24669.39, 123456789.12):
+            self.assertEqual(decode_implied_decimal(encode_implied_decimal(value, 2), 2), value)
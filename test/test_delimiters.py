@@ -0,0 +1,54 @@
+""" Delimiter detection test cases for PythonEDI """
+
+import io
+import unittest
+
+import pythonedi
+from pythonedi.delimiters import sniff_delimiters, Delimiters
+
+from test.helpers import TEST_EDI, redelimit
+
+class TestSniffDelimiters(unittest.TestCase):
+    """ Tests reading delimiters from the ISA header """
+    def test_fixed_width(self):
+        self.assertEqual(sniff_delimiters(TEST_EDI), Delimiters("^", "\n", "|"))
+        self.assertEqual(sniff_delimiters(redelimit(TEST_EDI, "*", "~", ">")), Delimiters("*", "~", ">"))
+        self.assertEqual(sniff_delimiters(redelimit(TEST_EDI, "|", "~\r\n", ":").encode("ascii")), Delimiters("|", "~\r\n", ":"))
+
+    def test_unpadded_header(self):
+        header = "ISA*00**00**ZZ*SENDER*ZZ*RECEIVER*170311*1102*U*00401*000005814*0*P*>~GS*IN"
+        self.assertEqual(sniff_delimiters(header), Delimiters("*", "~", ">"))
+
+    def test_not_x12(self):
+        self.assertIsNone(sniff_delimiters("UNA:+.? 'UNB+UNOC:3"))
+        self.assertIsNone(sniff_delimiters(""))
+
+class TestDetectDelimiters(unittest.TestCase):
+    """ Tests parsing with detected delimiters """
+    def setUp(self):
+        self.parser = pythonedi.EDIParser(edi_format="810")
+        self.expected = self.parser.parse(TEST_EDI)
+
+    def test_parse(self):
+        for element, terminator in (("*", "~"), ("|", "~\n"), ("*", "\r\n")):
+            found_segments, edi_data = self.parser.parse(redelimit(TEST_EDI, element, terminator))
+            self.assertEqual(found_segments, self.expected[0])
+            self.assertEqual(edi_data["L_IT1"], self.expected[1]["L_IT1"])
+
+    def test_detected_delimiters_are_not_kept(self):
+        self.parser.parse(redelimit(TEST_EDI, "*", "~"))
+        self.assertEqual((self.parser.element_delimiter, self.parser.segment_delimiter), ("^", "\n"))
+        # Data without an ISA header still uses the parser's own delimiters
+        transaction = TEST_EDI[TEST_EDI.index("ST^"):TEST_EDI.index("\nGE^")]
+        found_segments, edi_data = self.parser.parse(transaction)
+        self.assertEqual(edi_data["L_IT1"], self.expected[1]["L_IT1"])
+
+    def test_parse_stream_mixed(self):
+        data = redelimit(TEST_EDI, "*", "~") + redelimit(TEST_EDI, "|", "\r\n") + redelimit(TEST_EDI, "*", "~")
+        for chunk_size in (5, 999, 1 << 20):
+            results = list(self.parser.parse_stream(io.BytesIO(data.encode("ascii")), chunk_size=chunk_size))
+            self.assertEqual(len(results), 3)
+            for found_segments, edi_data in results:
+                self.assertEqual(edi_data["L_IT1"], self.expected[1]["L_IT1"])
+                self.assertEqual(edi_data["ISA"]["ISA13"], self.expected[1]["ISA"]["ISA13"])
+                self.assertEqual(edi_data["ISA"]["ISA16"], ">")
@@ -0,0 +1,89 @@
+""" Diagnostics collection test cases for PythonEDI """
+
+import io
+import unittest
+import contextlib
+
+import pythonedi
+from pythonedi.diagnostics import Diagnostics
+
+from test.helpers import invoice, items
+
+class TestParserDiagnostics(unittest.TestCase):
+    """ Tests collecting problems while parsing """
+    def setUp(self):
+        with open("test/test_edi.txt", "r") as test_edi_file:
+            self.test_edi = test_edi_file.read()
+        self.bad_edi = (self.test_edi
+            .replace("BIG^20170310^", "BIG^20171399^")
+            .replace("REF^OQ", "ZZZ^1\nREF^OQ")
+            .replace("IT1^3^1^CS^44.4300^", "IT1^3^1^^44.4300^")
+            .replace("TDS^2466939", "TDS^2466939^1^2^3^4^5"))
+
+    def test_collects_everything(self):
+        diagnostics = Diagnostics()
+        parser = pythonedi.EDIParser(edi_format="810", validate=True, diagnostics=diagnostics)
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            found_segments, edi_data = parser.parse(self.bad_edi)
+        self.assertEqual(output.getvalue(), "") # Nothing printed until asked
+
+        self.assertEqual([error.rule for error in diagnostics], ["invalid_value", "unrecognized_segment", "ALLORNONE", "too_many_elements"])
+        invalid = diagnostics.errors[0]
+        self.assertEqual((invalid.segment_id, invalid.element_id, invalid.segment_index), ("BIG", "BIG01", 3))
+        self.assertEqual(edi_data["BIG"]["BIG01"], "20171399") # Raw value kept
+        for error in diagnostics:
+            segment = self.bad_edi.split("\n")[error.segment_index]
+            self.assertTrue(self.bad_edi[error.offset:].startswith(segment))
+        self.assertEqual(len(edi_data["L_IT1"]), 124)
+
+    def test_stream_positions(self):
+        diagnostics = Diagnostics()
+        parser = pythonedi.EDIParser(edi_format="810", validate=True, diagnostics=diagnostics)
+        list(parser.parse_stream([self.bad_edi]))
+        expected = Diagnostics()
+        pythonedi.EDIParser(edi_format="810", validate=True, diagnostics=expected).parse(self.bad_edi)
+        self.assertEqual(diagnostics.as_dicts(), expected.as_dicts())
+
+    def test_limit_and_render(self):
+        diagnostics = Diagnostics(limit=1)
+        pythonedi.EDIParser(edi_format="810", validate=True, diagnostics=diagnostics).parse(self.bad_edi)
+        self.assertEqual((len(diagnostics), diagnostics.count), (1, 4))
+        pythonedi.Debug.level = 1 # Errors only, no definitions
+        try:
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                diagnostics.render()
+        finally:
+            pythonedi.Debug.level = 3
+        self.assertIn("Segment 3 (offset 169)", output.getvalue())
+        self.assertIn("and 3 more", output.getvalue())
+
+    def test_raises_without_collector(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            with self.assertRaises(ValueError):
+                pythonedi.EDIParser(edi_format="810").parse(self.bad_edi)
+
+class TestGeneratorDiagnostics(unittest.TestCase):
+    """ Tests collecting problems while generating """
+    def test_collects_everything(self):
+        data = invoice(list(items(2)))
+        data.update({"SE": [7, "11640002"], "GE": [1, "1164"], "IEA": [1, "000010770"]})
+        del data["BIG"]
+        data["L_IT1"][0]["IT1"][3] = None # ALLORNONE IT102-IT104
+        data["L_IT1"][1]["IT1"][1] = "many" # Not a number
+        data["L_IT1"][1]["L_PID"][0]["PID"][0] = None # Mandatory element
+
+        diagnostics = Diagnostics()
+        output = pythonedi.EDIGenerator().build(data, diagnostics)
+        self.assertEqual([(error.rule, error.segment_id, error.element_id) for error in diagnostics], [
+            ("missing_segment", "BIG", None),
+            ("ALLORNONE", "IT1", None),
+            ("invalid_value", "IT1", "IT102"),
+            ("ALLORNONE", "IT1", None), # IT102 left empty
+            ("missing_element", "PID", "PID01"),
+        ])
+        segments = output.split("\n")
+        for error in diagnostics:
+            self.assertTrue(output[error.offset:].startswith(segments[error.segment_index]))
+        self.assertEqual(segments[diagnostics.errors[2].segment_index], "IT1^2^^EA^5.25^^VC^SKU1")
@@ -0,0 +1,57 @@
+""" Compiled segment encoder test cases for PythonEDI """
+
+import unittest
+from datetime import datetime
+
+import pythonedi
+from pythonedi.encoders import segment_encoder
+from pythonedi.supported_formats import get_compiled_format
+
+SEGMENTS = [
+    ("ISA", ["00", "", "00", "", "ZZ", "306000000", "ZZ", "306009503", datetime(2006, 6, 24, 10, 0), datetime(2006, 6, 24, 10, 0), "U", "00401", "000010770", "0", "P", "/"]),
+    ("BIG", [datetime(2006, 6, 24), "INV-00777", datetime(2006, 6, 22), "PO-001063", None, None, "DR"]),
+    ("IT1", ["1", 4, "EA", 5.25, None, "VC", "SKU-1", "IN", "000018"]),
+    ("PID", ["F", None, None, None, "A DESCRIPTION LONGER THAN THE FIELD ALLOWS" * 3]),
+    ("TDS", [24669.39]),
+    ("REF", ["OQ", "500100566875"]),
+]
+
+class TestSegmentEncoders(unittest.TestCase):
+    """ Tests that compiled encoders match EDIGenerator.build_segment """
+    def setUp(self):
+        self.generator = pythonedi.EDIGenerator()
+        self.edi_format = get_compiled_format("810")
+
+    def test_matches_build_segment(self):
+        for segment_id, segment_data in SEGMENTS:
+            definition = self.edi_format.segment_format(segment_id)
+            self.assertEqual(
+                segment_encoder(definition)(segment_data, "^"),
+                self.generator.build_segment(definition, segment_data))
+
+    def test_cached(self):
+        definition = self.edi_format.segment_format("IT1")
+        self.assertIs(segment_encoder(definition), segment_encoder(definition))
+
+    def test_errors_match_build_segment(self):
+        cases = [
+            ("BIG", [None, "INV-00777"]), # Mandatory element
+            ("BIG", ["not a date", "INV-00777"]), # Conversion
+            ("REF", ["OQ"]), # ATLEASTONE
+            ("IT1", ["1", 4, None, 5.25]), # ALLORNONE
+        ]
+        for segment_id, segment_data in cases:
+            definition = self.edi_format.segment_format(segment_id)
+            with self.assertRaises(ValueError) as expected:
+                self.generator.build_segment(definition, segment_data)
+            with self.assertRaises(ValueError) as compiled:
+                segment_encoder(definition)(segment_data, "^")
+            self.assertEqual(str(compiled.exception), str(expected.exception))
+
+    def test_if_at_least_one(self):
+        # ITD: if ITD03 is present, at least one of ITD04/ITD05 is required
+        definition = self.edi_format.segment_format("ITD")
+        for encode in (segment_encoder(definition), lambda data, delimiter: self.generator.build_segment(definition, data)):
+            with self.assertRaises(ValueError):
+                encode(["01", "3", 2.0], "^")
+            self.assertEqual(encode(["01", "3", 2.0, None, 30], "^"), "ITD^01^3^2.0^^30")
@@ -0,0 +1,74 @@
+""" Event-driven parsing test cases for PythonEDI """
+
+import unittest
+
+import pythonedi
+from pythonedi.events import EventHandler, START_LOOP, END_LOOP, SEGMENT
+
+class ItemCollector(EventHandler):
+    """ Collects the IT1 product IDs of each line item """
+    def __init__(self):
+        self.items = []
+        self.depth = 0
+        self.transactions = 0
+
+    def start_loop(self, loop_id):
+        if loop_id == "L_IT1":
+            self.items.append([])
+        self.depth += 1
+
+    def end_loop(self, loop_id):
+        self.depth -= 1
+
+    def segment(self, segment_id, fields):
+        if segment_id == "IT1":
+            self.items[-1].append(fields[7])
+
+    def end_transaction(self, fields):
+        self.transactions += 1
+
+class TestEvents(unittest.TestCase):
+    """ Tests EDIParser.iter_events and parse_events """
+    def setUp(self):
+        with open("test/test_edi.txt", "r") as test_edi_file:
+            self.test_edi = test_edi_file.read()
+        self.found_segments, self.edi_data = pythonedi.EDIParser(edi_format="810").parse(self.test_edi)
+
+    def test_segments_in_order(self):
+        events = list(pythonedi.EDIParser(edi_format="810").iter_events([self.test_edi]))
+        self.assertEqual([event[0] for event in events[:3]], ["start_interchange", "start_group", "start_transaction"])
+        self.assertEqual([event[0] for event in events[-3:]], ["end_transaction", "end_group", "end_interchange"])
+        segments = [segment for segment in self.test_edi.split("\n") if segment != ""]
+        raw = [fields for _, _, fields in events if fields is not None]
+        self.assertEqual(["^".join(fields) for fields in raw], segments)
+
+    def test_loops(self):
+        events = list(pythonedi.EDIParser(edi_format="810").iter_events([self.test_edi]))
+        starts = [name for event, name, _ in events if event == START_LOOP]
+        self.assertEqual(starts.count("L_IT1"), len(self.edi_data["L_IT1"]))
+        self.assertEqual(starts.count("L_N1"), len(self.edi_data["L_N1"]))
+        self.assertEqual(len(starts), len([name for event, name, _ in events if event == END_LOOP]))
+
+        # Each L_IT1 iteration holds the segments parse puts in it
+        iterations, current = [], None
+        for event, name, fields in events:
+            if event == START_LOOP and name == "L_IT1":
+                current = []
+            elif event == END_LOOP and name == "L_IT1":
+                iterations.append(current)
+                current = None
+            elif event == SEGMENT and current is not None:
+                current.append(name)
+        self.assertEqual(iterations[0], ["IT1", "PID"])
+
+    def test_decode(self):
+        events = pythonedi.EDIParser(edi_format="810").iter_events([self.test_edi], decode=True)
+        it1 = [fields for event, name, fields in events if name == "IT1"]
+        self.assertEqual(it1, [iteration["IT1"] for iteration in self.edi_data["L_IT1"]])
+
+    def test_handler(self):
+        handler = ItemCollector()
+        pythonedi.EDIParser().parse_events("test/test_edi.txt", handler)
+        self.assertEqual(handler.transactions, 1)
+        self.assertEqual(handler.depth, 0)
+        self.assertEqual(handler.items, [[iteration["IT1"]["IT107"]] for iteration in self.edi_data["L_IT1"]])
@@ -0,0 +1,71 @@
+""" Offset index test cases for PythonEDI """
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import pythonedi
+from pythonedi.index import OffsetIndex
+
+from test.helpers import TEST_EDI, redelimit
+
+class TestOffsetIndex(unittest.TestCase):
+    """ Tests indexing a file and parsing parts of it """
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "edi.txt")
+        lines = TEST_EDI.split("\n")
+        start, end = lines.index("ST^810^0001"), lines.index("SE^262^0001")
+        second = [line.replace("0001", "0002") for line in lines[start:end+1]]
+        two_sets = "\n".join(lines[:end+1] + second + lines[end+1:])
+        self.data = two_sets + redelimit(TEST_EDI, "*", "~\n")
+        with open(self.path, "w") as edi_file:
+            edi_file.write(self.data)
+        self.expected = list(pythonedi.EDIParser(edi_format="810").parse_stream([self.data]))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_build(self):
+        index = OffsetIndex.build(self.path)
+        self.assertEqual(len(index), 3)
+        self.assertEqual(len(index.interchanges), 2)
+        self.assertEqual([entry["interchange"] for entry in index.transactions], [0, 0, 1])
+        self.assertEqual(len(index.transactions[2]["loops"]["L_IT1"]), 124)
+        self.assertEqual(len(index.transactions[0]["loops"]["L_N1"]), 2)
+        with open(self.path, "rb") as edi_file:
+            edi_file.seek(index.transactions[1]["loops"]["L_IT1"][0])
+            self.assertEqual(edi_file.read(4), b"IT1^")
+
+    def test_get_transaction(self):
+        index = OffsetIndex.open(self.path)
+        for n in (2, 0, 1):
+            self.assertEqual(index.get_transaction(n), self.expected[n])
+
+    def test_get_loop(self):
+        index = OffsetIndex.build(self.path)
+        for n in (0, 2):
+            self.assertEqual(index.get_loop(n, "L_IT1", 3), self.expected[n][1]["L_IT1"][3])
+            self.assertEqual(index.get_loop(n, "L_IT1", 123), self.expected[n][1]["L_IT1"][123])
+
+    def test_persisted(self):
+        built = OffsetIndex.open(self.path)
+        self.assertTrue(os.path.exists(self.path + ".idx"))
+        loaded = OffsetIndex.load(self.path)
+        self.assertEqual(loaded.transactions, built.transactions)
+        self.assertEqual(loaded.interchanges, built.interchanges)
+
+        with open(self.path, "a") as edi_file:
+            edi_file.write(TEST_EDI)
+        with self.assertRaises(ValueError):
+            OffsetIndex.load(self.path)
+        self.assertEqual(len(OffsetIndex.open(self.path)), 4) # Rebuilt
+
+    def test_parse_range(self):
+        index = OffsetIndex.build(self.path)
+        entry = index.transactions[1]
+        parser = pythonedi.EDIParser(edi_format="810")
+        found_segments, edi_data = parser.parse_range(self.path, entry["start"], entry["end"])
+        self.assertEqual(edi_data["ST"]["ST02"], "0002")
+        self.assertEqual(edi_data["L_IT1"], self.expected[1][1]["L_IT1"])
@@ -0,0 +1,67 @@
+""" Memory-mapped scanning test cases for PythonEDI """
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import pythonedi
+from pythonedi.mapped import MappedFile, skim
+
+from test.helpers import TEST_EDI, redelimit
+
+class TestMappedFile(unittest.TestCase):
+    """ Tests scanning a memory-mapped file """
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, data):
+        path = os.path.join(self.directory, "edi.txt")
+        with open(path, "wb") as edi_file:
+            edi_file.write(data.encode("utf-8"))
+        return path
+
+    def test_skim(self):
+        data = redelimit(TEST_EDI, "*", "~") + redelimit(TEST_EDI.replace("BIG^20170310^12973821", "BIG^20170310^12973822"), "|", "\r\n")
+        path = self.write(data)
+        self.assertEqual(skim(path, "BIG02"), ["12973821", "12973822"])
+        self.assertEqual(skim(path, "ISA13"), ["000005814", "000005814"])
+        self.assertEqual(skim(path, "ST03"), [None, None])
+        self.assertEqual(len(skim(path, "IT104")), 248)
+
+    def test_segments(self):
+        path = self.write(TEST_EDI)
+        with MappedFile(path) as mapped:
+            interchanges = list(mapped.interchanges())
+            self.assertEqual(len(interchanges), 1)
+            segments = [mapped.text(start, end) for start, end in mapped.segment_offsets(interchanges[0])]
+        self.assertEqual(segments, [segment for segment in TEST_EDI.split("\n") if segment != ""])
+
+    def test_empty_file(self):
+        with MappedFile(self.write("")) as mapped:
+            self.assertEqual(list(mapped.interchanges()), [])
+
+class TestParseMapped(unittest.TestCase):
+    """ Tests EDIParser.parse_mapped """
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "edi.txt")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_matches_parse_stream(self):
+        data = redelimit(TEST_EDI, "*", "~") + redelimit(TEST_EDI, "|", "~\n")
+        with open(self.path, "w") as edi_file:
+            edi_file.write(data)
+        parser = pythonedi.EDIParser(edi_format="810")
+        self.assertEqual(list(parser.parse_mapped(self.path)), list(pythonedi.EDIParser(edi_format="810").parse_stream([data])))
+
+    def test_truncated(self):
+        with open(self.path, "w") as edi_file:
+            edi_file.write(TEST_EDI.split("SE^")[0])
+        with self.assertRaises(ValueError):
+            list(pythonedi.EDIParser(edi_format="810").parse_mapped(self.path))
@@ -0,0 +1,95 @@
+""" Instrumentation test cases for PythonEDI """
+
+import io
+import sys
+import unittest
+
+import pythonedi
+from pythonedi.batch import build_batch
+from pythonedi.metrics import Metrics
+
+from test.helpers import invoice, items
+
+class TestParserMetrics(unittest.TestCase):
+    """ Tests counting and timing parser runs """
+    def setUp(self):
+        with open("test/test_edi.txt", "r") as test_edi_file:
+            self.test_edi = test_edi_file.read()
+
+    def test_parse(self):
+        runs = []
+        metrics = Metrics(callback=runs.append)
+        parser = pythonedi.EDIParser(edi_format="810", metrics=metrics)
+        found_segments, edi_data = parser.parse(self.test_edi)
+
+        self.assertEqual(len(runs), 1)
+        summary = metrics.as_dict()
+        self.assertEqual(summary["runs"], 1)
+        self.assertEqual(summary["segments"], self.test_edi.count("\n"))
+        self.assertEqual(summary["bytes"], len(self.test_edi))
+        self.assertEqual(summary["segment_types"]["IT1"]["count"], len(edi_data["L_IT1"]))
+        self.assertGreater(summary["seconds"], 0)
+        self.assertEqual(runs[0]["segments"], summary["segments"])
+
+    def test_stream_is_one_run(self):
+        runs = []
+        metrics = Metrics(callback=runs.append)
+        parser = pythonedi.EDIParser(edi_format="810", metrics=metrics)
+        transactions = list(parser.parse_stream([self.test_edi]))
+        self.assertEqual(len(transactions), 1)
+        self.assertEqual(len(runs), 1)
+        self.assertEqual(runs[0]["segment_types"]["IT1"]["count"], len(transactions[0][1]["L_IT1"]))
+
+        metrics.reset()
+        self.assertEqual(metrics.as_dict()["segments"], 0)
+
+    def test_uninstrumented(self):
+        parser = pythonedi.EDIParser(edi_format="810")
+        self.assertIsNone(parser.metrics)
+        self.assertNotIn("parse_segment", vars(parser))
+
+class TestGeneratorMetrics(unittest.TestCase):
+    """ Tests counting and timing generator runs """
+    def test_build(self):
+        metrics = Metrics()
+        generator = pythonedi.EDIGenerator(metrics=metrics)
+        data = invoice(list(items(20)))
+        data.update({"SE": [44, "11640002"], "GE": [1, "1164"], "IEA": [1, "000010770"]})
+        output = generator.build(data) + "\n"
+
+        summary = metrics.as_dict()
+        self.assertEqual(summary["runs"], 1)
+        self.assertEqual(summary["segments"], output.count("\n"))
+        self.assertEqual(summary["bytes"], len(output))
+        self.assertEqual(summary["segment_types"]["IT1"]["count"], 20)
+
+    def test_shared_across_threads(self):
+        metrics = Metrics()
+        generator = pythonedi.EDIGenerator(metrics=metrics)
+        transactions = []
+        for count in range(1, 41):
+            data = invoice(list(items(count)))
+            data.update({"SE": [4 + 2 * count, "11640002"], "GE": [1, "1164"], "IEA": [1, "000010770"]})
+            transactions.append(data)
+        switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6) # Switch threads as often as possible
+        try:
+            output = "".join(message + "\n" for message in build_batch(transactions, threads=8, generator=generator))
+        finally:
+            sys.setswitchinterval(switch_interval)
+
+        summary = metrics.as_dict()
+        self.assertEqual(summary["runs"], len(transactions))
+        self.assertEqual(summary["segments"], output.count("\n"))
+        self.assertEqual(summary["bytes"], len(output))
+        self.assertEqual(summary["segment_types"]["IT1"]["count"], sum(range(1, 41)))
+
+    def test_interchange(self):
+        metrics = Metrics()
+        generator = pythonedi.EDIGenerator(metrics=metrics)
+        writer = pythonedi.EDIWriter(io.StringIO(), generator)
+        writer.write_interchange(invoice(items(5)), [invoice(items(5)), invoice(items(7))])
+        summary = metrics.as_dict()
+        self.assertEqual(summary["runs"], 1)
+        self.assertEqual(summary["segment_types"]["IT1"]["count"], 12)
+        self.assertEqual(summary["segment_types"]["ST"]["count"], 2)
@@ -16,3 +16,18 @@ class TestParse810(unittest.TestCase):
             print("\n\n{}".format(found_segments))
             print("\n\n")
             pprint.pprint(edi_data)
+
+    def test_parse_segments_cursor(self):
+        with open("test/test_edi.txt", "r") as test_edi_file:
+            test_edi = test_edi_file.read()
+        found_segments, edi_data = self.parser.parse(test_edi)
+        self.assertEqual(found_segments[:4], ["ISA", "GS", "ST", "BIG"])
+        self.assertEqual(len(edi_data["L_IT1"]), 124)
+        self.assertEqual(edi_data["L_IT1"][0]["IT1"]["IT107"], "165911")
+        self.assertEqual(edi_data["L_IT1"][0]["L_PID"][0]["PID"]["PID05"], "TUBE MICROTAINER PST W/LITHIUM")
+
+        # Parsing a window of the segment list only consumes that window
+        edi_segments = test_edi.split("\n")
+        found_segments, edi_data = self.parser.parse_segments(edi_segments, 3, 5)
+        self.assertEqual(found_segments, ["BIG", "REF"])
+        self.assertEqual(len(edi_data["REF"]), 1)
@@ -0,0 +1,47 @@
+""" Projection parsing test cases for PythonEDI """
+
+import unittest
+
+import pythonedi
+
+PROJECTION = {"BIG": ["BIG02"], "L_IT1": {"IT1": ["IT104", "IT102"]}, "TDS": None}
+
+class TestProjection(unittest.TestCase):
+    """ Tests parsing with a projection """
+    def setUp(self):
+        with open("test/test_edi.txt", "r") as test_edi_file:
+            self.test_edi = test_edi_file.read()
+        self.found_segments, self.edi_data = pythonedi.EDIParser(edi_format="810").parse(self.test_edi)
+
+    def test_parse(self):
+        found_segments, edi_data = pythonedi.EDIParser(edi_format="810", projection=PROJECTION).parse(self.test_edi)
+        self.assertEqual(found_segments, ["BIG", "L_IT1", "TDS"])
+        self.assertEqual(edi_data["BIG"], {"BIG02": self.edi_data["BIG"]["BIG02"]})
+        self.assertEqual(edi_data["TDS"], self.edi_data["TDS"])
+        self.assertEqual(edi_data["L_IT1"], [
+            {"IT1": {"IT102": iteration["IT1"]["IT102"], "IT104": iteration["IT1"]["IT104"]}}
+            for iteration in self.edi_data["L_IT1"]])
+
+    def test_skipped_first_segment(self):
+        # Iterations are kept apart even when the segment starting them is not parsed
+        parser = pythonedi.EDIParser(edi_format="810", projection={"L_IT1": {"L_PID": {"PID": ["PID05"]}}})
+        found_segments, edi_data = parser.parse(self.test_edi)
+        self.assertEqual(len(edi_data["L_IT1"]), len(self.edi_data["L_IT1"]))
+        self.assertEqual(edi_data["L_IT1"][5]["L_PID"], [{"PID": {"PID05": self.edi_data["L_IT1"][5]["L_PID"][0]["PID"]["PID05"]}}])
+
+    def test_stream_and_records(self):
+        parser = pythonedi.EDIParser(projection={"ISA": ["ISA13"], "L_N1": None, "REF": ["REF02"]}, output="record")
+        found_segments, edi_data = next(parser.parse_stream([self.test_edi]))
+        self.assertEqual(found_segments, ["ISA", "REF", "L_N1"])
+        self.assertEqual(edi_data["ISA"].ISA13, self.edi_data["ISA"]["ISA13"])
+        self.assertIsNone(edi_data["ISA"].ISA12)
+        self.assertEqual([ref.REF02 for ref in edi_data["REF"]], [ref["REF02"] for ref in self.edi_data["REF"]])
+        self.assertEqual(edi_data["L_N1"][1]["N1"].to_dict(), self.edi_data["L_N1"][1]["N1"])
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            pythonedi.EDIParser(edi_format="810", projection={"BIG": ["BIG99"]})
+        with self.assertRaises(ValueError):
+            pythonedi.EDIParser(edi_format="810", projection={"IT1": None}) # Only inside L_IT1
+        with self.assertRaises(TypeError):
+            pythonedi.EDIParser(edi_format="810", projection={"BIG": "BIG02"})
@@ -0,0 +1,80 @@
+""" Segment record test cases for PythonEDI """
+
+import pickle
+import unittest
+from datetime import datetime
+
+import pythonedi
+from pythonedi.records import SegmentRecord, as_dicts
+
+class TestRecords(unittest.TestCase):
+    """ Tests parsing into SegmentRecords """
+    def setUp(self):
+        with open("test/test_edi.txt", "r") as test_edi_file:
+            self.test_edi = test_edi_file.read()
+        self.found_segments, self.edi_data = pythonedi.EDIParser(edi_format="810", output="record").parse(self.test_edi)
+
+    def test_matches_dict_output(self):
+        expected = pythonedi.EDIParser(edi_format="810").parse(self.test_edi)
+        self.assertEqual((self.found_segments, as_dicts(self.edi_data)), expected)
+
+    def test_access(self):
+        big = self.edi_data["BIG"]
+        self.assertIsInstance(big, SegmentRecord)
+        self.assertIsInstance(big, tuple)
+        self.assertEqual(big[1], "12973821")
+        self.assertEqual(big["BIG02"], "12973821")
+        self.assertEqual(big.BIG02, "12973821")
+        self.assertEqual(big.BIG07, "PR")
+        self.assertIsNone(big.BIG08) # Defined, but not in the segment
+        self.assertEqual(big.get("BIG08", "-"), "-")
+        with self.assertRaises(KeyError):
+            big["BIG08"]
+        self.assertEqual(list(big.keys()), ["BIG0{}".format(i) for i in range(1, 8)])
+
+    def test_shared_layout(self):
+        first, second = self.edi_data["L_IT1"][:2]
+        self.assertIs(type(first["IT1"]), type(second["IT1"]))
+        self.assertEqual(second["IT1"].IT102, 1.0)
+
+    def test_pickle(self):
+        it1 = self.edi_data["L_IT1"][0]["IT1"]
+        copy = pickle.loads(pickle.dumps(it1))
+        self.assertEqual(copy, it1)
+        self.assertEqual(copy.IT107, "165911")
+
+    def test_invalid_output(self):
+        with self.assertRaises(ValueError):
+            pythonedi.EDIParser(edi_format="810", output="xml")
+
+class TestLazyRecords(unittest.TestCase):
+    """ Tests parsing into LazySegmentRecords """
+    def setUp(self):
+        with open("test/test_edi.txt", "r") as test_edi_file:
+            self.test_edi = test_edi_file.read()
+        self.found_segments, self.edi_data = pythonedi.EDIParser(edi_format="810", output="lazy").parse(self.test_edi)
+
+    def test_matches_dict_output(self):
+        expected = pythonedi.EDIParser(edi_format="810").parse(self.test_edi)
+        self.assertEqual((self.found_segments, as_dicts(self.edi_data)), expected)
+
+    def test_decodes_on_access(self):
+        big = self.edi_data["BIG"]
+        self.assertIsNone(big._decoded)
+        self.assertEqual(big.raw("BIG01"), "20170310")
+        self.assertIsNone(big._decoded)
+        invoice_date = big.BIG01
+        self.assertEqual(invoice_date, datetime(2017, 3, 10))
+        self.assertIs(big["BIG01"], invoice_date) # Memoized
+        self.assertEqual(big[-1], "PR")
+        self.assertIsNone(big.BIG08)
+        with self.assertRaises(KeyError):
+            big["BIG08"]
+        with self.assertRaises(IndexError):
+            big[7]
+
+    def test_pickle(self):
+        tds = self.edi_data["TDS"]
+        copy = pickle.loads(pickle.dumps(tds))
+        self.assertIsInstance(copy, SegmentRecord)
+        self.assertEqual(copy.TDS01, tds.TDS01)
@@ -0,0 +1,58 @@
+""" Streaming parser test cases for PythonEDI """
+
+import io
+import unittest
+
+import pythonedi
+from pythonedi.stream import SegmentSplitter
+
+class TestSegmentSplitter(unittest.TestCase):
+    """ Tests incremental segment splitting """
+    def test_delimiter_across_chunks(self):
+        splitter = SegmentSplitter("~\n")
+        self.assertEqual(splitter.feed(b"ST^810^0001~"), [])
+        self.assertEqual(splitter.feed(b"\nBIG^2017"), ["ST^810^0001"])
+        self.assertEqual(splitter.feed(b"0310~\nSE^3"), ["BIG^20170310"])
+        self.assertEqual(splitter.close(), ["SE^3"])
+
+    def test_multibyte_character_across_chunks(self):
+        splitter = SegmentSplitter("\n")
+        encoded = "N1^ST^Café\n".encode("utf-8")
+        self.assertEqual(splitter.feed(encoded[:-2]), [])
+        self.assertEqual(splitter.feed(encoded[-2:]), ["N1^ST^Café"])
+
+class TestParseStream(unittest.TestCase):
+    """ Tests EDIParser.parse_stream """
+    def setUp(self):
+        self.parser = pythonedi.EDIParser(edi_format="810")
+        with open("test/test_edi.txt", "rb") as test_edi_file:
+            self.test_edi = test_edi_file.read()
+
+    def test_matches_parse(self):
+        found_segments, edi_data = self.parser.parse(self.test_edi.decode("utf-8"))
+        for chunk_size in (7, 64, 1 << 20):
+            results = list(self.parser.parse_stream(io.BytesIO(self.test_edi), chunk_size=chunk_size))
+            self.assertEqual(len(results), 1)
+            stream_segments, stream_data = results[0]
+            self.assertEqual(stream_segments, found_segments[:-2]) # No GE/IEA
+            self.assertEqual(stream_data["L_IT1"], edi_data["L_IT1"])
+            self.assertEqual(stream_data["ISA"], edi_data["ISA"])
+
+    def test_path(self):
+        results = list(self.parser.parse_stream("test/test_edi.txt", chunk_size=1000))
+        self.assertEqual(len(results[0][1]["L_IT1"]), 124)
+
+    def test_multiple_transaction_sets(self):
+        lines = self.test_edi.decode("utf-8").split("\n")
+        start, end = lines.index("ST^810^0001"), lines.index("SE^262^0001")
+        second = [line.replace("0001", "0002") for line in lines[start:end+1]]
+        data = "\n".join(lines[:end+1] + second + lines[end+1:])
+        chunks = (data[i:i+100] for i in range(0, len(data), 100))
+        results = list(self.parser.parse_stream(chunks))
+        self.assertEqual([edi_data["ST"]["ST02"] for _, edi_data in results], ["0001", "0002"])
+        self.assertEqual(results[1][1]["GS"]["GS06"], 5814)
+
+    def test_truncated(self):
+        data = self.test_edi.split(b"SE^")[0]
+        with self.assertRaises(ValueError):
+            list(self.parser.parse_stream([data]))
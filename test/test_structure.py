@@ -0,0 +1,66 @@
+""" Structural validation test cases for PythonEDI """
+
+import unittest
+
+import pythonedi
+from pythonedi.diagnostics import Diagnostics
+from pythonedi.structure import structure_machine
+from pythonedi.supported_formats import get_compiled_format
+
+class TestStructureCursor(unittest.TestCase):
+    """ Tests the compiled structure machine directly """
+    def run_tags(self, tags):
+        problems = []
+        cursor = structure_machine(get_compiled_format("810")).cursor(lambda rule, message, segment_id, definition: problems.append((rule, segment_id)))
+        sections = [cursor.advance(tag) for tag in tags]
+        cursor.finish()
+        return sections, problems
+
+    def test_valid(self):
+        sections, problems = self.run_tags(["ST", "BIG", "REF", "REF", "N1", "N3", "N1", "IT1", "PID", "PID", "IT1", "TDS", "CTT", "SE"])
+        self.assertEqual(problems, [])
+        self.assertEqual([section.path for section in sections[7:10]], [("L_IT1",), ("L_IT1", "L_PID"), ("L_IT1", "L_PID")])
+
+    def test_problems(self):
+        sections, problems = self.run_tags(["ST", "REF", "BIG", "ZZZ", "IT1", "SE"])
+        self.assertEqual(problems, [
+            ("missing_segment", "REF"),   # BIG skipped
+            ("segment_order", "BIG"),     # Left where it was
+            ("unrecognized_segment", "ZZZ"),
+            ("missing_segment", "SE"),    # TDS skipped
+        ])
+        self.assertIsNone(sections[2])
+
+    def test_limits(self):
+        sections, problems = self.run_tags(["ST", "BIG"] + ["REF"] * 14 + ["N1"] * 202 + ["TDS", "SE"])
+        self.assertEqual(problems, [("max_uses", "REF"), ("loop_repeat", "N1")])
+
+class TestValidateStream(unittest.TestCase):
+    """ Tests EDIParser.validate_stream and EDIParser(structure=True) """
+    def setUp(self):
+        with open("test/test_edi.txt", "r") as test_edi_file:
+            self.test_edi = test_edi_file.read()
+        lines = self.test_edi.split("\n")
+        lines.insert(5, lines.pop(3)) # BIG after the REF segments
+        self.bad_edi = "\n".join(line for line in lines if not line.startswith(("TDS", "GE")))
+
+    def test_valid(self):
+        self.assertEqual(len(pythonedi.EDIParser(edi_format="810").validate_stream("test/test_edi.txt")), 0)
+
+    def test_invalid(self):
+        diagnostics = pythonedi.EDIParser().validate_stream([self.bad_edi])
+        self.assertEqual([(error.rule, error.segment_index) for error in diagnostics], [
+            ("missing_segment", 3),
+            ("segment_order", 5),
+            ("missing_segment", 261),
+            ("missing_segment", 263), # IEA closes the group without GE
+        ])
+
+    def test_parse(self):
+        with self.assertRaises(ValueError):
+            pythonedi.EDIParser(edi_format="810", structure=True).parse(self.bad_edi)
+        diagnostics = Diagnostics()
+        pythonedi.EDIParser(edi_format="810", structure=True, diagnostics=diagnostics).parse(self.bad_edi)
+        self.assertEqual([error.rule for error in diagnostics], ["missing_segment", "segment_order", "missing_segment"])
+        found_segments, edi_data = pythonedi.EDIParser(edi_format="810", structure=True).parse(self.test_edi)
+        self.assertEqual(len(edi_data["L_IT1"]), 124)
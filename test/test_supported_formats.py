@@ -0,0 +1,81 @@
+""" Format loading test cases for PythonEDI """
+
+import copy
+import importlib
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from pythonedi import encoders
+from pythonedi.encoders import segment_encoder
+from pythonedi.supported_formats import supported_formats, compiled_formats, get_compiled_format, enable_format_cache
+
+# The package exports the registry under the same name as this module
+formats_module = importlib.import_module("pythonedi.supported_formats")
+
+class TestLazyFormats(unittest.TestCase):
+    """ Tests that formats are only loaded on first use """
+    def test_import_loads_nothing(self):
+        script = ("import sys, pythonedi\n"
+                  "from pythonedi.supported_formats import supported_formats\n"
+                  "assert 'colorama' not in sys.modules\n"
+                  "assert sorted(supported_formats) == ['810', 'ST']\n"
+                  "assert not supported_formats._definitions\n"
+                  "pythonedi.EDIParser(edi_format='ST')\n"
+                  "assert list(supported_formats._definitions) == ['ST']\n")
+        subprocess.check_call([sys.executable, "-c", script], cwd=os.path.join(os.path.dirname(__file__), ".."))
+
+    def test_assign(self):
+        supported_formats["TEST"] = supported_formats["ST"]
+        try:
+            self.assertIn("TEST", supported_formats)
+            self.assertIs(get_compiled_format("TEST").definition, supported_formats["ST"])
+        finally:
+            del supported_formats["TEST"]
+        self.assertNotIn("TEST", supported_formats)
+        self.assertNotIn("TEST", compiled_formats)
+        with self.assertRaises(TypeError):
+            supported_formats["TEST"] = {}
+
+    def test_replace_releases_cached_definitions(self):
+        definition = copy.deepcopy(supported_formats["ST"])
+        supported_formats["TEST"] = definition
+        try:
+            segment_encoder(definition[0])
+            self.assertIsNotNone(encoders._segment_encoders.get(definition[0]))
+            supported_formats["TEST"] = copy.deepcopy(definition)
+            self.assertIsNone(encoders._segment_encoders.get(definition[0]))
+        finally:
+            del supported_formats["TEST"]
+
+class TestFormatCache(unittest.TestCase):
+    """ Tests the serialized compiled format cache """
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.old_cache_dir = formats_module.format_cache_dir
+        self.old_compiled = compiled_formats.pop("810", None)
+        enable_format_cache(self.cache_dir)
+
+    def tearDown(self):
+        enable_format_cache(self.old_cache_dir)
+        if self.old_compiled is not None:
+            compiled_formats["810"] = self.old_compiled
+        else:
+            compiled_formats.pop("810", None)
+        shutil.rmtree(self.cache_dir)
+
+    def test_round_trip(self):
+        compiled = get_compiled_format("810")
+        cache_files = os.listdir(self.cache_dir)
+        self.assertEqual(len(cache_files), 1)
+        self.assertTrue(cache_files[0].startswith("810-"))
+
+        del compiled_formats["810"]
+        cached = get_compiled_format("810")
+        self.assertIsNot(cached, compiled)
+        self.assertEqual(cached.definition, compiled.definition)
+        self.assertEqual(sorted(cached.root.dispatch), sorted(compiled.root.dispatch))
+        self.assertEqual(cached.lookup("PID")[0].path, ("L_IT1", "L_PID"))
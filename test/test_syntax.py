@@ -0,0 +1,49 @@
+""" Syntax rule validation test cases for PythonEDI """
+
+import unittest
+
+import pythonedi
+from pythonedi.syntax import SyntaxRule, syntax_checker
+from pythonedi.supported_formats import get_compiled_format
+
+class TestSyntaxRules(unittest.TestCase):
+    """ Tests the compiled syntax rules """
+    def test_rules(self):
+        at_least_one = SyntaxRule("REF", {"rule": "ATLEASTONE", "criteria": [2, 3]})
+        self.assertTrue(at_least_one.violated(0b0010))
+        self.assertFalse(at_least_one.violated(0b1010))
+
+        all_or_none = SyntaxRule("IT1", {"rule": "ALLORNONE", "criteria": [2, 3, 4]})
+        self.assertFalse(all_or_none.violated(0b00010))
+        self.assertFalse(all_or_none.violated(0b11110))
+        self.assertTrue(all_or_none.violated(0b01110))
+
+        if_at_least_one = SyntaxRule("ITD", {"rule": "IFATLEASTONE", "criteria": [3, 4, 5]})
+        self.assertFalse(if_at_least_one.violated(0b000010))
+        self.assertTrue(if_at_least_one.violated(0b001010))
+        self.assertFalse(if_at_least_one.violated(0b101010))
+
+    def test_checker(self):
+        check = syntax_checker(get_compiled_format("810").segment_format("REF"))
+        self.assertIsNone(check(["REF", "OQ", "500100566875"]))
+        self.assertEqual(check(["REF", "OQ"]).message, "Syntax error parsing segment REF: At least one of REF02, REF03 is required.")
+        self.assertEqual(check(["REF", "OQ", ""]).rule, "ATLEASTONE")
+        self.assertIsNone(syntax_checker(get_compiled_format("810").segment_format("BIG")))
+
+class TestParserValidation(unittest.TestCase):
+    """ Tests EDIParser(validate=True) """
+    def setUp(self):
+        with open("test/test_edi.txt", "r") as test_edi_file:
+            self.test_edi = test_edi_file.read()
+
+    def test_valid(self):
+        self.assertEqual(
+            pythonedi.EDIParser(edi_format="810", validate=True).parse(self.test_edi),
+            pythonedi.EDIParser(edi_format="810").parse(self.test_edi))
+
+    def test_invalid(self):
+        data = self.test_edi.replace("IT1^3^1^CS^44.4300^", "IT1^3^1^^44.4300^")
+        pythonedi.EDIParser(edi_format="810").parse(data) # Not checked by default
+        with self.assertRaises(ValueError) as context:
+            pythonedi.EDIParser(edi_format="810", validate=True).parse(data)
+        self.assertIn("IT102, IT103, IT104", str(context.exception))
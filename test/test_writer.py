@@ -0,0 +1,91 @@
+""" Streaming writer test cases for PythonEDI """
+
+import io
+import unittest
+
+import pythonedi
+from pythonedi.EDIWriter import ControlNumbers
+from pythonedi.diagnostics import Diagnostics, MISSING_SEGMENT
+
+from test.helpers import invoice, items
+
+class TestEDIWriter(unittest.TestCase):
+    """ Tests the EDIWriter module """
+    def test_trailers_from_generator(self):
+        sink = io.StringIO()
+        writer = pythonedi.EDIWriter(sink)
+        writer.write(invoice(items(1000)))
+
+        segments = sink.getvalue().split("\n")
+        self.assertEqual(segments[-1], "") # Every segment is terminated
+        segments = segments[:-1]
+        self.assertEqual(writer.segments_written, len(segments))
+        # ST..SE: ST, BIG, 1000 * (IT1, PID), TDS, SE
+        self.assertEqual(segments[-3], "SE^2004^11640002")
+        self.assertEqual(segments[-2], "GE^1^1164")
+        self.assertEqual(segments[-1], "IEA^1^000010770")
+
+    def test_matches_build(self):
+        sink = io.BytesIO()
+        pythonedi.EDIWriter(sink, encoding="ascii").write(invoice(items(3)))
+        data = invoice(list(items(3)))
+        data.update({"SE": [10, "11640002"], "GE": [1, "1164"], "IEA": [1, "000010770"]})
+        self.assertEqual(sink.getvalue().decode("ascii"), pythonedi.EDIGenerator().build(data) + "\n")
+
+    def test_assigns_transaction_number(self):
+        sink = io.StringIO()
+        writer = pythonedi.EDIWriter(sink)
+        data = invoice(items(1))
+        data["ST"] = ["810", None]
+        writer.write(data)
+        self.assertIn("\nST^810^0001\n", sink.getvalue())
+        self.assertIn("\nSE^6^0001\n", sink.getvalue())
+
+    def test_loop_repeat_limit(self):
+        data = invoice(items(1))
+        data["L_IT1"] = [{"IT1": ["1", 1, "EA", 1.0], "L_PID": [{"PID": ["F", None, None, None, "X"]}] * 1001}]
+        with self.assertRaises(ValueError):
+            pythonedi.EDIWriter(io.StringIO()).write(data)
+
+    def test_missing_envelope(self):
+        data = invoice(items(1))
+        del data["ISA"]
+        with self.assertRaisesRegex(ValueError, "missing mandatory segment 'ISA'"):
+            pythonedi.EDIWriter(io.StringIO()).write(data)
+
+        diagnostics = Diagnostics()
+        segments = list(pythonedi.EDIGenerator().iter_segments(data, ControlNumbers(), diagnostics))
+        self.assertEqual((diagnostics.errors[0].rule, diagnostics.errors[0].segment_id), (MISSING_SEGMENT, "ISA"))
+        self.assertEqual(segments[0][:3], "GS^")
+
+    def test_interchange(self):
+        envelope = invoice([])
+        transactions = []
+        for count in (1, 2, 3):
+            data = invoice(items(count))
+            data["ST"] = ["810", None]
+            del data["ISA"], data["GS"]
+            transactions.append(data)
+        output = pythonedi.build_interchange(envelope, iter(transactions))
+
+        segments = output.split("\n")[:-1]
+        self.assertEqual([segment[:3] for segment in segments].count("ISA"), 1)
+        self.assertEqual([segment for segment in segments if segment.startswith(("ST^", "SE^"))], [
+            "ST^810^0001", "SE^6^0001",
+            "ST^810^0002", "SE^8^0002",
+            "ST^810^0003", "SE^10^0003",
+        ])
+        self.assertEqual(segments[-2:], ["GE^3^1164", "IEA^1^000010770"])
+
+        # Each transaction set parses back as on its own
+        parser = pythonedi.EDIParser(edi_format="810")
+        parsed = list(parser.parse_transactions(output))
+        self.assertEqual(len(parsed), 3)
+        self.assertEqual([len(edi_data["L_IT1"]) for found_segments, edi_data in parsed], [1, 2, 3])
+
+    def test_interchange_mixed_types(self):
+        data = invoice(items(1))
+        other = invoice(items(1))
+        other["ST"] = ["997", None]
+        with self.assertRaises(ValueError):
+            pythonedi.build_interchange(invoice([]), [data, other])